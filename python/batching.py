@@ -0,0 +1,139 @@
+"""
+Micro-batching dispatcher for concurrent prediction requests.
+
+Request threads hand their user dict to an InferenceDispatcher and wait on
+a future. A single dispatch thread collects requests until ``max_batch_size``
+rows are queued or ``max_wait_ms`` has passed since the first one. It then
+scores them with one ``predict_enhanced_health_risks_batch`` call, so each
+risk model runs once per batch instead of once per request.
+
+    HEALTH_BATCHING=1              enable batching in app.py and the Django views
+    HEALTH_BATCH_MAX_WAIT_MS       how long the first request waits for company (default 2)
+    HEALTH_BATCH_MAX_SIZE          rows per batch (default 64)
+
+The dispatcher takes the bundle from a ``lease`` callable, either
+``serving.lease`` or ``ModelRegistry.lease``. Every batch is scored with
+one bundle. With a cache, ``current`` (``serving.get_bundle`` or
+``ModelRegistry.current``) returns the bundle that request threads key
+their lookups with, without holding it.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from predict import predict_enhanced_health_risks_batch
+
+
+class InferenceDispatcher:
+    """Coalesce concurrent single-user predictions into batches"""
+
+    def __init__(self, lease, max_wait_ms=2.0, max_batch_size=64, cache=None, current=None):
+        if cache is not None and current is None:
+            raise ValueError("A dispatcher with a cache needs a current bundle callable")
+        self.lease = lease
+        self.current = current
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.batches = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked child, which inherits
+        # the queue but not the thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='inference-dispatcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, user_data):
+        """Queue one user for prediction and return a Future for the result"""
+        future = Future()
+        key = None
+        if self.cache is not None and self.cache.enabled:
+            key = self.cache.key(user_data, self.current())
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    future.set_result(cached)
+                    return future
+
+        self._ensure_started()
+        self._queue.put((user_data, future, key))
+        return future
+
+    def predict(self, user_data, timeout=None):
+        """Blocking ``submit``"""
+        return self.submit(user_data).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._score(batch)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _score(self, batch):
+        errors = {}
+        with self.lease() as bundle:
+            results = predict_enhanced_health_risks_batch(
+                [user_data for user_data, _, _ in batch], bundle, errors=errors)
+            version = bundle.get('version')
+
+        self.batches += 1
+        self.rows += len(batch)
+
+        for i, ((_, future, key), result) in enumerate(zip(batch, results)):
+            # Raise for rows the single-user path raises for
+            if i in errors:
+                future.set_exception(errors[i])
+                continue
+            if key is not None and key[0] == version:
+                self.cache.put(key, result)
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0
+        }
+
+
+def from_env(lease, cache=None, current=None):
+    """Dispatcher configured from HEALTH_BATCH_*, or None unless HEALTH_BATCHING=1"""
+    if os.environ.get('HEALTH_BATCHING') != '1':
+        return None
+    return InferenceDispatcher(
+        lease,
+        max_wait_ms=float(os.environ.get('HEALTH_BATCH_MAX_WAIT_MS', 2.0)),
+        max_batch_size=int(os.environ.get('HEALTH_BATCH_MAX_SIZE', 64)),
+        cache=cache,
+        current=current
+    )
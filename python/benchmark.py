@@ -0,0 +1,434 @@
+"""
+Benchmarks for every stage of the training and serving pipeline.
+
+    python benchmark.py [-o benchmark.json] [--stages generate,predict_single] [--quick]
+    python benchmark.py --compare baseline.json [--threshold 0.25]
+
+Stages:
+
+    generate         generate_enhanced_synthetic_data at several sizes
+    labelers         each of the six row-wise labelers, and calculate_risk_scores
+    prepare          prepare_features
+    cv               5-fold CV of each candidate algorithm and the halving search (cv_scheduler.py)
+    predict_single   predict_enhanced_health_risks, one user per call
+    predict_batch    predict_enhanced_health_risks_batch
+    recommendations  generate_enhanced_recommendations for all six risk types
+    mock             the rule-based mock, per user and column-wise (mock_model.py)
+    flask            POST /api/predict through the Flask test client
+    django           POST /api/predict/ through the Django test client
+    startup          importing predict.py, app.py and the Django views, each in
+                     a fresh interpreter, and which heavy modules each loaded
+
+The prediction and handler stages use the current bundle in
+HEALTH_MODEL_DIR, as the servers do, so train one first with train.py.
+The prediction cache is disabled (HEALTH_CACHE_MAX_ENTRIES=0) unless set
+explicitly, so every request is scored.
+
+Each benchmark reports the median, min and mean seconds per call over
+its repeats. Results are written as JSON together with the environment
+they were measured in. ``--compare`` checks the new medians against a
+saved result file. A benchmark is flagged as a regression when it is
+slower by more than ``--threshold``, and the exit status is then 1.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+os.environ.setdefault('HEALTH_CACHE_MAX_ENTRIES', '0')
+
+import numpy as np
+
+from predict import (
+    ALCOHOL_CONSUMPTION_CODES, BLOOD_PRESSURE_CODES, BLOOD_SUGAR_CODES, CHOLESTEROL_CODES,
+    DIET_QUALITY_SCORES, EXERCISE_FREQUENCY_SCORES, EXISTING_CONDITIONS, FAMILY_CONDITIONS,
+    RISK_LABELERS, SLEEP_QUALITY_CODES, SMOKING_STATUS_CODES, calculate_risk_scores,
+    generate_enhanced_recommendations, generate_enhanced_synthetic_data, predict_enhanced_health_risks,
+    predict_enhanced_health_risks_batch, prepare_features
+)
+
+RESULT_FORMAT = 1
+
+SIZES = (1_000, 10_000, 100_000)
+QUICK_SIZES = (1_000, 10_000)
+
+
+def sample_users(n, seed=0):
+    """``n`` API payloads with every field the predictor reads"""
+    rng = np.random.default_rng(seed)
+
+    def choice(options):
+        return str(rng.choice(list(options)))
+
+    users = []
+    for _ in range(n):
+        weight = float(rng.integers(45, 130))
+        height = float(rng.integers(150, 200))
+        users.append({
+            'age': int(rng.integers(18, 90)),
+            'gender': choice(['male', 'female']),
+            'weight': weight,
+            'height': height,
+            'bmi': weight / ((height / 100) ** 2),
+            'exerciseFrequency': choice(EXERCISE_FREQUENCY_SCORES),
+            'dietType': choice(DIET_QUALITY_SCORES),
+            'sleepHours': float(rng.choice([5, 6, 6.5, 7, 8, 9])),
+            'sleepQuality': choice(SLEEP_QUALITY_CODES),
+            'stressLevel': int(rng.integers(1, 11)),
+            'smokingStatus': choice(SMOKING_STATUS_CODES),
+            'alcoholConsumption': choice(ALCOHOL_CONSUMPTION_CODES),
+            'bloodPressure': choice(BLOOD_PRESSURE_CODES),
+            'cholesterolLevels': choice(CHOLESTEROL_CODES),
+            'bloodSugarLevel': choice(BLOOD_SUGAR_CODES),
+            'familyHistory': [str(c) for c in rng.choice(FAMILY_CONDITIONS, rng.integers(0, 3), replace=False)],
+            'existingConditions': [str(c) for c in rng.choice(EXISTING_CONDITIONS, rng.integers(0, 2), replace=False)]
+        })
+    return users
+
+
+def measure(fn, repeats=5, number=1, warmup=True):
+    """Seconds per call of ``fn`` for each of ``repeats`` rounds of ``number`` calls"""
+    if warmup:
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def result(name, stage, times, rows=None):
+    median = statistics.median(times)
+    entry = {
+        'name': name,
+        'stage': stage,
+        'median_s': median,
+        'min_s': min(times),
+        'mean_s': statistics.fmean(times),
+        'repeats': len(times)
+    }
+    if rows is not None:
+        entry['rows'] = rows
+        entry['rows_per_s'] = rows / median if median > 0 else None
+    return entry
+
+
+def bench_generate(sizes, quick):
+    for n in sizes:
+        times = measure(lambda: generate_enhanced_synthetic_data(n, seed=42), repeats=1 if quick else 3)
+        yield result(f'generate[n={n}]', 'generate', times, rows=n)
+
+
+def bench_labelers(sizes, quick):
+    rowwise = generate_enhanced_synthetic_data(200 if quick else 1000, seed=42)
+    for risk_type, labeler in RISK_LABELERS.items():
+        times = measure(lambda: rowwise.apply(labeler, axis=1), repeats=1 if quick else 3)
+        yield result(f'labeler.{risk_type}[rowwise n={len(rowwise)}]', 'labelers', times, rows=len(rowwise))
+
+    for n in sizes:
+        data = generate_enhanced_synthetic_data(n, seed=42)
+        times = measure(lambda: calculate_risk_scores(data), repeats=1 if quick else 3)
+        yield result(f'calculate_risk_scores[n={n}]', 'labelers', times, rows=n)
+
+
+def bench_prepare(sizes, quick):
+    for n in sizes:
+        data = generate_enhanced_synthetic_data(n, seed=42)
+        times = measure(lambda: prepare_features(data), repeats=1 if quick else 3)
+        yield result(f'prepare_features[n={n}]', 'prepare', times, rows=n)
+
+
+def bench_cv(sizes, quick):
+    import cv_scheduler
+    import train
+
+    n = 1000 if quick else 2000
+    data = train.build_training_data(n, seed=42, use_cache=False)
+    X, _ = prepare_features(data)
+    datasets = {'cardiovascular': (X.to_numpy(dtype=float), data['cardiovascular_high_risk'].to_numpy())}
+    for algo_name, estimator in train.candidate_algorithms().items():
+        times = measure(
+            lambda: cv_scheduler.cross_validate_candidates(datasets, {algo_name: estimator}, n_jobs=1),
+            repeats=1, warmup=False
+        )
+        yield result(f'cv.{algo_name}[n={n} folds=5]', 'cv', times, rows=n)
+    candidates = {name: candidate[2] for name, candidate in train.search_candidates().items()}
+    times = measure(
+        lambda: cv_scheduler.successive_halving(datasets, candidates, rungs=train.SEARCH_RUNGS, n_jobs=1),
+        repeats=1, warmup=False
+    )
+    yield result(f'cv.halving[n={n} candidates={len(candidates)}]', 'cv', times, rows=n)
+
+
+def _bundle():
+    import serving
+    return serving.get_bundle()
+
+
+def bench_predict_single(sizes, quick):
+    bundle = _bundle()
+    users = itertools.cycle(sample_users(200))
+    number = 50 if quick else 200
+    times = measure(lambda: predict_enhanced_health_risks(next(users), bundle), repeats=5, number=number)
+    yield result('predict_enhanced_health_risks', 'predict_single', times, rows=1)
+
+
+def bench_predict_batch(sizes, quick):
+    bundle = _bundle()
+    for n in (64, 1000) if quick else (64, 1000, 10_000):
+        users = sample_users(n)
+        times = measure(lambda: predict_enhanced_health_risks_batch(users, bundle), repeats=3 if quick else 5)
+        yield result(f'predict_enhanced_health_risks_batch[n={n}]', 'predict_batch', times, rows=n)
+
+
+def bench_recommendations(sizes, quick):
+    users = itertools.cycle(sample_users(200))
+
+    def recommend():
+        user_data = next(users)
+        for risk_type in RISK_LABELERS:
+            generate_enhanced_recommendations(risk_type, 50, user_data)
+
+    times = measure(recommend, repeats=5, number=200 if quick else 2000)
+    yield result('generate_enhanced_recommendations[6 types]', 'recommendations', times, rows=1)
+
+
+def bench_mock(sizes, quick):
+    import mock_model
+
+    users = itertools.cycle(sample_users(200))
+    times = measure(lambda: mock_model.mock_predict_health_risks(next(users)), repeats=5, number=200 if quick else 2000)
+    yield result('mock_predict_health_risks', 'mock', times, rows=1)
+
+    for n in sizes:
+        users = sample_users(n)
+        columns = mock_model.encode_records(users)
+        times = measure(lambda: mock_model.mock_risk_scores(columns), repeats=3 if quick else 5)
+        yield result(f'mock_risk_scores[n={n}]', 'mock', times, rows=n)
+        times = measure(lambda: mock_model.mock_predict_health_risks_batch(users), repeats=1 if quick else 3)
+        yield result(f'mock_predict_health_risks_batch[n={n}]', 'mock', times, rows=n)
+
+
+def _bench_client(name, stage, post, quick):
+    users = itertools.cycle(sample_users(200))
+    number = 50 if quick else 200
+
+    def request():
+        response = post(next(users))
+        if response.status_code != 200:
+            raise RuntimeError(f"{name} returned {response.status_code}: {response.content[:200]!r}")
+
+    yield result(name, stage, measure(request, repeats=5, number=number), rows=1)
+
+
+def bench_flask(sizes, quick):
+    from app import app
+
+    client = app.test_client()
+    yield from _bench_client(
+        'flask POST /api/predict', 'flask',
+        lambda user_data: client.post('/api/predict', json=user_data), quick
+    )
+
+
+def bench_django(sizes, quick):
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(
+            DEBUG=False, SECRET_KEY='benchmark', ALLOWED_HOSTS=['testserver'],
+            ROOT_URLCONF='django_app.urls', INSTALLED_APPS=[], MIDDLEWARE=[]
+        )
+        django.setup()
+    from django.test import Client
+
+    client = Client()
+    yield from _bench_client(
+        'django POST /api/predict/', 'django',
+        lambda user_data: client.post('/api/predict/', json.dumps(user_data), content_type='application/json'),
+        quick
+    )
+
+
+# Timed in a fresh interpreter by bench_startup; the Django snippet also
+# loads the bundle, which app.py does at import
+STARTUP_SNIPPETS = {
+    'predict': 'import predict',
+    'flask': 'import app',
+    'django': (
+        "import django\n"
+        "from django.conf import settings\n"
+        "settings.configure(ROOT_URLCONF='django_app.urls')\n"
+        "django.setup()\n"
+        "import django_app.views\n"
+        "try:\n"
+        "    django_app.views.get_registry().load()\n"
+        "except FileNotFoundError:\n"
+        "    pass\n"
+    )
+}
+HEAVY_MODULES = ('pandas', 'scipy', 'sklearn', 'sklearn.ensemble', 'sklearn.model_selection', 'joblib')
+
+_STARTUP_PROGRAM = '''import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, '<startup>', 'exec'))
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': len(sys.modules),
+                  'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def bench_startup(sizes, quick):
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name, code in STARTUP_SNIPPETS.items():
+        program = _STARTUP_PROGRAM.format(code=code, heavy=HEAVY_MODULES)
+        runs = []
+        for _ in range(3 if quick else 7):
+            output = subprocess.run(
+                [sys.executable, '-c', program], cwd=here, capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        entry = result(f'startup.{name}', 'startup', [run['seconds'] for run in runs])
+        entry['modules'] = runs[0]['modules']
+        entry['heavy_modules'] = runs[0]['heavy']
+        yield entry
+
+
+STAGES = {
+    'generate': bench_generate,
+    'labelers': bench_labelers,
+    'prepare': bench_prepare,
+    'cv': bench_cv,
+    'predict_single': bench_predict_single,
+    'predict_batch': bench_predict_batch,
+    'recommendations': bench_recommendations,
+    'mock': bench_mock,
+    'flask': bench_flask,
+    'django': bench_django,
+    'startup': bench_startup
+}
+
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment():
+    """Where and with what the benchmarks ran"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'packages': {
+            name: _package_version(name)
+            for name in ('numpy', 'pandas', 'scikit-learn', 'flask', 'django', 'pyarrow')
+        },
+        'env': {key: value for key, value in os.environ.items() if key.startswith('HEALTH_')}
+    }
+
+
+def run(stages, quick=False):
+    sizes = QUICK_SIZES if quick else SIZES
+    results = []
+    for stage in stages:
+        print(f"[{stage}]")
+        for entry in STAGES[stage](sizes, quick):
+            print(f"  {entry['name']:<52} {entry['median_s'] * 1000:10.3f} ms"
+                  + (f"  ({entry['modules']} modules)" if 'modules' in entry else ''))
+            results.append(entry)
+
+    report = {'format': RESULT_FORMAT, 'environment': environment(), 'quick': quick, 'results': results}
+    if 'predict_single' in stages or 'predict_batch' in stages:
+        report['model_version'] = _bundle().get('version')
+    return report
+
+
+def compare(report, baseline, threshold=0.25):
+    """Median ratio of every benchmark present in both reports.
+
+    Returns the rows as ``(name, baseline_s, current_s, ratio, regressed)``.
+    """
+    previous = {entry['name']: entry for entry in baseline['results']}
+    rows = []
+    for entry in report['results']:
+        if entry['name'] not in previous:
+            continue
+        baseline_s = previous[entry['name']]['median_s']
+        ratio = entry['median_s'] / baseline_s if baseline_s > 0 else float('inf')
+        rows.append((entry['name'], baseline_s, entry['median_s'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_comparison(rows, report, baseline, threshold):
+    env, base_env = report['environment'], baseline['environment']
+    for key in ('python', 'machine', 'cpu_count', 'packages'):
+        if env.get(key) != base_env.get(key):
+            print(f"Warning: baseline {key} differs: {base_env.get(key)} vs {env.get(key)}")
+
+    print(f"\nComparison with baseline (regression above +{threshold:.0%}):")
+    for name, baseline_s, current_s, ratio, regressed in rows:
+        flag = 'REGRESSION' if regressed else ''
+        print(f"  {name:<52} {baseline_s * 1000:10.3f} -> {current_s * 1000:10.3f} ms  {ratio:6.2f}x {flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the health prediction pipeline")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="where to write the JSON results")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes and fewer repeats")
+    parser.add_argument('--compare', metavar='BASELINE', help="result file to check for regressions against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="relative slowdown of the median counted as a regression")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    report = run(stages, quick=args.quick)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        print_comparison(rows, report, baseline, args.threshold)
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Streaming NDJSON bulk scoring for ``/api/predict/batch``.
+
+The request body holds one JSON user object per line. Lines are read
+incrementally from the request stream, scored ``chunk_size`` at a time
+with ``predict_enhanced_health_risks_batch``, and written back as one JSON
+result per line in input order. Output starts after the first chunk, while
+the rest of the upload is still arriving. At most one chunk of records and
+results is in memory at a time, and a single line is capped at
+``max_line_bytes``.
+
+An input line that is not a JSON object yields ``{"error": ...}`` on its
+output line; blank lines are skipped.
+
+    HEALTH_BULK_CHUNK_SIZE      users per chunk (default 1000)
+    HEALTH_BULK_MAX_LINE_BYTES  longest accepted input line (default 64 KiB)
+"""
+import json
+import os
+
+from predict import predict_enhanced_health_risks_batch
+
+CHUNK_SIZE = int(os.environ.get('HEALTH_BULK_CHUNK_SIZE', 1000))
+MAX_LINE_BYTES = int(os.environ.get('HEALTH_BULK_MAX_LINE_BYTES', 64 * 1024))
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def iter_lines(stream, max_line_bytes=MAX_LINE_BYTES):
+    """Lines of a binary file-like ``stream``; None for each over-long line"""
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Discard the rest of the line without buffering it
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield None
+            continue
+        yield line
+
+
+def _parse(line):
+    """User dict from one input line, or an error result"""
+    if line is None:
+        return None, {'error': 'Line too long'}
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return None, {'error': f'Invalid JSON: {e}'}
+    if not isinstance(record, dict):
+        return None, {'error': 'Expected a JSON object'}
+    return record, None
+
+
+def _score_chunk(parsed, lease):
+    records = [record for record, _ in parsed if record is not None]
+    if records:
+        with lease() as bundle:
+            scored = iter(predict_enhanced_health_risks_batch(records, bundle))
+    out = []
+    for record, error in parsed:
+        result = error if record is None else next(scored)
+        out.append(json.dumps(result, separators=(',', ':')))
+    out.append('')
+    return '\n'.join(out).encode()
+
+
+def score_ndjson(stream, lease, chunk_size=CHUNK_SIZE, max_line_bytes=MAX_LINE_BYTES):
+    """Yield NDJSON-encoded results, one bytes object per chunk.
+
+    ``lease`` is ``serving.lease`` or ``ModelRegistry.lease``; each chunk
+    is scored with the bundle it yields.
+    """
+    parsed = []
+    for line in iter_lines(stream, max_line_bytes):
+        if line is not None and not line.strip():
+            continue
+        parsed.append(_parse(line))
+        if len(parsed) >= chunk_size:
+            yield _score_chunk(parsed, lease)
+            parsed = []
+    if parsed:
+        yield _score_chunk(parsed, lease)
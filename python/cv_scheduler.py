@@ -0,0 +1,262 @@
+"""
+Parallel cross-validation scheduler for model selection.
+
+Model selection scores every candidate algorithm on every target with
+k-fold CV. Each (target, algorithm, fold) fit is independent, so the
+scheduler fans them out over a process pool and gathers the scores back
+in a fixed order. Fold splits are computed up front and every estimator
+is built from a fixed ``random_state``, so the selected models do not
+depend on the number of workers or on job completion order.
+
+``successive_halving`` runs the same fold jobs in rungs of growing
+budget instead of scoring every candidate on every fold: after each rung
+only the best ``1/eta`` of the candidates of each target move on to more
+folds and, for tree ensembles, more estimators. Fold models of
+ensembles come back from the workers and are grown with ``warm_start``
+rather than refitted; other fold models stay in the worker, since their
+scores carry over unchanged. Ensembles that stopped early on their own
+validation split (``n_iter_no_change``) are not grown again.
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold
+
+# Per-worker copy of the training sets, installed once by the pool initializer
+# so jobs only carry their (target, algorithm, fold) coordinates
+_datasets = None
+
+
+def _init_worker(datasets):
+    global _datasets
+    _datasets = datasets
+
+
+def _run_fold(job):
+    """Fit one candidate on one fold and score it; runs inside a worker"""
+    target, algo_name, estimator, fold, train_idx, test_idx, scoring = job
+    X, y = _datasets[target]
+
+    start = time.perf_counter()
+    model = clone(estimator)
+    model.fit(X[train_idx], y[train_idx])
+    score = get_scorer(scoring)(model, X[test_idx], y[test_idx])
+    elapsed = time.perf_counter() - start
+
+    return (target, algo_name, fold), float(score), elapsed
+
+
+def _run_rung_fold(job):
+    """Fit or grow one candidate on one fold for a halving rung; runs inside a worker"""
+    target, name, estimator, fold, train_idx, test_idx, scoring, n_estimators, model, keep_model = job
+    X, y = _datasets[target]
+
+    start = time.perf_counter()
+    if model is None:
+        model = clone(estimator)
+        if n_estimators is not None:
+            model.set_params(warm_start=True)
+    if n_estimators is not None:
+        model.set_params(n_estimators=n_estimators)
+    model.fit(X[train_idx], y[train_idx])
+    score = get_scorer(scoring)(model, X[test_idx], y[test_idx])
+    elapsed = time.perf_counter() - start
+
+    return (target, name, fold), float(score), elapsed, model_complexity(model), model if keep_model else None
+
+
+def model_complexity(model):
+    """Size of a fitted model: tree nodes, stored support vectors or coefficients"""
+    if hasattr(model, 'estimators_'):
+        return int(sum(tree.tree_.node_count for tree in np.ravel(model.estimators_)))
+    if hasattr(model, 'support_vectors_'):
+        return int(model.support_vectors_.size)
+    if hasattr(model, 'coef_'):
+        return int(model.coef_.size)
+    return 0
+
+
+def _warm_startable(estimator):
+    params = estimator.get_params()
+    return 'warm_start' in params and 'n_estimators' in params
+
+
+def _stopped_early(model):
+    """True when a boosting model stopped adding stages before ``n_estimators``"""
+    return len(model.estimators_) < model.n_estimators
+
+
+def default_n_jobs():
+    return int(os.environ.get('HEALTH_TRAIN_JOBS', os.cpu_count() or 1))
+
+
+def cross_validate_candidates(datasets, algorithms, cv=5, scoring='roc_auc', n_jobs=None):
+    """Score every algorithm on every dataset with k-fold CV.
+
+    ``datasets`` maps target name to ``(X, y)`` arrays and ``algorithms``
+    maps algorithm name to an unfitted estimator. Splits match
+    ``cross_val_score(..., cv=cv)`` for classifiers (unshuffled
+    ``StratifiedKFold``). ``n_jobs=1`` runs every job in-process.
+
+    Returns ``(cv_scores, report)``: ``cv_scores[target][algo_name]`` is the
+    array of fold scores, and ``report`` holds per-job wall times, total
+    wall time, the summed serial job time and the resulting speedup.
+    """
+    n_jobs = n_jobs or default_n_jobs()
+    datasets = {target: (np.asarray(X), np.asarray(y)) for target, (X, y) in datasets.items()}
+
+    jobs = []
+    for target, (X, y) in datasets.items():
+        folds = StratifiedKFold(n_splits=cv).split(X, y)
+        for fold, (train_idx, test_idx) in enumerate(folds):
+            for algo_name, estimator in algorithms.items():
+                jobs.append((target, algo_name, estimator, fold, train_idx, test_idx, scoring))
+
+    start = time.perf_counter()
+    if n_jobs == 1:
+        _init_worker(datasets)
+        results = [_run_fold(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(datasets,)) as pool:
+            results = list(pool.map(_run_fold, jobs))
+    wall_time = time.perf_counter() - start
+
+    scores = {key: score for key, score, _ in results}
+    job_times = {key: elapsed for key, _, elapsed in results}
+
+    cv_scores = {
+        target: {
+            algo_name: np.array([scores[(target, algo_name, fold)] for fold in range(cv)])
+            for algo_name in algorithms
+        }
+        for target in datasets
+    }
+
+    serial_time = sum(job_times.values())
+    report = {
+        'n_jobs': n_jobs,
+        'n_tasks': len(jobs),
+        'wall_time': wall_time,
+        'serial_time': serial_time,
+        'speedup': serial_time / wall_time if wall_time > 0 else 1.0,
+        'job_times': {
+            f'{target}/{algo_name}/{fold}': elapsed
+            for (target, algo_name, fold), elapsed in job_times.items()
+        }
+    }
+    return cv_scores, report
+
+
+def successive_halving(datasets, candidates, rungs=((2, 50), (3, 100), (5, 200)), cv=5, eta=3,
+                       scoring='roc_auc', n_jobs=None):
+    """Select among ``candidates`` on every dataset by successive halving.
+
+    ``rungs`` is a sequence of ``(n_folds, n_estimators)`` budgets: in each
+    rung the remaining candidates of a target are scored on the first
+    ``n_folds`` of the ``cv`` splits (same splits as
+    ``cross_validate_candidates``), tree ensembles with ``n_estimators``
+    estimators, and all but the best ``ceil(n / eta)`` by mean score are
+    dropped before the next rung. Fold scores of non-ensemble candidates
+    carry over between rungs, so only new folds are fitted for them.
+
+    Returns ``(cv_scores, complexity, report)``: ``cv_scores[target][name]``
+    is the array of fold scores of every candidate that reached the last
+    rung, ``complexity[target][name]`` the mean ``model_complexity`` of
+    its fold models, and ``report`` holds the same timing keys as
+    ``cross_validate_candidates`` plus a per-rung summary.
+    """
+    n_jobs = n_jobs or default_n_jobs()
+    datasets = {target: (np.asarray(X), np.asarray(y)) for target, (X, y) in datasets.items()}
+    splits = {target: list(StratifiedKFold(n_splits=cv).split(X, y)) for target, (X, y) in datasets.items()}
+    warm = {name: _warm_startable(estimator) for name, estimator in candidates.items()}
+
+    alive = {target: list(candidates) for target in datasets}
+    folds = {}  # (target, name, fold) -> (score, complexity, fitted model or None)
+    job_times = {}
+    rung_reports = []
+
+    pool = None
+    if n_jobs == 1:
+        _init_worker(datasets)
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(datasets,))
+
+    start = time.perf_counter()
+    try:
+        for rung, (n_folds, n_estimators) in enumerate(rungs):
+            last = rung == len(rungs) - 1
+            jobs = []
+            for target, names in alive.items():
+                for name in names:
+                    for fold in range(n_folds):
+                        previous = folds.get((target, name, fold))
+                        if previous is not None and (not warm[name] or _stopped_early(previous[2])):
+                            continue
+                        train_idx, test_idx = splits[target][fold]
+                        jobs.append((
+                            target, name, candidates[name], fold, train_idx, test_idx, scoring,
+                            n_estimators if warm[name] else None,
+                            previous[2] if previous is not None else None,
+                            # Only ensembles are grown in a later rung
+                            warm[name] and not last
+                        ))
+
+            results = map(_run_rung_fold, jobs) if pool is None else pool.map(_run_rung_fold, jobs)
+            for key, score, elapsed, size, model in results:
+                previous = folds.get(key)
+                folds[key] = (score, size, model if model is not None else (previous and previous[2]))
+                job_key = '/'.join(map(str, key))
+                job_times[job_key] = job_times.get(job_key, 0.0) + elapsed
+
+            rung_reports.append({
+                'n_folds': n_folds,
+                'n_estimators': n_estimators,
+                'n_candidates': sum(len(names) for names in alive.values()),
+                'n_tasks': len(jobs)
+            })
+            if last:
+                break
+            for target, names in alive.items():
+                mean_scores = {
+                    name: np.mean([folds[(target, name, fold)][0] for fold in range(n_folds)]) for name in names
+                }
+                keep = sorted(names, key=lambda name: -mean_scores[name])[:math.ceil(len(names) / eta)]
+                alive[target] = [name for name in names if name in keep]
+                for name in set(names) - set(keep):
+                    for fold in range(cv):
+                        folds.pop((target, name, fold), None)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    wall_time = time.perf_counter() - start
+
+    n_folds = rungs[-1][0]
+    cv_scores = {
+        target: {name: np.array([folds[(target, name, fold)][0] for fold in range(n_folds)]) for name in names}
+        for target, names in alive.items()
+    }
+    complexity = {
+        target: {name: float(np.mean([folds[(target, name, fold)][1] for fold in range(n_folds)])) for name in names}
+        for target, names in alive.items()
+    }
+
+    serial_time = sum(job_times.values())
+    report = {
+        'mode': 'halving',
+        'n_jobs': n_jobs,
+        'n_tasks': sum(rung['n_tasks'] for rung in rung_reports),
+        'n_candidates': len(candidates),
+        'eta': eta,
+        'rungs': rung_reports,
+        'wall_time': wall_time,
+        'serial_time': serial_time,
+        'speedup': serial_time / wall_time if wall_time > 0 else 1.0,
+        'job_times': job_times
+    }
+    return cv_scores, complexity, report
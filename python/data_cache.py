@@ -0,0 +1,184 @@
+"""
+On-disk cache of the labeled synthetic training data.
+
+``load_labeled_data(n_samples, seed)`` returns what
+``generate_enhanced_synthetic_data`` followed by ``calculate_risk_scores``
+would produce. The first call for a key computes the data and writes it
+as an uncompressed Arrow IPC file. Later calls memory-map that file
+instead of regenerating, so the numeric columns are backed by the page
+cache and shared by every process that maps them.
+
+The cache key covers ``n_samples``, ``seed``, the numpy version (the
+generator's random streams depend on it), the category vocabularies, the
+source code of the generator and labeler functions and the labeling rule
+tables (predict.RISK_RULES). Editing any of these produces a new file
+rather than reusing a stale one.
+
+Condition columns are stored as bitmasks over FAMILY_CONDITIONS and
+EXISTING_CONDITIONS and turned back into the generator's tuples on load.
+"""
+import hashlib
+import inspect
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import predict
+import rules
+
+CACHE_DIR = os.environ.get(
+    'HEALTH_DATA_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_cache')
+)
+
+# Code whose output the cached file holds
+GENERATOR_FUNCTIONS = (
+    predict._sample_categorical,
+    predict._sample_condition_masks,
+    predict._mask_lookup,
+    predict.generate_enhanced_synthetic_data
+)
+LABELER_FUNCTIONS = (
+    rules.Columns,
+    rules._vector_condition,
+    rules._vector_points,
+    rules.compile_vector,
+    predict._vectorized_risk_scores,
+    predict.calculate_risk_scores,
+    *predict.RISK_LABELERS.values()
+)
+VOCABULARIES = {
+    'blood_pressure': predict.BLOOD_PRESSURE_CATEGORIES,
+    'cholesterol': predict.CHOLESTEROL_CATEGORIES,
+    'blood_sugar': predict.BLOOD_SUGAR_CATEGORIES,
+    'family_conditions': predict.FAMILY_CONDITIONS,
+    'existing_conditions': predict.EXISTING_CONDITIONS
+}
+
+CONDITION_COLUMNS = {
+    'family_history': predict.FAMILY_CONDITIONS,
+    'existing_conditions': predict.EXISTING_CONDITIONS
+}
+
+
+def code_fingerprint(functions):
+    """Hash of the source code of ``functions``"""
+    digest = hashlib.sha256()
+    for function in functions:
+        digest.update(f'{function.__module__}.{function.__qualname__}\n'.encode())
+        digest.update(inspect.getsource(function).encode())
+    return digest.hexdigest()
+
+
+def dataset_key(n_samples, seed):
+    """Everything the labeled dataset depends on, as a JSON-serializable dict"""
+    return {
+        'n_samples': int(n_samples),
+        'seed': seed,
+        'numpy': np.__version__,
+        'vocabularies': VOCABULARIES,
+        'generator': code_fingerprint(GENERATOR_FUNCTIONS),
+        'labeler': code_fingerprint(LABELER_FUNCTIONS),
+        'rules': hashlib.sha256(repr(predict.RISK_RULES).encode()).hexdigest()
+    }
+
+
+def cache_path(n_samples, seed, cache_dir=CACHE_DIR):
+    key = json.dumps(dataset_key(n_samples, seed), sort_keys=True)
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f'labeled-{n_samples}-{seed}-{digest}.arrow')
+
+
+def _condition_masks(values, conditions):
+    """Bitmask per row for a column of condition tuples"""
+    bits = {condition: 1 << i for i, condition in enumerate(conditions)}
+    codes, uniques = pd.factorize(values)
+    masks = np.array([sum(bits.get(c, 0) for c in set(u)) for u in uniques], dtype=np.uint8)
+    return masks[codes]
+
+
+def _to_table(data):
+    columns = {}
+    for name, column in data.items():
+        if name in CONDITION_COLUMNS:
+            columns[name] = pa.array(_condition_masks(column, CONDITION_COLUMNS[name]))
+        elif isinstance(column.dtype, pd.CategoricalDtype):
+            columns[name] = pa.DictionaryArray.from_arrays(
+                pa.array(column.cat.codes.to_numpy()), pa.array(column.cat.categories.to_numpy())
+            )
+        else:
+            columns[name] = pa.array(column.to_numpy())
+    return pa.table(columns)
+
+
+def _from_table(table):
+    data = {}
+    for name in table.column_names:
+        column = table.column(name).combine_chunks()
+        if name in CONDITION_COLUMNS:
+            lookup = predict._mask_lookup(CONDITION_COLUMNS[name])
+            data[name] = lookup[column.to_numpy()]
+        elif pa.types.is_dictionary(column.type):
+            data[name] = pd.Categorical.from_codes(
+                column.indices.to_numpy(), column.dictionary.to_pylist()
+            )
+        else:
+            # Zero-copy view of the mapped file
+            data[name] = column.to_numpy()
+    return pd.DataFrame(data, copy=False)
+
+
+def _write(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = _to_table(data)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _read(path):
+    with pa.memory_map(path, 'r') as source:
+        return _from_table(pa.ipc.open_file(source).read_all())
+
+
+def iter_chunks(path, chunk_size=1_000_000):
+    """Yield a cached (or compatible) Arrow file as DataFrames of ``chunk_size`` rows.
+
+    The file is memory-mapped and sliced without copying, so only the
+    chunk being converted is materialized. Chunks are labeled with
+    ``calculate_risk_scores`` if the file holds no risk columns.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        labeled = all(f'{risk_type}_risk' in table.column_names for risk_type in predict.RISK_LABELERS)
+        for offset in range(0, table.num_rows, chunk_size):
+            chunk = _from_table(table.slice(offset, chunk_size))
+            if not labeled:
+                chunk = chunk.join(predict.calculate_risk_scores(chunk))
+            yield chunk
+
+
+def build_labeled_data(n_samples, seed):
+    """Generate and label a population without touching the cache"""
+    data = predict.generate_enhanced_synthetic_data(n_samples, seed=seed)
+    return data.join(predict.calculate_risk_scores(data))
+
+
+def load_labeled_data(n_samples=5000, seed=42, cache_dir=CACHE_DIR):
+    """Labeled dataset for ``(n_samples, seed)``, from the cache when possible.
+
+    Returns ``(data, hit)`` where ``hit`` says whether the file was reused.
+    """
+    path = cache_path(n_samples, seed, cache_dir)
+    if os.path.exists(path):
+        return _read(path), True
+
+    data = build_labeled_data(n_samples, seed)
+    _write(data, path)
+    return _read(path), False
@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('api/predict/', views.predict, name='predict'),
+    path('api/predict/batch/', views.predict_batch, name='predict_batch'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
 ]
@@ -0,0 +1,196 @@
+"""
+Precompiled feature encoder for serving.
+
+FeatureEncoder is built once per model bundle from its feature schema. It
+resolves every model column to a field spec ahead of time: numeric
+converters, lookup tables for the categorical fields, and bitmask tables
+for ``familyHistory`` and ``existingConditions``. It then writes users
+straight into a preallocated float64 row or matrix.
+
+Encoding matches the ``feature_mapping`` table that
+predict_enhanced_health_risks used to rebuild on every call. Missing
+fields, unconvertible values and unknown categories take the same
+defaults, and ``encode_with_report`` lists which fields did so.
+
+Rows are float64 by default rather than float32. The scalers were fitted
+on float64 DataFrames, and only float64 rows give model probabilities
+bit-identical to that sklearn path; float32 rows shift them in the last
+digits. ``dtype=np.float32`` is still accepted where that does not matter.
+"""
+import numpy as np
+
+from predict import (
+    ALCOHOL_CONSUMPTION_CODES, BLOOD_PRESSURE_CODES, BLOOD_SUGAR_CODES, CHOLESTEROL_CODES,
+    DIET_QUALITY_SCORES, EXERCISE_FREQUENCY_SCORES, SLEEP_QUALITY_CODES, SMOKING_STATUS_CODES
+)
+
+# column -> (kind, input key, value used when the key is missing, table, table default)
+_SCALAR_FIELDS = {
+    'age': ('int', 'age', 0, None, None),
+    'weight': ('float', 'weight', 0, None, None),
+    'height': ('float', 'height', 0, None, None),
+    'bmi': ('float', 'bmi', 0, None, None),
+    'exercise_frequency': ('table', 'exercise_frequency', 0, EXERCISE_FREQUENCY_SCORES, 2),
+    'sleep_hours': ('float', 'sleep_hours', 0, None, None),
+    'diet_quality': ('table', 'diet_quality', 0, DIET_QUALITY_SCORES, 5),
+    'stress_level': ('int', 'stress_level', 0, None, None),
+    'gender_encoded': ('table', 'gender', None, {'male': 1, 'female': 0}, 0),
+    'smoking_encoded': ('table', 'smokingStatus', 'never', SMOKING_STATUS_CODES, 0),
+    'alcohol_encoded': ('table', 'alcoholConsumption', 'never', ALCOHOL_CONSUMPTION_CODES, 0),
+    'sleep_quality_encoded': ('table', 'sleepQuality', 'good', SLEEP_QUALITY_CODES, 3),
+    'bp_encoded': ('table', 'bloodPressure', 'normal', BLOOD_PRESSURE_CODES, 0),
+    'chol_encoded': ('table', 'cholesterolLevels', 'normal', CHOLESTEROL_CODES, 0),
+    'bs_encoded': ('table', 'bloodSugarLevel', '70-100', BLOOD_SUGAR_CODES, 0)
+}
+
+# Multi-select fields, each encoded as one contiguous block of 0/1 columns
+_CONDITION_FIELDS = (
+    ('familyHistory', 'family_', 'family_conditions'),
+    ('existingConditions', 'has_', 'existing_conditions')
+)
+
+
+class _ConditionBlock:
+    """Bitmask encoding of one multi-select field into a block of columns"""
+
+    def __init__(self, key, conditions):
+        self.key = key
+        self.conditions = list(conditions)
+        self.bits = {condition: 1 << i for i, condition in enumerate(self.conditions)}
+        # 0/1 column values for every possible mask
+        self.rows = [
+            tuple(float((mask >> i) & 1) for i in range(len(self.conditions)))
+            for mask in range(1 << len(self.conditions))
+        ]
+
+    def mask(self, value):
+        """Bitmask of the known conditions in ``value``.
+
+        Lists and tuples are resolved through the bit table. Anything else
+        falls back to the ``condition in value`` test the original code
+        used, and raises where that would raise.
+        """
+        if type(value) in (list, tuple):
+            bits = self.bits
+            mask = 0
+            try:
+                for item in value:
+                    mask |= bits.get(item, 0)
+                return mask
+            except TypeError:
+                pass
+        mask = 0
+        for condition, bit in self.bits.items():
+            if condition in value:
+                mask |= bit
+        return mask
+
+
+class FeatureEncoder:
+    """Encode user dicts into model feature rows for one feature schema"""
+
+    def __init__(self, feature_schema, dtype=np.float64):
+        self.feature_columns = list(feature_schema['feature_columns'])
+        self.dtype = dtype
+        self.n_features = len(self.feature_columns)
+
+        blocks = {}
+        for key, prefix, schema_key in _CONDITION_FIELDS:
+            conditions = feature_schema[schema_key]
+            columns = [f'{prefix}{c.replace("-", "_")}' for c in conditions]
+            start = self.feature_columns.index(columns[0]) if columns[0] in self.feature_columns else -1
+            if self.feature_columns[start:start + len(columns)] != columns:
+                raise ValueError(f"Feature schema columns for {key} are missing or not contiguous")
+            blocks[start] = (_ConditionBlock(key, conditions), len(columns))
+
+        # One spec per scalar column or condition block, in column order:
+        # (column, converter or lookup table, input key, missing value, table default)
+        self._specs = []
+        index = 0
+        while index < self.n_features:
+            if index in blocks:
+                block, width = blocks[index]
+                self._specs.append((block.key, block, block.key, [], None))
+                index += width
+                continue
+            column = self.feature_columns[index]
+            if column not in _SCALAR_FIELDS:
+                raise ValueError(f"No encoding defined for feature column: {column}")
+            kind, key, missing, table, default = _SCALAR_FIELDS[column]
+            converter = {'int': int, 'float': float, 'table': table}[kind]
+            self._specs.append((column, converter, key, missing, default))
+            index += 1
+
+    def _values(self, user_data):
+        """Feature values for one user, in column order"""
+        get = user_data.get
+        values = []
+        append = values.append
+        for _, converter, key, missing, default in self._specs:
+            raw = get(key, missing)
+            if type(converter) is dict:
+                try:
+                    append(converter.get(raw, default))
+                except TypeError:
+                    append(0)
+            elif type(converter) is _ConditionBlock:
+                values.extend(converter.rows[converter.mask(raw)])
+            else:
+                try:
+                    append(converter(raw))
+                except Exception:
+                    append(0)
+        return values
+
+    def _fallbacks(self, user_data):
+        """Columns of one user's row that took a default value"""
+        fallbacks = []
+        for column, converter, key, missing, default in self._specs:
+            if type(converter) is _ConditionBlock:
+                continue
+            if key not in user_data:
+                fallbacks.append(column)
+                continue
+            raw = user_data[key]
+            if type(converter) is dict:
+                try:
+                    known = raw in converter
+                except TypeError:
+                    known = False
+                if not known:
+                    fallbacks.append(column)
+            else:
+                try:
+                    converter(raw)
+                except Exception:
+                    fallbacks.append(column)
+        return fallbacks
+
+    def encode(self, user_data, out=None):
+        """Encode one user into ``out`` (or a new row) and return it"""
+        if out is None:
+            out = np.empty(self.n_features, dtype=self.dtype)
+        out[:] = self._values(user_data)
+        return out
+
+    def encode_with_report(self, user_data, out=None):
+        """Encode one user and list the feature columns that used a default"""
+        return self.encode(user_data, out), self._fallbacks(user_data)
+
+    def encode_many(self, records, out=None, failed=None):
+        """Encode users into the rows of ``out`` (or a new matrix).
+
+        If ``failed`` is a set, rows that cannot be encoded are zero-filled
+        and their indices added to it; otherwise the error propagates.
+        """
+        if out is None:
+            out = np.empty((len(records), self.n_features), dtype=self.dtype)
+        for i, user_data in enumerate(records):
+            try:
+                out[i] = self._values(user_data)
+            except Exception:
+                if failed is None:
+                    raise
+                out[i] = 0
+                failed.add(i)
+        return out
@@ -0,0 +1,14 @@
+"""
+Gunicorn settings for the Flask API.
+
+    gunicorn app:app
+
+The app is imported, and so the model bundle loaded, once in the master
+process before workers fork. Workers then share the bundle's memory
+copy-on-write instead of each loading a copy.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+preload_app = True
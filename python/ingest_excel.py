@@ -0,0 +1,171 @@
+"""
+Chunked scoring of the assessments workbook written by the Next.js app.
+
+    python ingest_excel.py [../data/health_data.xlsx] [-o health_scores.parquet]
+                           [--chunk-size 5000] [--model-dir models]
+
+The workbook is read in streaming mode (openpyxl ``read_only``), one chunk
+of rows at a time. Each row is converted from the ``HealthData`` layout in
+lib/excel-utils.ts to the user dict ``predict.py`` expects, and each chunk
+is scored with ``predict_enhanced_health_risks_batch``. The chunk is then
+appended as a row group to a Parquet file. Memory use depends on the
+chunk size, not on the workbook size.
+
+Output columns: ``row`` (worksheet row number), ``id``, ``timestamp``, and
+per risk type ``<type>_risk``, ``<type>_confidence`` and ``<type>_factors``
+(recommendation names). ``fallback`` marks rows scored by the rule-based
+fallback, and ``error`` holds the message for rows that could not be
+scored at all.
+"""
+import argparse
+import math
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+import model_bundle
+from predict import RISK_LABELERS, predict_enhanced_health_risks_batch
+
+DEFAULT_WORKBOOK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'health_data.xlsx'
+)
+
+# HealthData fields stored as numbers-in-strings and comma-joined lists,
+# converted as preprocessData in lib/excel-utils.ts does
+NUMERIC_FIELDS = ('age', 'weight', 'height', 'sleepHours', 'stressLevel')
+LIST_FIELDS = ('exerciseTypes', 'familyHistory', 'existingConditions')
+
+OUTPUT_SCHEMA = pa.schema(
+    [('row', pa.int64()), ('id', pa.string()), ('timestamp', pa.string())]
+    + [
+        field
+        for risk_type in RISK_LABELERS
+        for field in (
+            (f'{risk_type}_risk', pa.int16()),
+            (f'{risk_type}_confidence', pa.float64()),
+            (f'{risk_type}_factors', pa.list_(pa.string()))
+        )
+    ]
+    + [('fallback', pa.bool_()), ('error', pa.string())]
+)
+
+
+def _number(value):
+    """``Number(value) || 0``"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return 0 if math.isnan(number) else number
+
+
+def record_from_row(header, values):
+    """User dict for ``predict.py`` from one worksheet row"""
+    record = {
+        key: value for key, value in zip(header, values)
+        if key is not None and value is not None and value != ''
+    }
+    for key in NUMERIC_FIELDS:
+        if key in record:
+            record[key] = _number(record[key])
+    for key in LIST_FIELDS:
+        if isinstance(record.get(key), str):
+            record[key] = record[key].split(',')
+    # The API computes BMI from weight and height when it is not given
+    if 'bmi' not in record and record.get('weight') and record.get('height'):
+        record['bmi'] = record['weight'] / ((record['height'] / 100) ** 2)
+    return record
+
+
+def read_chunks(path, chunk_size=5000):
+    """Yield ``(row_numbers, records)`` for the first worksheet, chunk by chunk"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(name) if name is not None else None for name in header]
+
+        row_numbers, records = [], []
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            row_numbers.append(row_number)
+            records.append(record_from_row(header, values))
+            if len(records) >= chunk_size:
+                yield row_numbers, records
+                row_numbers, records = [], []
+        if records:
+            yield row_numbers, records
+    finally:
+        workbook.close()
+
+
+def _optional_str(value):
+    return None if value is None else str(value)
+
+
+def results_table(row_numbers, records, results):
+    """Arrow table of one scored chunk in OUTPUT_SCHEMA"""
+    columns = {
+        'row': row_numbers,
+        'id': [_optional_str(record.get('id')) for record in records],
+        'timestamp': [_optional_str(record.get('timestamp')) for record in records],
+        'fallback': [],
+        'error': []
+    }
+    for risk_type in RISK_LABELERS:
+        columns[f'{risk_type}_risk'] = []
+        columns[f'{risk_type}_confidence'] = []
+        columns[f'{risk_type}_factors'] = []
+
+    for result in results:
+        error = result.get('error')
+        columns['error'].append(error)
+        columns['fallback'].append(
+            error is None and any(prediction.get('fallback', False) for prediction in result.values())
+        )
+        for risk_type in RISK_LABELERS:
+            prediction = result.get(risk_type) if error is None else None
+            columns[f'{risk_type}_risk'].append(prediction['risk'] if prediction else None)
+            columns[f'{risk_type}_confidence'].append(prediction.get('confidence') if prediction else None)
+            columns[f'{risk_type}_factors'].append(
+                [factor['name'] for factor in prediction['factors']] if prediction else None
+            )
+
+    return pa.table(columns, schema=OUTPUT_SCHEMA)
+
+
+def score_workbook(path, output_path, bundle, chunk_size=5000):
+    """Score every row of ``path`` into a Parquet file; returns the row count"""
+    n_rows = 0
+    with pq.ParquetWriter(output_path, OUTPUT_SCHEMA) as writer:
+        for row_numbers, records in read_chunks(path, chunk_size):
+            results = predict_enhanced_health_risks_batch(records, bundle)
+            writer.write_table(results_table(row_numbers, records, results))
+            n_rows += len(records)
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score the assessments workbook into a Parquet file")
+    parser.add_argument('workbook', nargs='?', default=DEFAULT_WORKBOOK, help="input .xlsx file")
+    parser.add_argument('-o', '--output', default='health_scores.parquet', help="output Parquet file")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="rows scored per batch")
+    parser.add_argument('--model-dir', default=model_bundle.MODEL_DIR, help="model bundle directory")
+    args = parser.parse_args(argv)
+
+    bundle = model_bundle.load_bundle(args.model_dir)
+
+    start = time.perf_counter()
+    n_rows = score_workbook(args.workbook, args.output, bundle, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {n_rows} rows from {args.workbook} into {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
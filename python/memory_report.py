@@ -0,0 +1,127 @@
+"""
+Resident memory per serving process.
+
+    python memory_report.py --pid <gunicorn master pid>
+    python memory_report.py --spawn 4 [--model-dir models]
+
+``--pid`` reports a running process and its children, e.g. a gunicorn
+master and its workers. ``--spawn N`` starts N independent processes.
+Each one loads the bundle and scores a few users, as a worker without
+``preload_app`` or a worker after a hot reload (model_registry.py) would.
+The processes are reported once all of them are ready.
+
+Per process, from /proc/<pid>/smaps_rollup:
+
+    RSS     resident pages, shared ones counted in full
+    PSS     resident pages, shared ones divided among the processes mapping them
+    USS     pages private to the process
+    Shared  resident pages also mapped by another process
+
+The sum of PSS is the physical memory the processes use together.
+Linux only.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+import model_bundle
+
+# Runs in each spawned process; prints 'ready' once the bundle is loaded and used
+_WORKER_PROGRAM = '''import sys
+import model_bundle
+from benchmark import sample_users
+from predict import get_feature_encoder, predict_enhanced_health_risks
+
+bundle = model_bundle.load_bundle({model_dir!r})
+get_feature_encoder(bundle)
+for user_data in sample_users(50):
+    predict_enhanced_health_risks(user_data, bundle)
+print('ready', flush=True)
+sys.stdin.read()
+'''
+
+
+def smaps_rollup(pid):
+    """Memory counters of ``pid`` in kB"""
+    counters = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                counters[parts[0].rstrip(':')] = int(parts[1])
+    return counters
+
+
+def process_memory(pid):
+    counters = smaps_rollup(pid)
+    return {
+        'pid': pid,
+        'rss': counters.get('Rss', 0),
+        'pss': counters.get('Pss', 0),
+        'uss': counters.get('Private_Clean', 0) + counters.get('Private_Dirty', 0),
+        'shared': counters.get('Shared_Clean', 0) + counters.get('Shared_Dirty', 0)
+    }
+
+
+def children(pid):
+    pids = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            pids.extend(int(child) for child in f.read().split())
+    return pids
+
+
+def print_report(rows, title):
+    print(title)
+    print(f"  {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9} {'Shared MB':>10}")
+    for row in rows:
+        print(f"  {row['pid']:>8} {row['rss'] / 1024:9.1f} {row['pss'] / 1024:9.1f} "
+              f"{row['uss'] / 1024:9.1f} {row['shared'] / 1024:10.1f}")
+    total = {key: sum(row[key] for row in rows) for key in ('rss', 'pss', 'uss', 'shared')}
+    print(f"  {'total':>8} {total['rss'] / 1024:9.1f} {total['pss'] / 1024:9.1f} "
+          f"{total['uss'] / 1024:9.1f} {total['shared'] / 1024:10.1f}")
+    return total
+
+
+def spawn_workers(n, model_dir):
+    """Start ``n`` processes that load the bundle; returns them once all are ready"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    program = _WORKER_PROGRAM.format(model_dir=model_dir)
+    workers = [
+        subprocess.Popen([sys.executable, '-c', program], cwd=here,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(n)
+    ]
+    for worker in workers:
+        if worker.stdout.readline().strip() != 'ready':
+            raise RuntimeError(f"Worker {worker.pid} failed to load {model_dir}")
+    return workers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report resident memory per serving process")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--pid', type=int, help="process to report together with its children")
+    source.add_argument('--spawn', type=int, metavar='N', help="start N processes that load the bundle")
+    parser.add_argument('--model-dir', default=model_bundle.MODEL_DIR, help="model bundle directory for --spawn")
+    args = parser.parse_args(argv)
+
+    if args.pid:
+        print_report([process_memory(pid) for pid in [args.pid, *children(args.pid)]],
+                     f"Process {args.pid} and its children:")
+        return
+
+    version = model_bundle.current_version(args.model_dir)
+    workers = spawn_workers(args.spawn, args.model_dir)
+    try:
+        print_report([process_memory(worker.pid) for worker in workers],
+                     f"{args.spawn} processes serving {version} from {args.model_dir}:")
+    finally:
+        for worker in workers:
+            worker.stdin.close()
+            worker.wait()
+
+
+if __name__ == "__main__":
+    main()
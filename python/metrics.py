@@ -0,0 +1,162 @@
+"""
+Per-stage latency histograms and deadline counters for the prediction path.
+
+``predict_enhanced_health_risks`` times each stage with ``perf_counter``
+and records it in ``PREDICTION_STAGE_SECONDS``, labeled by stage and risk
+type:
+
+    encode           user dict to feature row (risk_type="all")
+    scale            scaler.transform
+    predict_proba    model or compiled-tree probability
+    adjust           apply_clinical_adjustments
+    recommendations  recommendation profile (risk_type="all") and rules
+
+The batch predictor records the same stages per batch in
+``BATCH_STAGE_SECONDS``.
+
+Predictions with a deadline count, per risk type, the model inferences
+they waited for in ``DEADLINE_INFERENCES`` and those that missed the
+deadline and were served degraded in ``DEADLINE_MISSES``; their ratio is
+the timeout rate of each model.
+
+``render()`` returns every metric in the Prometheus text format, as
+served by ``/metrics`` in app.py and the Django urls. Metrics live in
+process memory, so each gunicorn worker reports its own.
+"""
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds, from 10us to 1s
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+
+class StageHistograms:
+    """Fixed-bucket histograms of one metric, one per (stage, risk_type).
+
+    ``observe`` records several stages of one risk type in a single call,
+    so a prediction takes the lock once per risk type rather than once
+    per stage.
+    """
+
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # (risk_type, stages) -> [bucket counts, sum] per stage
+        self._lock = threading.Lock()
+
+    def _new_series(self, key):
+        series = [[0] * (len(self.buckets) + 1) + [0.0] for _ in key[1]]
+        with self._lock:
+            return self._series.setdefault(key, series)
+
+    def observe(self, risk_type, stages, durations):
+        """Record ``durations[i]`` seconds for ``stages[i]`` of ``risk_type``"""
+        key = (risk_type, stages)
+        series = self._series.get(key) or self._new_series(key)
+        buckets = self.buckets
+        with self._lock:
+            for counts, seconds in zip(series, durations):
+                counts[bisect_left(buckets, seconds)] += 1
+                counts[-1] += seconds
+
+    def clear(self):
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self):
+        """``{(stage, risk_type): (bucket counts, sum)}`` with per-bucket counts"""
+        merged = {}
+        with self._lock:
+            for (risk_type, stages), series in self._series.items():
+                for stage, counts in zip(stages, series):
+                    previous = merged.get((stage, risk_type))
+                    if previous is None:
+                        merged[(stage, risk_type)] = (counts[:-1], counts[-1])
+                    else:
+                        merged[(stage, risk_type)] = (
+                            [a + b for a, b in zip(previous[0], counts[:-1])], previous[1] + counts[-1]
+                        )
+        return merged
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for (stage, risk_type), (counts, total) in sorted(self.snapshot().items()):
+            labels = f'stage="{stage}",risk_type="{risk_type}"'
+            cumulative = 0
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+class RiskTypeCounter:
+    """Monotonic counter with one series per risk type"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def inc(self, risk_type, amount=1):
+        with self._lock:
+            self._counts[risk_type] = self._counts.get(risk_type, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._counts = {}
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for risk_type, count in sorted(self.snapshot().items()):
+            lines.append(f'{self.name}{{risk_type="{risk_type}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+# Stage tuples passed to StageHistograms.observe
+MODEL_STAGES = ('scale', 'predict_proba', 'adjust', 'recommendations')
+INPUT_STAGES = ('encode', 'recommendations')
+BATCH_INPUT_STAGES = ('encode', 'adjust', 'recommendations')
+
+PREDICTION_STAGE_SECONDS = StageHistograms(
+    'health_prediction_stage_seconds',
+    'Time spent in each stage of a single-user prediction.'
+)
+BATCH_STAGE_SECONDS = StageHistograms(
+    'health_batch_prediction_stage_seconds',
+    'Time spent in each stage of a batch prediction, per batch.'
+)
+
+DEADLINE_INFERENCES = RiskTypeCounter(
+    'health_deadline_inferences_total',
+    'Model inferences of single-user predictions that ran under a deadline.'
+)
+DEADLINE_MISSES = RiskTypeCounter(
+    'health_deadline_misses_total',
+    'Model inferences that missed the prediction deadline and were served degraded.'
+)
+
+FAMILIES = (PREDICTION_STAGE_SECONDS, BATCH_STAGE_SECONDS, DEADLINE_INFERENCES, DEADLINE_MISSES)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    return ''.join(family.render() for family in FAMILIES)
+
+
+def clear():
+    for family in FAMILIES:
+        family.clear()
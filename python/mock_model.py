@@ -0,0 +1,718 @@
+"""
+The rule-based mock model, one user at a time or a whole cohort at once.
+
+``mock_predict_health_risks`` is the scalar reference that app.py and the
+Django views serve when no trained bundle is available. For large cohorts,
+``mock_predict_health_risks_batch`` computes the four risk formulas and the
+20 factor flags with NumPy over columns of inputs. Its results are
+identical to calling the scalar function on every user.
+
+    columns = encode_records(records)       # or build the columns directly
+    scores = mock_risk_scores(columns)      # {'risks', 'factors', 'valid'}
+    results = render_predictions(records, scores)
+
+Columns hold the values the scalar function reads after applying its
+defaults:
+- the numeric inputs as float64 (NUMERIC_COLUMNS)
+- the list-membership tests as bool (FLAG_COLUMNS)
+- the categorical answers as codes into CATEGORIES, from ``category_codes``
+
+Both compute the risks from the weighted sums in MOCK_RISK_RULES, with
+the scalar and vector evaluators of rules.py, so each risk matches bit
+for bit. A row whose
+inputs would make the scalar function raise, or whose risk is not
+finite, is marked invalid. ``render_predictions`` then hands that row to
+the scalar function, which also produces its exact error.
+"""
+import numpy as np
+
+import rules
+from rules import is_set
+
+
+# Rule-based stand-in for the trained models
+def mock_predict_health_risks(user_data):
+    """
+    Mock function to simulate model predictions with enhanced inputs
+    In a real app, this would use trained models
+    """
+    # Extract user data
+    age = user_data.get('age', 30)
+    bmi = user_data.get('bmi', 25)
+    if not bmi and 'weight' in user_data and 'height' in user_data:
+        weight = user_data.get('weight', 70)
+        height = user_data.get('height', 170)
+        bmi = weight / ((height / 100) ** 2)
+    
+    # Exercise data
+    exercise_freq = user_data.get('exerciseFrequency', 3)
+    if isinstance(exercise_freq, str):
+        exercise_map = {
+            'sedentary': 0,
+            'light': 2,
+            'moderate': 4,
+            'active': 6,
+            'very-active': 7
+        }
+        exercise_freq = exercise_map.get(exercise_freq, 3)
+    
+    exercise_types = user_data.get('exerciseTypes', [])
+    has_cardio = 'Cardio' in exercise_types
+    has_strength = 'Strength Training' in exercise_types
+    
+    # Sleep data
+    sleep_hours = user_data.get('sleepHours', 7)
+    sleep_quality = user_data.get('sleepQuality', 'average')
+    sleep_quality_score = {
+        'poor': 2,
+        'fair': 4,
+        'average': 6,
+        'good': 8,
+        'excellent': 10
+    }.get(sleep_quality, 6)
+    
+    # Diet data
+    diet_quality = user_data.get('diet_quality', 5)
+    if 'dietType' in user_data:
+        diet_map = {
+            'balanced': 7,
+            'vegetarian': 8,
+            'vegan': 8,
+            'keto': 6,
+            'paleo': 6,
+            'mediterranean': 9,
+            'high-protein': 7
+        }
+        diet_quality = diet_map.get(user_data['dietType'], 5)
+    
+    water_intake = user_data.get('waterIntake', 'moderate')
+    water_score = {
+        'low': 3,
+        'moderate': 7,
+        'high': 10
+    }.get(water_intake, 7)
+    
+    # Mental health data
+    stress_level = user_data.get('stressLevel', 5)
+    
+    anxiety_freq = user_data.get('anxietyFrequency', 'sometimes')
+    anxiety_score = {
+        'rarely': 2,
+        'sometimes': 5,
+        'often': 7,
+        'constantly': 9
+    }.get(anxiety_freq, 5)
+    
+    depression_freq = user_data.get('depressionFrequency', 'sometimes')
+    depression_score = {
+        'rarely': 2,
+        'sometimes': 5,
+        'often': 7,
+        'constantly': 9
+    }.get(depression_freq, 5)
+    
+    social_connections = user_data.get('socialConnections', 'moderate')
+    social_score = {
+        'limited': 3,
+        'moderate': 6,
+        'strong': 8,
+        'very-strong': 10
+    }.get(social_connections, 6)
+    
+    work_life_balance = user_data.get('workLifeBalance', 'moderate')
+    work_life_score = {
+        'poor': 2,
+        'fair': 4,
+        'moderate': 6,
+        'good': 8,
+        'excellent': 10
+    }.get(work_life_balance, 6)
+    
+    mindfulness_practice = user_data.get('mindfulnessPractice', 'never')
+    mindfulness_score = {
+        'never': 0,
+        'occasionally': 3,
+        'weekly': 7,
+        'daily': 10
+    }.get(mindfulness_practice, 0)
+    
+    # Physical health data
+    smoking_status = user_data.get('smokingStatus', 'non-smoker')
+    smoking_factor = {
+        'non-smoker': 0,
+        'former-smoker': 0.3,
+        'occasional': 0.5,
+        'regular': 1.0
+    }.get(smoking_status, 0)
+    
+    alcohol = user_data.get('alcoholConsumption', 'occasional')
+    alcohol_factor = {
+        'none': 0,
+        'occasional': 0.2,
+        'moderate': 0.5,
+        'heavy': 1.0
+    }.get(alcohol, 0.2)
+    
+    blood_pressure = user_data.get('bloodPressure', 'normal')
+    bp_factor = {
+        'low': 0.2,
+        'normal': 0,
+        'elevated': 0.3,
+        'high-stage1': 0.6,
+        'high-stage2': 1.0,
+        'unknown': 0.3
+    }.get(blood_pressure, 0)
+    
+    cholesterol = user_data.get('cholesterolLevels', 'normal')
+    chol_factor = {
+        'normal': 0,
+        'borderline': 0.5,
+        'high': 1.0,
+        'unknown': 0.3
+    }.get(cholesterol, 0)
+    
+    # Family history
+    family_history = user_data.get('familyHistory', [])
+    family_heart = 'Heart Disease' in family_history
+    family_diabetes = 'Diabetes' in family_history
+    family_mental = 'Mental Health Conditions' in family_history
+    
+    # Existing conditions
+    existing_conditions = user_data.get('existingConditions', [])
+    has_diabetes = 'Diabetes' in existing_conditions
+    has_hypertension = 'Hypertension' in existing_conditions
+    has_heart_disease = 'Heart Disease' in existing_conditions
+    has_anxiety = 'Anxiety Disorder' in existing_conditions
+    has_depression = 'Depression' in existing_conditions
+    
+    # Calculate risk scores (0-100) with MOCK_RISK_RULES
+    # Lower is better in our system
+    inputs = {
+        'age': age, 'bmi': bmi, 'exercise_freq': exercise_freq, 'sleep_hours': sleep_hours,
+        'diet_quality': diet_quality, 'stress_level': stress_level,
+        'sleep_quality_score': sleep_quality_score, 'water_score': water_score, 'anxiety_score': anxiety_score,
+        'depression_score': depression_score, 'social_score': social_score, 'work_life_score': work_life_score,
+        'mindfulness_score': mindfulness_score, 'smoking_factor': smoking_factor, 'alcohol_factor': alcohol_factor,
+        'bp_factor': bp_factor, 'chol_factor': chol_factor,
+        'has_cardio': has_cardio, 'family_heart': family_heart, 'family_diabetes': family_diabetes,
+        'family_mental': family_mental, 'has_diabetes': has_diabetes, 'has_heart_disease': has_heart_disease,
+        'has_anxiety': has_anxiety, 'has_depression': has_depression
+    }
+    cardio_risk = _ROW_EVALUATORS['cardiovascular'](inputs)
+    metabolic_risk = _ROW_EVALUATORS['metabolic'](inputs)
+    sleep_risk = _ROW_EVALUATORS['sleep'](inputs)
+    mental_risk = _ROW_EVALUATORS['mental'](inputs)
+    
+    # Generate recommendations with enhanced factors
+    predictions = {
+        'cardiovascular': {
+            'risk': cardio_risk,
+            'factors': [
+                {
+                    'name': 'Exercise',
+                    'impact': 'High positive impact' if exercise_freq >= 5 else 'Medium negative impact',
+                    'suggestion': 'Continue your regular exercise routine' if exercise_freq >= 5 else 'Aim for at least 150 minutes of moderate exercise weekly'
+                },
+                {
+                    'name': 'Diet',
+                    'impact': 'Medium positive impact' if diet_quality >= 7 else 'Medium negative impact',
+                    'suggestion': 'Maintain your heart-healthy diet' if diet_quality >= 7 else 'Consider reducing sodium and saturated fat intake'
+                },
+                {
+                    'name': 'Smoking',
+                    'impact': 'High positive impact' if smoking_status == 'non-smoker' else 'High negative impact',
+                    'suggestion': 'Continue avoiding tobacco products' if smoking_status == 'non-smoker' else 'Quitting smoking would significantly improve your cardiovascular health'
+                },
+                {
+                    'name': 'Blood Pressure',
+                    'impact': 'Low positive impact' if blood_pressure in ['normal', 'low'] else 'Medium negative impact',
+                    'suggestion': 'Continue monitoring your blood pressure regularly' if blood_pressure in ['normal', 'low'] else 'Consider lifestyle changes to improve blood pressure'
+                },
+                {
+                    'name': 'Family History',
+                    'impact': 'Medium negative impact' if family_heart else 'Low impact',
+                    'suggestion': 'Regular cardiovascular checkups are recommended' if family_heart else 'Continue heart-healthy practices'
+                }
+            ]
+        },
+        'metabolic': {
+            'risk': metabolic_risk,
+            'factors': [
+                {
+                    'name': 'Diet',
+                    'impact': 'High positive impact' if diet_quality >= 8 else 'Medium negative impact',
+                    'suggestion': 'Continue your balanced diet approach' if diet_quality >= 8 else 'Consider reducing processed carbohydrates and added sugars'
+                },
+                {
+                    'name': 'Exercise',
+                    'impact': 'Medium positive impact' if exercise_freq >= 4 and has_cardio else 'Medium negative impact',
+                    'suggestion': 'Your activity level is beneficial' if exercise_freq >= 4 and has_cardio else 'Adding cardio exercise would improve metabolic health'
+                },
+                {
+                    'name': 'Weight Management',
+                    'impact': 'Medium positive impact' if 18.5 <= bmi <= 24.9 else 'Medium negative impact',
+                    'suggestion': 'Your weight is in a healthy range' if 18.5 <= bmi <= 24.9 else 'A 5-10% weight adjustment would benefit your metabolic health'
+                },
+                {
+                    'name': 'Water Intake',
+                    'impact': 'Medium positive impact' if water_intake in ['moderate', 'high'] else 'Medium negative impact',
+                    'suggestion': 'Your hydration habits support good health' if water_intake in ['moderate', 'high'] else 'Increase water intake to at least 8 glasses daily'
+                },
+                {
+                    'name': 'Cholesterol',
+                    'impact': 'Medium positive impact' if cholesterol == 'normal' else 'Medium negative impact',
+                    'suggestion': 'Maintain your healthy cholesterol levels' if cholesterol == 'normal' else 'Consider dietary changes to improve cholesterol levels'
+                }
+            ]
+        },
+        'sleep': {
+            'risk': sleep_risk,
+            'factors': [
+                {
+                    'name': 'Sleep Duration',
+                    'impact': 'High positive impact' if 7 <= sleep_hours <= 8 else 'Medium negative impact',
+                    'suggestion': 'Your sleep duration is optimal' if 7 <= sleep_hours <= 8 else f'Aim for 7-8 hours of sleep instead of your current {sleep_hours} hours'
+                },
+                {
+                    'name': 'Sleep Quality',
+                    'impact': 'High positive impact' if sleep_quality in ['good', 'excellent'] else 'Medium negative impact',
+                    'suggestion': 'Your sleep quality is excellent' if sleep_quality in ['good', 'excellent'] else 'Improve your sleep environment for better quality rest'
+                },
+                {
+                    'name': 'Stress Management',
+                    'impact': 'Medium positive impact' if stress_level <= 4 else 'High negative impact',
+                    'suggestion': 'Your stress management is effective' if stress_level <= 4 else 'Try meditation or deep breathing before sleep'
+                },
+                {
+                    'name': 'Evening Routine',
+                    'impact': 'Medium impact',
+                    'suggestion': 'Avoid screens 1 hour before bedtime and maintain a consistent sleep schedule'
+                },
+                {
+                    'name': 'Mindfulness Practice',
+                    'impact': 'Medium positive impact' if mindfulness_practice in ['weekly', 'daily'] else 'Low negative impact',
+                    'suggestion': 'Your mindfulness practice supports good sleep' if mindfulness_practice in ['weekly', 'daily'] else 'Consider adding mindfulness to your bedtime routine'
+                }
+            ]
+        },
+        'mental': {
+            'risk': mental_risk,
+            'factors': [
+                {
+                    'name': 'Stress Management',
+                    'impact': 'High positive impact' if stress_level <= 3 else 'High negative impact',
+                    'suggestion': 'Your stress management techniques are working well' if stress_level <= 3 else 'Consider adding daily mindfulness practice to your routine'
+                },
+                {
+                    'name': 'Social Connections',
+                    'impact': 'High positive impact' if social_connections in ['strong', 'very-strong'] else 'Medium negative impact',
+                    'suggestion': 'Your social network provides excellent support' if social_connections in ['strong', 'very-strong'] else 'Try to increase meaningful social interactions weekly'
+                },
+                {
+                    'name': 'Work-Life Balance',
+                    'impact': 'Medium positive impact' if work_life_balance in ['good', 'excellent'] else 'Medium negative impact',
+                    'suggestion': 'Your balance is good; continue prioritizing personal time' if work_life_balance in ['good', 'excellent'] else 'Set clearer boundaries between work and personal time'
+                },
+                {
+                    'name': 'Physical Activity',
+                    'impact': 'Medium positive impact' if exercise_freq >= 3 else 'Medium negative impact',
+                    'suggestion': 'Regular exercise is benefiting your mental health' if exercise_freq >= 3 else 'Even short walks can improve mood and reduce anxiety'
+                },
+                {
+                    'name': 'Sleep Quality',
+                    'impact': 'Medium positive impact' if sleep_quality_score >= 7 else 'Medium negative impact',
+                    'suggestion': 'Your sleep pattern supports good mental health' if sleep_quality_score >= 7 else 'Improving sleep consistency could benefit your mental wellbeing'
+                }
+            ]
+        }
+    }
+    
+    return predictions
+
+
+# The risk formulas, as weighted sums of the inputs above (see rules.py)
+MOCK_RISK_RULES = {
+    # Cardiovascular risk - enhanced with new factors, capped between 10-90%
+    'cardiovascular': rules.weighted_sum([
+        rules.ratio(0.15, 'age', 80),
+        rules.hinge(0.15, 'bmi', 18.5, 15),
+        rules.complement(0.10, 7, 'exercise_freq', 7),
+        rules.value(0.10, 'smoking_factor'),
+        rules.value(0.10, 'alcohol_factor'),
+        rules.value(0.15, 'bp_factor'),
+        rules.value(0.10, 'chol_factor'),
+        rules.indicator(0.05, is_set('family_heart')),
+        rules.indicator(0.10, is_set('has_heart_disease'))
+    ], scale=100, low=10, high=90),
+    # Metabolic risk - enhanced with new factors, capped between 15-85%
+    'metabolic': rules.weighted_sum([
+        rules.hinge(0.20, 'bmi', 18.5, 15),
+        rules.complement(0.15, 10, 'diet_quality', 10),
+        rules.complement(0.10, 7, 'exercise_freq', 7),
+        rules.complement(0.10, 10, 'water_score', 10),
+        rules.value(0.15, 'chol_factor'),
+        rules.indicator(0.10, is_set('family_diabetes')),
+        rules.indicator(0.15, is_set('has_diabetes')),
+        rules.indicator(0.05, rules.negate(is_set('has_cardio')))
+    ], scale=100, low=15, high=85),
+    # Sleep risk - enhanced with new factors, capped between 20-80%
+    'sleep': rules.weighted_sum([
+        rules.ratio(0.20, 'stress_level', 10),
+        rules.complement(0.25, 10, 'sleep_quality_score', 10),
+        rules.distance(0.15, 'sleep_hours', 7.5, 3.5),
+        rules.value(0.10, 'alcohol_factor'),
+        rules.ratio(0.10, 'anxiety_score', 10),
+        rules.complement(0.10, 10, 'mindfulness_score', 10),
+        rules.complement(0.10, 10, 'work_life_score', 10)
+    ], scale=100, low=20, high=80),
+    # Mental health risk - enhanced with new factors, capped between 15-75%
+    'mental': rules.weighted_sum([
+        rules.ratio(0.15, 'stress_level', 10),
+        rules.ratio(0.15, 'anxiety_score', 10),
+        rules.ratio(0.15, 'depression_score', 10),
+        rules.complement(0.15, 10, 'social_score', 10),
+        rules.complement(0.10, 10, 'work_life_score', 10),
+        rules.complement(0.10, 10, 'mindfulness_score', 10),
+        rules.complement(0.05, 10, 'sleep_quality_score', 10),
+        rules.complement(0.05, 7, 'exercise_freq', 7),
+        rules.indicator(0.05, is_set('family_mental')),
+        rules.indicator(0.05, rules.any_of(is_set('has_anxiety'), is_set('has_depression')))
+    ], scale=100, low=15, high=75)
+}
+_ROW_EVALUATORS = {risk_type: rules.compile_scalar(table) for risk_type, table in MOCK_RISK_RULES.items()}
+_COLUMN_EVALUATORS = {risk_type: rules.compile_vector(table) for risk_type, table in MOCK_RISK_RULES.items()}
+
+# Lookup tables of mock_predict_health_risks, for the columnar version:
+# input key, default answer, score per answer, score for any other answer
+EXERCISE_FREQUENCY_SCORES = {'sedentary': 0, 'light': 2, 'moderate': 4, 'active': 6, 'very-active': 7}
+DIET_QUALITY_SCORES = {
+    'balanced': 7, 'vegetarian': 8, 'vegan': 8, 'keto': 6, 'paleo': 6, 'mediterranean': 9, 'high-protein': 7
+}
+CATEGORIES = {
+    'sleep_quality': ('sleepQuality', 'average', {'poor': 2, 'fair': 4, 'average': 6, 'good': 8, 'excellent': 10}, 6),
+    'water_intake': ('waterIntake', 'moderate', {'low': 3, 'moderate': 7, 'high': 10}, 7),
+    'anxiety_freq': ('anxietyFrequency', 'sometimes', {'rarely': 2, 'sometimes': 5, 'often': 7, 'constantly': 9}, 5),
+    'depression_freq': ('depressionFrequency', 'sometimes',
+                        {'rarely': 2, 'sometimes': 5, 'often': 7, 'constantly': 9}, 5),
+    'social_connections': ('socialConnections', 'moderate',
+                           {'limited': 3, 'moderate': 6, 'strong': 8, 'very-strong': 10}, 6),
+    'work_life_balance': ('workLifeBalance', 'moderate',
+                          {'poor': 2, 'fair': 4, 'moderate': 6, 'good': 8, 'excellent': 10}, 6),
+    'mindfulness_practice': ('mindfulnessPractice', 'never',
+                             {'never': 0, 'occasionally': 3, 'weekly': 7, 'daily': 10}, 0),
+    'smoking_status': ('smokingStatus', 'non-smoker',
+                       {'non-smoker': 0, 'former-smoker': 0.3, 'occasional': 0.5, 'regular': 1.0}, 0),
+    'alcohol': ('alcoholConsumption', 'occasional', {'none': 0, 'occasional': 0.2, 'moderate': 0.5, 'heavy': 1.0}, 0.2),
+    'blood_pressure': ('bloodPressure', 'normal', {
+        'low': 0.2, 'normal': 0, 'elevated': 0.3, 'high-stage1': 0.6, 'high-stage2': 1.0, 'unknown': 0.3
+    }, 0),
+    'cholesterol': ('cholesterolLevels', 'normal', {'normal': 0, 'borderline': 0.5, 'high': 1.0, 'unknown': 0.3}, 0)
+}
+# Input name of each category's score in MOCK_RISK_RULES
+SCORE_INPUTS = {
+    'sleep_quality': 'sleep_quality_score', 'water_intake': 'water_score', 'anxiety_freq': 'anxiety_score',
+    'depression_freq': 'depression_score', 'social_connections': 'social_score',
+    'work_life_balance': 'work_life_score', 'mindfulness_practice': 'mindfulness_score',
+    'smoking_status': 'smoking_factor', 'alcohol': 'alcohol_factor', 'blood_pressure': 'bp_factor',
+    'cholesterol': 'chol_factor'
+}
+
+NUMERIC_COLUMNS = ('age', 'bmi', 'exercise_freq', 'sleep_hours', 'diet_quality', 'stress_level')
+FLAG_COLUMNS = (
+    'has_cardio', 'family_heart', 'family_diabetes', 'family_mental',
+    'has_diabetes', 'has_heart_disease', 'has_anxiety', 'has_depression'
+)
+RISK_TYPES = ('cardiovascular', 'metabolic', 'sleep', 'mental')
+
+# Code of each answer; an answer outside the table gets len(table)
+_CODES = {field: {answer: code for code, answer in enumerate(table)} for field, (_, _, table, _) in CATEGORIES.items()}
+_SCORES = {
+    field: np.array([*table.values(), default], dtype=np.float64)
+    for field, (_, _, table, default) in CATEGORIES.items()
+}
+
+# Python floats and ints up to 2**53 convert to float64 without changing
+# the result of any formula; anything else goes to the scalar function
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _number(value):
+    if isinstance(value, float):
+        return value
+    if isinstance(value, int) and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT:
+        return float(value)
+    raise TypeError(f"Not a plain number: {value!r}")
+
+
+def category_codes(field, values):
+    """Codes of an array of answers for ``field`` of CATEGORIES"""
+    values = np.asarray(values)
+    codes = np.full(values.shape, len(_CODES[field]), dtype=np.int8)
+    for answer, code in _CODES[field].items():
+        codes[values == answer] = code
+    return codes
+
+
+def _record_row(user_data):
+    """Column values for one user, read as mock_predict_health_risks reads them"""
+    bmi = user_data.get('bmi', 25)
+    if not bmi and 'weight' in user_data and 'height' in user_data:
+        weight = user_data.get('weight', 70)
+        height = user_data.get('height', 170)
+        bmi = weight / ((height / 100) ** 2)
+
+    exercise_freq = user_data.get('exerciseFrequency', 3)
+    if isinstance(exercise_freq, str):
+        exercise_freq = EXERCISE_FREQUENCY_SCORES.get(exercise_freq, 3)
+
+    diet_quality = user_data.get('diet_quality', 5)
+    if 'dietType' in user_data:
+        diet_quality = DIET_QUALITY_SCORES.get(user_data['dietType'], 5)
+
+    exercise_types = user_data.get('exerciseTypes', [])
+    family_history = user_data.get('familyHistory', [])
+    existing_conditions = user_data.get('existingConditions', [])
+
+    return (
+        _number(user_data.get('age', 30)),
+        _number(bmi),
+        _number(exercise_freq),
+        _number(user_data.get('sleepHours', 7)),
+        _number(diet_quality),
+        _number(user_data.get('stressLevel', 5)),
+        'Cardio' in exercise_types,
+        'Heart Disease' in family_history,
+        'Diabetes' in family_history,
+        'Mental Health Conditions' in family_history,
+        'Diabetes' in existing_conditions,
+        'Heart Disease' in existing_conditions,
+        'Anxiety Disorder' in existing_conditions,
+        'Depression' in existing_conditions,
+        *(
+            _CODES[field].get(user_data.get(key, default), len(table))
+            for field, (key, default, table, _) in CATEGORIES.items()
+        )
+    )
+
+
+def encode_records(records):
+    """Columns for ``mock_risk_scores`` from a list of user dicts.
+
+    ``valid`` is False for users the columns cannot represent exactly.
+    """
+    width = len(NUMERIC_COLUMNS) + len(FLAG_COLUMNS) + len(CATEGORIES)
+    placeholder = (0.0,) * len(NUMERIC_COLUMNS) + (False,) * len(FLAG_COLUMNS) + (0,) * len(CATEGORIES)
+    rows = []
+    valid = np.ones(len(records), dtype=bool)
+    for i, user_data in enumerate(records):
+        try:
+            rows.append(_record_row(user_data))
+        except Exception:
+            rows.append(placeholder)
+            valid[i] = False
+
+    values = iter(zip(*rows) if rows else [()] * width)
+    columns = {'valid': valid}
+    for names, dtype in ((NUMERIC_COLUMNS, np.float64), (FLAG_COLUMNS, np.bool_), (CATEGORIES, np.int8)):
+        for name in names:
+            columns[name] = np.array(next(values), dtype=dtype)
+    return columns
+
+
+def mock_risk_scores(columns):
+    """The four risks and the factor flags for every row of ``columns``.
+
+    Returns ``risks`` (int64 per risk type), ``factors`` (bool array of
+    shape (n, 5) per risk type, True where the positive variant of the
+    factor applies) and ``valid``.
+    """
+    bmi = columns['bmi']
+    exercise_freq = columns['exercise_freq']
+    sleep_hours = columns['sleep_hours']
+    diet_quality = columns['diet_quality']
+    stress_level = columns['stress_level']
+
+    inputs = {name: columns[name] for name in NUMERIC_COLUMNS + FLAG_COLUMNS}
+    for field, name in SCORE_INPUTS.items():
+        inputs[name] = _SCORES[field][columns[field]]
+    inputs = rules.Columns(inputs)
+    sleep_quality_score = inputs.values('sleep_quality_score')
+
+    valid = np.ones(len(bmi), dtype=bool) if 'valid' not in columns else columns['valid'].copy()
+    risks = {}
+    for risk_type in RISK_TYPES:
+        # nan where the scalar function's int() raises on a non-finite total
+        risk = _COLUMN_EVALUATORS[risk_type](inputs)
+        finite = ~np.isnan(risk)
+        valid &= finite
+        risks[risk_type] = np.where(finite, risk, 0).astype(np.int64)
+
+    codes = {field: columns[field] for field in CATEGORIES}
+
+    def answered(field, *answers):
+        return np.isin(codes[field], [_CODES[field][answer] for answer in answers])
+
+    factors = {
+        'cardiovascular': np.column_stack([
+            exercise_freq >= 5,
+            diet_quality >= 7,
+            answered('smoking_status', 'non-smoker'),
+            answered('blood_pressure', 'normal', 'low'),
+            columns['family_heart']
+        ]),
+        'metabolic': np.column_stack([
+            diet_quality >= 8,
+            (exercise_freq >= 4) & columns['has_cardio'],
+            (18.5 <= bmi) & (bmi <= 24.9),
+            answered('water_intake', 'moderate', 'high'),
+            answered('cholesterol', 'normal')
+        ]),
+        'sleep': np.column_stack([
+            (7 <= sleep_hours) & (sleep_hours <= 8),
+            answered('sleep_quality', 'good', 'excellent'),
+            stress_level <= 4,
+            np.ones(len(bmi), dtype=bool),
+            answered('mindfulness_practice', 'weekly', 'daily')
+        ]),
+        'mental': np.column_stack([
+            stress_level <= 3,
+            answered('social_connections', 'strong', 'very-strong'),
+            answered('work_life_balance', 'good', 'excellent'),
+            exercise_freq >= 3,
+            sleep_quality_score >= 7
+        ])
+    }
+
+    return {
+        'risks': risks,
+        'factors': factors,
+        'valid': valid
+    }
+
+
+def _factor(name, impact, suggestion):
+    return {'name': name, 'impact': impact, 'suggestion': suggestion}
+
+
+# (positive, negative) variant of every factor, in output order; the
+# negative Sleep Duration suggestion names the user's hours and is
+# rendered per user
+FACTOR_VARIANTS = {
+    'cardiovascular': [
+        (_factor('Exercise', 'High positive impact', 'Continue your regular exercise routine'),
+         _factor('Exercise', 'Medium negative impact', 'Aim for at least 150 minutes of moderate exercise weekly')),
+        (_factor('Diet', 'Medium positive impact', 'Maintain your heart-healthy diet'),
+         _factor('Diet', 'Medium negative impact', 'Consider reducing sodium and saturated fat intake')),
+        (_factor('Smoking', 'High positive impact', 'Continue avoiding tobacco products'),
+         _factor('Smoking', 'High negative impact',
+                 'Quitting smoking would significantly improve your cardiovascular health')),
+        (_factor('Blood Pressure', 'Low positive impact', 'Continue monitoring your blood pressure regularly'),
+         _factor('Blood Pressure', 'Medium negative impact', 'Consider lifestyle changes to improve blood pressure')),
+        (_factor('Family History', 'Medium negative impact', 'Regular cardiovascular checkups are recommended'),
+         _factor('Family History', 'Low impact', 'Continue heart-healthy practices'))
+    ],
+    'metabolic': [
+        (_factor('Diet', 'High positive impact', 'Continue your balanced diet approach'),
+         _factor('Diet', 'Medium negative impact', 'Consider reducing processed carbohydrates and added sugars')),
+        (_factor('Exercise', 'Medium positive impact', 'Your activity level is beneficial'),
+         _factor('Exercise', 'Medium negative impact', 'Adding cardio exercise would improve metabolic health')),
+        (_factor('Weight Management', 'Medium positive impact', 'Your weight is in a healthy range'),
+         _factor('Weight Management', 'Medium negative impact',
+                 'A 5-10% weight adjustment would benefit your metabolic health')),
+        (_factor('Water Intake', 'Medium positive impact', 'Your hydration habits support good health'),
+         _factor('Water Intake', 'Medium negative impact', 'Increase water intake to at least 8 glasses daily')),
+        (_factor('Cholesterol', 'Medium positive impact', 'Maintain your healthy cholesterol levels'),
+         _factor('Cholesterol', 'Medium negative impact', 'Consider dietary changes to improve cholesterol levels'))
+    ],
+    'sleep': [
+        (_factor('Sleep Duration', 'High positive impact', 'Your sleep duration is optimal'), None),
+        (_factor('Sleep Quality', 'High positive impact', 'Your sleep quality is excellent'),
+         _factor('Sleep Quality', 'Medium negative impact', 'Improve your sleep environment for better quality rest')),
+        (_factor('Stress Management', 'Medium positive impact', 'Your stress management is effective'),
+         _factor('Stress Management', 'High negative impact', 'Try meditation or deep breathing before sleep')),
+        (_factor('Evening Routine', 'Medium impact',
+                 'Avoid screens 1 hour before bedtime and maintain a consistent sleep schedule'), None),
+        (_factor('Mindfulness Practice', 'Medium positive impact', 'Your mindfulness practice supports good sleep'),
+         _factor('Mindfulness Practice', 'Low negative impact', 'Consider adding mindfulness to your bedtime routine'))
+    ],
+    'mental': [
+        (_factor('Stress Management', 'High positive impact', 'Your stress management techniques are working well'),
+         _factor('Stress Management', 'High negative impact',
+                 'Consider adding daily mindfulness practice to your routine')),
+        (_factor('Social Connections', 'High positive impact', 'Your social network provides excellent support'),
+         _factor('Social Connections', 'Medium negative impact',
+                 'Try to increase meaningful social interactions weekly')),
+        (_factor('Work-Life Balance', 'Medium positive impact',
+                 'Your balance is good; continue prioritizing personal time'),
+         _factor('Work-Life Balance', 'Medium negative impact', 'Set clearer boundaries between work and personal time')),
+        (_factor('Physical Activity', 'Medium positive impact', 'Regular exercise is benefiting your mental health'),
+         _factor('Physical Activity', 'Medium negative impact', 'Even short walks can improve mood and reduce anxiety')),
+        (_factor('Sleep Quality', 'Medium positive impact', 'Your sleep pattern supports good mental health'),
+         _factor('Sleep Quality', 'Medium negative impact',
+                 'Improving sleep consistency could benefit your mental wellbeing'))
+    ]
+}
+
+_FLAG_BITS = 1 << np.arange(5)
+
+# Factor list for every combination of the five flags of a risk type
+_FACTOR_LISTS = {
+    risk_type: [
+        [positive if mask >> bit & 1 else negative for bit, (positive, negative) in enumerate(variants)]
+        for mask in range(1 << len(variants))
+    ]
+    for risk_type, variants in FACTOR_VARIANTS.items()
+}
+
+
+def render_predictions(records, scores):
+    """Prediction dicts in the scalar function's format, one per record.
+
+    Invalid rows are computed by mock_predict_health_risks, or become
+    ``{'error': ...}`` if it raises. Factor lists are shared between rows
+    and must not be modified.
+    """
+    columns = [scores['valid'].tolist()]
+    for risk_type in RISK_TYPES:
+        columns.append(scores['risks'][risk_type].tolist())
+        columns.append((scores['factors'][risk_type] @ _FLAG_BITS).tolist())
+    cardio_lists, metabolic_lists, sleep_lists, mental_lists = (_FACTOR_LISTS[risk_type] for risk_type in RISK_TYPES)
+    short_sleep_lists = {}
+
+    results = []
+    for user_data, ok, cardio, cardio_mask, metabolic, metabolic_mask, sleep, sleep_mask, mental, mental_mask in zip(
+        records, *columns
+    ):
+        if not ok:
+            try:
+                results.append(mock_predict_health_risks(user_data))
+            except Exception as e:
+                results.append({'error': str(e)})
+            continue
+
+        sleep_factors = sleep_lists[sleep_mask]
+        if not sleep_mask & 1:
+            sleep_hours = user_data.get('sleepHours', 7)
+            key = (sleep_mask, f'{sleep_hours}')
+            if key not in short_sleep_lists:
+                short_sleep_lists[key] = [_factor(
+                    'Sleep Duration', 'Medium negative impact',
+                    f'Aim for 7-8 hours of sleep instead of your current {sleep_hours} hours'
+                ), *sleep_factors[1:]]
+            sleep_factors = short_sleep_lists[key]
+
+        results.append({
+            'cardiovascular': {'risk': cardio, 'factors': cardio_lists[cardio_mask]},
+            'metabolic': {'risk': metabolic, 'factors': metabolic_lists[metabolic_mask]},
+            'sleep': {'risk': sleep, 'factors': sleep_factors},
+            'mental': {'risk': mental, 'factors': mental_lists[mental_mask]}
+        })
+    return results
+
+
+def mock_predict_health_risks_batch(records):
+    """``[mock_predict_health_risks(r) for r in records]``, computed column-wise.
+
+    A user the scalar function raises for gets ``{'error': ...}``.
+    """
+    return render_predictions(records, mock_risk_scores(encode_records(records)))
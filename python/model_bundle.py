@@ -0,0 +1,211 @@
+"""
+Versioned on-disk model bundles.
+
+A bundle is everything ``predict_enhanced_health_risks`` needs at request
+time: the fitted models and scalers per risk type, NumPy exports of the
+tree-ensemble models (tree_export.py), the label encoders,
+``model_performance`` and the feature schema the models were trained on.
+
+Layout under a model directory::
+
+    models/
+        VERSION                       # name of the current bundle version
+        <version>/manifest.json       # format, schema and performance, human readable
+        <version>/bundle.joblib       # scalers, encoders, models without a tree export
+        <version>/estimators.joblib   # sklearn models that have a tree export
+        <version>/trees/<type>.<array>.npy  # exported tree node arrays
+
+The node arrays are the bulk of a bundle. They are loaded with
+``np.load(mmap_mode='r')``, so every process serving the same version
+maps one copy from the page cache instead of holding its own. The sklearn
+estimators in estimators.joblib are only read when a batch is too large
+for the NumPy tree walk (see ``predict.COMPILED_MAX_ROWS``), which
+single-user serving never does.
+
+Saving never touches an existing version, and ``VERSION`` is switched with
+an atomic rename, so a reader always sees a complete bundle. Format 1
+bundles (a single bundle.joblib) still load.
+"""
+import json
+import os
+import threading
+import uuid
+from collections.abc import Mapping
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+from tree_export import CompiledTreeEnsemble
+
+BUNDLE_FORMAT = 2
+SUPPORTED_FORMATS = (1, 2)
+
+MODEL_DIR = os.environ.get(
+    'HEALTH_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+)
+
+VERSION_FILE = 'VERSION'
+MANIFEST_FILE = 'manifest.json'
+ARTIFACT_FILE = 'bundle.joblib'
+ESTIMATOR_FILE = 'estimators.joblib'
+TREE_DIR = 'trees'
+
+
+def build_feature_schema(feature_columns, encoders, family_conditions, existing_conditions,
+                         risk_threshold):
+    """Describe the model inputs in plain JSON-serializable types"""
+    return {
+        'feature_columns': list(feature_columns),
+        'encoders': {name: [str(c) for c in encoder.classes_] for name, encoder in encoders.items()},
+        'family_conditions': list(family_conditions),
+        'existing_conditions': list(existing_conditions),
+        'risk_threshold': risk_threshold
+    }
+
+
+def new_version():
+    """Sortable, unique version name such as ``20240101T120000Z-1a2b3c``"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return f'{stamp}-{uuid.uuid4().hex[:6]}'
+
+
+def save_bundle(bundle, model_dir=MODEL_DIR):
+    """Write ``bundle`` as a new version and make it the current one.
+
+    Returns the version name.
+    """
+    version = bundle.get('version') or new_version()
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=False)
+
+    compiled = bundle.get('compiled', {})
+    os.makedirs(os.path.join(version_dir, TREE_DIR))
+    compiled_index = {}
+    for risk_type, ensemble in compiled.items():
+        arrays = {}
+        for name, array in ensemble.arrays().items():
+            arrays[name] = os.path.join(TREE_DIR, f'{risk_type}.{name}.npy')
+            np.save(os.path.join(version_dir, arrays[name]), np.ascontiguousarray(array))
+        compiled_index[risk_type] = {'params': ensemble.params(), 'arrays': arrays}
+
+    joblib.dump({
+        'models': {rt: model for rt, model in bundle['models'].items() if rt not in compiled},
+        'compiled': compiled_index,
+        'scalers': bundle['scalers'],
+        'encoders': bundle['encoders']
+    }, os.path.join(version_dir, ARTIFACT_FILE))
+    joblib.dump(
+        {rt: model for rt, model in bundle['models'].items() if rt in compiled},
+        os.path.join(version_dir, ESTIMATOR_FILE)
+    )
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'risk_types': list(bundle['models']),
+        'model_performance': bundle['model_performance'],
+        'feature_schema': bundle['feature_schema'],
+        'training': bundle.get('training', {})
+    }
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, default=float)
+
+    # Point VERSION at the new bundle last so readers never see a partial one
+    tmp_path = os.path.join(model_dir, f'.{VERSION_FILE}.{uuid.uuid4().hex}')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(model_dir, VERSION_FILE))
+
+    return version
+
+
+def current_version(model_dir=MODEL_DIR):
+    """Version named in ``model_dir/VERSION``"""
+    version_path = os.path.join(model_dir, VERSION_FILE)
+    if not os.path.exists(version_path):
+        raise FileNotFoundError(f"No model bundle found in {model_dir}")
+    with open(version_path) as f:
+        return f.read().strip()
+
+
+def load_bundle(model_dir=MODEL_DIR, version=None):
+    """Load a bundle; the current version unless ``version`` is given"""
+    version = version or current_version(model_dir)
+    version_dir = os.path.join(model_dir, version)
+
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['format'] not in SUPPORTED_FORMATS:
+        raise ValueError(
+            f"Unsupported model bundle format {manifest['format']} in {version_dir}"
+        )
+
+    artifacts = joblib.load(os.path.join(version_dir, ARTIFACT_FILE))
+    if manifest['format'] == 1:
+        models = artifacts['models']
+        compiled = artifacts.get('compiled', {})
+    else:
+        compiled = {
+            risk_type: _load_compiled(version_dir, entry)
+            for risk_type, entry in artifacts['compiled'].items()
+        }
+        models = LazyModels(
+            manifest['risk_types'], artifacts['models'], os.path.join(version_dir, ESTIMATOR_FILE)
+        )
+
+    return {
+        'version': manifest['version'],
+        'created_at': manifest['created_at'],
+        'models': models,
+        'compiled': compiled,
+        'scalers': artifacts['scalers'],
+        'encoders': artifacts['encoders'],
+        'model_performance': manifest['model_performance'],
+        'feature_schema': manifest['feature_schema'],
+        'training': manifest.get('training', {})
+    }
+
+
+def _load_compiled(version_dir, entry):
+    """CompiledTreeEnsemble over read-only memory maps of its node arrays"""
+    arrays = {
+        # Plain ndarray views of the maps; np.memmap results would wrap
+        # every indexing result in a memmap subclass
+        name: np.asarray(np.load(os.path.join(version_dir, path), mmap_mode='r'))
+        for name, path in entry['arrays'].items()
+    }
+    return CompiledTreeEnsemble(**entry['params'], **arrays)
+
+
+class LazyModels(Mapping):
+    """``bundle['models']`` whose estimators.joblib part loads on first access.
+
+    Iterating yields the risk types without loading anything.
+    """
+
+    def __init__(self, risk_types, models, path):
+        self._risk_types = list(risk_types)
+        self._models = dict(models)
+        self._path = path
+        self._lock = threading.Lock()
+
+    def __getitem__(self, risk_type):
+        if risk_type not in self._models:
+            if risk_type not in self._risk_types:
+                raise KeyError(risk_type)
+            with self._lock:
+                if risk_type not in self._models:
+                    self._models.update(joblib.load(self._path))
+        return self._models[risk_type]
+
+    def __iter__(self):
+        return iter(self._risk_types)
+
+    def __len__(self):
+        return len(self._risk_types)
+
+    def is_loaded(self, risk_type):
+        return risk_type in self._models
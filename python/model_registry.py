@@ -0,0 +1,184 @@
+"""
+Process-wide model registry with hot reload.
+
+Request handlers borrow the current bundle with ``lease()``:
+
+    with get_registry().lease() as bundle:
+        predictions = predict_enhanced_health_risks(user_data, bundle)
+
+The registry loads the bundle once. While serving, it checks the mtime of
+the model directory's VERSION file at most once per ``check_interval``
+seconds. When train.py publishes a new version, the registry loads it on
+a background thread and then swaps it in. Requests keep being served from
+the old bundle during the load and never wait for it. Leases are
+refcounted, so a replaced bundle stays referenced until the last request
+using it finishes.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import model_bundle
+from predict import get_feature_encoder
+
+
+class _Entry:
+    """A loaded bundle and the number of requests currently using it"""
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.version = bundle['version']
+        self.refs = 0
+
+
+class ModelRegistry:
+    """Loads, leases and hot-swaps model bundles from one model directory"""
+
+    def __init__(self, model_dir=model_bundle.MODEL_DIR, check_interval=2.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._current = None
+        self._retired = {}  # version -> _Entry still leased by in-flight requests
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._next_check = 0.0
+        self._version_mtime = None
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def _version_path(self):
+        return os.path.join(self.model_dir, model_bundle.VERSION_FILE)
+
+    def _load(self, version=None):
+        """Load a bundle and prepare it for serving"""
+        mtime = os.stat(self._version_path()).st_mtime_ns
+        bundle = model_bundle.load_bundle(self.model_dir, version)
+        get_feature_encoder(bundle)
+        return bundle, mtime
+
+    def _swap(self, bundle, mtime):
+        with self._lock:
+            old = self._current
+            self._current = _Entry(bundle)
+            self._version_mtime = mtime
+            if old is not None and old.refs > 0:
+                self._retired[old.version] = old
+
+    def load(self):
+        """Load the current version synchronously and make it active"""
+        with self._load_lock:
+            bundle, mtime = self._load()
+            self._swap(bundle, mtime)
+        return bundle
+
+    def _background_reload(self):
+        try:
+            with self._load_lock:
+                mtime = os.stat(self._version_path()).st_mtime_ns
+                if model_bundle.current_version(self.model_dir) == self._current.version:
+                    # VERSION was rewritten with the version already active
+                    self._version_mtime = mtime
+                    return
+                bundle, mtime = self._load()
+                self._swap(bundle, mtime)
+            self.reloads += 1
+        except Exception:
+            # Keep serving the current bundle; the next check retries
+            self.reload_errors += 1
+            with self._lock:
+                self._version_mtime = None
+        finally:
+            self._loading = False
+
+    def _poll(self):
+        """Start a background reload if VERSION changed; throttled"""
+        now = time.monotonic()
+        if now < self._next_check or self._loading:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self._version_path()).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._version_mtime or self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._background_reload, name='model-reload', daemon=True).start()
+
+    def _ensure_loaded(self):
+        if self._current is None:
+            with self._load_lock:
+                if self._current is None:
+                    bundle, mtime = self._load()
+                    self._swap(bundle, mtime)
+        else:
+            self._poll()
+
+    def _acquire(self):
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._current
+            entry.refs += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs == 0 and entry is not self._current:
+                self._retired.pop(entry.version, None)
+
+    @contextmanager
+    def lease(self):
+        """Borrow the current bundle for the duration of one request.
+
+        Loads the bundle on first use, so raises FileNotFoundError if the
+        model directory has none.
+        """
+        entry = self._acquire()
+        try:
+            yield entry.bundle
+        finally:
+            self._release(entry)
+
+    def current(self):
+        """The active bundle, without taking a lease.
+
+        For reads such as its version or feature encoder. The bundle can be
+        replaced at any time, so scoring must use ``lease()``.
+        """
+        self._ensure_loaded()
+        return self._current.bundle
+
+    def is_loaded(self):
+        return self._current is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self._current.version if self._current else None,
+                'active_leases': {
+                    entry.version: entry.refs
+                    for entry in [self._current, *self._retired.values()] if entry is not None
+                },
+                'reloads': self.reloads,
+                'reload_errors': self.reload_errors
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry for the default model directory"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    check_interval=float(os.environ.get('HEALTH_MODEL_CHECK_INTERVAL', 2.0))
+                )
+    return _registry
@@ -1,30 +1,113 @@
-import pandas as pd
+"""
+Data generation, risk labeling, feature preparation and prediction.
+
+Only numpy is imported at module level. The serving path (encoding,
+prediction, adjustments, recommendations) never needs pandas or
+scikit-learn beyond what unpickling the bundle loads. The generator,
+labelers and feature preparation used by train.py import them on first
+use.
+
+    HEALTH_DEADLINE_MS       default latency budget of a single-user
+                             prediction, unset or 0 for none
+    HEALTH_DEADLINE_WORKERS  threads that run models under a budget (default 4)
+"""
+import os
+import sys
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from time import perf_counter
+from types import MappingProxyType
+
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
-import joblib
-import warnings
-warnings.filterwarnings('ignore')
-
-# Enhanced synthetic data generation with more realistic health patterns
-def generate_enhanced_synthetic_data(n_samples=5000):
-    np.random.seed(42)
+
+import metrics
+import rules
+from rules import above, all_of, any_of, at_least, at_most, below, between, equals, has, one_of
+
+# Category vocabularies shared by the generator, the labelers and the feature pipeline
+BLOOD_PRESSURE_CATEGORIES = ['normal', 'elevated', 'stage1', 'stage2']
+CHOLESTEROL_CATEGORIES = ['normal', 'borderline', 'high']
+BLOOD_SUGAR_CATEGORIES = ['70-100', '101-125', '126+', 'dont-know']
+FAMILY_CONDITIONS = ['heart-disease', 'diabetes', 'cancer', 'hypertension', 'stroke', 'mental-health']
+EXISTING_CONDITIONS = ['heart-disease', 'diabetes', 'hypertension', 'mental-health']
+
+
+def _sample_categorical(rng, low, high, risk):
+    """Draw one category index per row by inverse-CDF sampling.
+
+    Each row's probability vector is ``low * (1 - risk) + high * risk``.
+    Because that blend is linear, the row's CDF is the same blend of the
+    two cumulative vectors, so the per-row CDF matrix is built one column
+    at a time and compared against a single uniform draw per row. This
+    replaces one ``np.random.choice`` call per row.
+    """
+    low_cdf = np.cumsum(low) / np.sum(low)
+    high_cdf = np.cumsum(high) / np.sum(high)
+    u = rng.random(len(risk))
+    codes = np.zeros(len(risk), dtype=np.int8)
+    for lo, hi in zip(low_cdf[:-1], high_cdf[:-1]):
+        codes += u >= lo + (hi - lo) * risk
+    return codes
+
+
+def _sample_condition_masks(rng, counts, n_conditions):
+    """Bitmask of ``counts[i]`` distinct conditions drawn uniformly per row.
+
+    Draws without replacement by sequential index sampling: the k-th pick is
+    uniform over the remaining slots and is shifted past the ones already
+    taken. Supports up to three picks per row.
+    """
+    n_rows = len(counts)
+    first = rng.integers(0, n_conditions, n_rows)
+    second = rng.integers(0, n_conditions - 1, n_rows)
+    second += second >= first
+    third = rng.integers(0, n_conditions - 2, n_rows)
+    third += third >= np.minimum(first, second)
+    third += third >= np.maximum(first, second)
+    
+    mask = np.where(counts >= 1, 1 << first, 0)
+    mask |= np.where(counts >= 2, 1 << second, 0)
+    mask |= np.where(counts >= 3, 1 << third, 0)
+    return mask
+
+
+def _mask_lookup(conditions):
+    """Tuple of condition names for every bitmask over ``conditions``.
+
+    Mask 0 maps to ``('none',)``, matching the per-row lists the generator
+    used to build. Tuples are immutable, so rows can share them safely.
+    """
+    lookup = np.empty(1 << len(conditions), dtype=object)
+    for mask in range(len(lookup)):
+        names = tuple(c for bit, c in enumerate(conditions) if mask & (1 << bit))
+        lookup[mask] = names or ('none',)
+    return lookup
+
+
+def generate_enhanced_synthetic_data(n_samples=5000, seed=42):
+    """Generate a labeled-ready synthetic population, fully vectorized.
+
+    Reproducibility contract: the output is a pure function of
+    ``(n_samples, seed)``. Every column is drawn from a dedicated
+    ``numpy.random.Generator`` seeded with ``seed`` in a fixed order, so
+    the same arguments give an identical DataFrame on every run and
+    platform, and the global ``np.random`` state is left untouched.
+    """
+    import pandas as pd
+    rng = np.random.default_rng(seed)
     
     # Generate features with realistic correlations
-    age = np.random.randint(18, 85, n_samples)
-    gender = np.random.choice(['male', 'female'], n_samples)
+    age = rng.integers(18, 85, n_samples)
+    gender = rng.integers(0, 2, n_samples)
     
     # Weight and height with realistic distributions
-    height_cm = np.random.normal(170, 10, n_samples)  # cm
+    height_cm = rng.normal(170, 10, n_samples)  # cm
     height_cm = np.clip(height_cm, 140, 210)
     
     # Weight correlated with height and age
     base_weight = (height_cm - 100) * 0.9  # Rough BMI calculation
-    weight_variation = np.random.normal(0, 10, n_samples)
+    weight_variation = rng.normal(0, 10, n_samples)
     age_weight_factor = (age - 25) * 0.2  # Weight tends to increase with age
     weight = base_weight + weight_variation + age_weight_factor
     weight = np.clip(weight, 35, 200)
@@ -33,1163 +116,1175 @@ def generate_enhanced_synthetic_data(n_samples=5000):
     bmi = weight / ((height_cm / 100) ** 2)
     
     # Exercise frequency influenced by age and BMI
-    exercise_base = np.random.choice([0, 1, 2, 3, 4, 5, 6, 7], n_samples, 
-                                   p=[0.15, 0.1, 0.15, 0.2, 0.15, 0.1, 0.1, 0.05])
-    age_exercise_penalty = np.where(age > 60, np.random.choice([-2, -1, 0], n_samples), 0)
-    bmi_exercise_penalty = np.where(bmi > 30, np.random.choice([-2, -1, 0], n_samples), 0)
+    exercise_base = rng.choice(8, n_samples, p=[0.15, 0.1, 0.15, 0.2, 0.15, 0.1, 0.1, 0.05])
+    age_exercise_penalty = np.where(age > 60, rng.integers(-2, 1, n_samples), 0)
+    bmi_exercise_penalty = np.where(bmi > 30, rng.integers(-2, 1, n_samples), 0)
     exercise_frequency = np.clip(exercise_base + age_exercise_penalty + bmi_exercise_penalty, 0, 7)
     
     # Sleep hours with realistic distribution
-    sleep_hours = np.random.normal(7.5, 1.2, n_samples)
+    sleep_hours = rng.normal(7.5, 1.2, n_samples)
     sleep_hours = np.clip(sleep_hours, 4, 12)
     
     # Sleep quality correlated with stress and age
-    stress_level = np.random.randint(1, 11, n_samples)
-    sleep_quality_base = np.random.choice(['poor', 'fair', 'average', 'good', 'excellent'], n_samples,
-                                        p=[0.1, 0.2, 0.4, 0.25, 0.05])
+    stress_level = rng.integers(1, 11, n_samples)
+    sleep_quality = rng.choice(5, n_samples, p=[0.1, 0.2, 0.4, 0.25, 0.05])
     
     # Diet quality influenced by age, education, and income (simulated)
-    diet_quality = np.random.randint(1, 11, n_samples)
+    diet_quality = rng.integers(1, 11, n_samples)
     
-    # Smoking status with age correlation
-    smoking_prob = np.where(age < 30, 0.15, np.where(age < 50, 0.25, 0.2))
-    smoking_status = np.random.choice(['non-smoker', 'former-smoker', 'occasional', 'regular'], 
-                                    n_samples, p=[0.6, 0.25, 0.1, 0.05])
+    # Smoking status
+    smoking_status = rng.choice(4, n_samples, p=[0.6, 0.25, 0.1, 0.05])
     
     # Alcohol consumption
-    alcohol_consumption = np.random.choice(['none', 'occasional', 'moderate', 'heavy'], 
-                                         n_samples, p=[0.3, 0.4, 0.25, 0.05])
+    alcohol_consumption = rng.choice(4, n_samples, p=[0.3, 0.4, 0.25, 0.05])
     
     # Blood pressure influenced by age, BMI, stress, and genetics
     bp_risk = (age - 20) * 0.02 + (bmi - 25) * 0.05 + stress_level * 0.03
-    bp_categories = ['normal', 'elevated', 'stage1', 'stage2']
-    bp_probs = np.array([0.6, 0.2, 0.15, 0.05])
-    
-    # Adjust probabilities based on risk factors
     bp_risk_normalized = np.clip(bp_risk / 10, 0, 1)
-    blood_pressure = []
-    for i in range(n_samples):
-        risk = bp_risk_normalized[i]
-        adjusted_probs = bp_probs * (1 - risk) + np.array([0.1, 0.2, 0.4, 0.3]) * risk
-        adjusted_probs = adjusted_probs / adjusted_probs.sum()
-        blood_pressure.append(np.random.choice(bp_categories, p=adjusted_probs))
+    blood_pressure = _sample_categorical(
+        rng, [0.6, 0.2, 0.15, 0.05], [0.1, 0.2, 0.4, 0.3], bp_risk_normalized)
     
     # Cholesterol levels
     chol_risk = (age - 20) * 0.015 + (bmi - 25) * 0.03 + (diet_quality < 5) * 0.2
-    chol_categories = ['normal', 'borderline', 'high']
-    cholesterol_levels = []
-    for i in range(n_samples):
-        risk = np.clip(chol_risk[i] / 8, 0, 1)
-        chol_probs = np.array([0.7, 0.2, 0.1]) * (1 - risk) + np.array([0.2, 0.4, 0.4]) * risk
-        chol_probs = chol_probs / chol_probs.sum()
-        cholesterol_levels.append(np.random.choice(chol_categories, p=chol_probs))
+    cholesterol_levels = _sample_categorical(
+        rng, [0.7, 0.2, 0.1], [0.2, 0.4, 0.4], np.clip(chol_risk / 8, 0, 1))
     
     # Blood sugar levels
     diabetes_risk = (age - 20) * 0.01 + (bmi - 25) * 0.04 + (exercise_frequency < 2) * 0.15
-    bs_categories = ['70-100', '101-125', '126+', 'dont-know']
-    blood_sugar_levels = []
-    for i in range(n_samples):
-        risk = np.clip(diabetes_risk[i] / 6, 0, 1)
-        bs_probs = np.array([0.75, 0.15, 0.05, 0.05]) * (1 - risk) + np.array([0.3, 0.4, 0.25, 0.05]) * risk
-        bs_probs = bs_probs / bs_probs.sum()
-        blood_sugar_levels.append(np.random.choice(bs_categories, p=bs_probs))
+    blood_sugar_levels = _sample_categorical(
+        rng, [0.75, 0.15, 0.05, 0.05], [0.3, 0.4, 0.25, 0.05], np.clip(diabetes_risk / 6, 0, 1))
     
-    # Family history with genetic correlation
-    family_conditions = ['heart-disease', 'diabetes', 'cancer', 'hypertension', 'stroke', 'mental-health', 'none']
-    family_history = []
-    for i in range(n_samples):
-        # Higher chance of family history with age
-        num_conditions = np.random.poisson(0.8 + age[i] * 0.01)
-        if num_conditions == 0:
-            family_history.append(['none'])
-        else:
-            conditions = np.random.choice(family_conditions[:-1], 
-                                        min(num_conditions, 3), replace=False)
-            family_history.append(list(conditions))
+    # Family history with genetic correlation: a Poisson number of
+    # conditions (higher with age), capped at 3 and drawn without replacement
+    num_conditions = rng.poisson(0.8 + age * 0.01)
+    family_mask = _sample_condition_masks(rng, num_conditions, len(FAMILY_CONDITIONS))
     
-    # Existing conditions influenced by age, family history, and lifestyle
-    existing_conditions = []
-    for i in range(n_samples):
-        conditions = []
-        
-        # Heart disease risk
-        heart_risk = (age[i] > 60) * 0.1 + ('heart-disease' in family_history[i]) * 0.15 + \
-                    (blood_pressure[i] in ['stage1', 'stage2']) * 0.1 + (smoking_status[i] == 'regular') * 0.08
-        if np.random.random() < heart_risk:
-            conditions.append('heart-disease')
-        
-        # Diabetes risk
-        diabetes_risk_val = (age[i] > 50) * 0.08 + ('diabetes' in family_history[i]) * 0.2 + \
-                           (bmi[i] > 30) * 0.12 + (exercise_frequency[i] < 2) * 0.06
-        if np.random.random() < diabetes_risk_val:
-            conditions.append('diabetes')
-        
-        # Hypertension
-        if blood_pressure[i] in ['stage1', 'stage2']:
-            conditions.append('hypertension')
-        
-        # Mental health
-        mental_risk = (stress_level[i] > 7) * 0.15 + ('mental-health' in family_history[i]) * 0.12 + \
-                     (sleep_hours[i] < 6) * 0.08
-        if np.random.random() < mental_risk:
-            conditions.append('mental-health')
-        
-        if not conditions:
-            conditions = ['none']
-        
-        existing_conditions.append(conditions)
+    def family_has(condition):
+        return (family_mask >> FAMILY_CONDITIONS.index(condition)) & 1 == 1
     
-    # Create DataFrame
+    # Existing conditions influenced by age, family history, and lifestyle
+    hypertensive = blood_pressure >= BLOOD_PRESSURE_CATEGORIES.index('stage1')
+    condition_draws = rng.random((3, n_samples))
+    
+    heart_risk = (age > 60) * 0.1 + family_has('heart-disease') * 0.15 + \
+                 hypertensive * 0.1 + (smoking_status == 3) * 0.08
+    diabetes_risk_val = (age > 50) * 0.08 + family_has('diabetes') * 0.2 + \
+                        (bmi > 30) * 0.12 + (exercise_frequency < 2) * 0.06
+    mental_risk = (stress_level > 7) * 0.15 + family_has('mental-health') * 0.12 + \
+                  (sleep_hours < 6) * 0.08
+    
+    existing_mask = (
+        (condition_draws[0] < heart_risk) * 1 +
+        (condition_draws[1] < diabetes_risk_val) * 2 +
+        hypertensive * 4 +
+        (condition_draws[2] < mental_risk) * 8
+    )
+    
+    # Create DataFrame; categorical columns are built straight from codes
     data = pd.DataFrame({
         'age': age,
-        'gender': gender,
+        'gender': pd.Categorical.from_codes(gender, ['male', 'female']),
         'weight': weight,
         'height': height_cm,
         'bmi': bmi,
         'exercise_frequency': exercise_frequency,
         'sleep_hours': sleep_hours,
-        'sleep_quality': sleep_quality_base,
+        'sleep_quality': pd.Categorical.from_codes(
+            sleep_quality, ['poor', 'fair', 'average', 'good', 'excellent']),
         'diet_quality': diet_quality,
         'stress_level': stress_level,
-        'smoking_status': smoking_status,
-        'alcohol_consumption': alcohol_consumption,
-        'blood_pressure': blood_pressure,
-        'cholesterol_levels': cholesterol_levels,
-        'blood_sugar_levels': blood_sugar_levels,
-        'family_history': family_history,
-        'existing_conditions': existing_conditions
+        'smoking_status': pd.Categorical.from_codes(
+            smoking_status, ['non-smoker', 'former-smoker', 'occasional', 'regular']),
+        'alcohol_consumption': pd.Categorical.from_codes(
+            alcohol_consumption, ['none', 'occasional', 'moderate', 'heavy']),
+        'blood_pressure': pd.Categorical.from_codes(blood_pressure, BLOOD_PRESSURE_CATEGORIES),
+        'cholesterol_levels': pd.Categorical.from_codes(cholesterol_levels, CHOLESTEROL_CATEGORIES),
+        'blood_sugar_levels': pd.Categorical.from_codes(blood_sugar_levels, BLOOD_SUGAR_CATEGORIES),
+        'family_history': _mask_lookup(FAMILY_CONDITIONS)[family_mask],
+        'existing_conditions': _mask_lookup(EXISTING_CONDITIONS)[existing_mask]
     })
     
     return data
 
-# Enhanced risk calculation functions with medical accuracy
-def calculate_enhanced_cardiovascular_risk(row):
-    """Calculate cardiovascular risk using Framingham-inspired scoring"""
-    risk_score = 0
-    
+# Labeling rules with medical accuracy. Each table is compiled into the
+# row-wise calculate_enhanced_* functions and the columnar engine that
+# calculate_risk_scores runs over whole DataFrames (see rules.py).
+CARDIOVASCULAR_RULES = rules.points_table([
     # Age factor (major risk factor)
-    if row['age'] >= 65:
-        risk_score += 25
-    elif row['age'] >= 55:
-        risk_score += 15
-    elif row['age'] >= 45:
-        risk_score += 8
-    elif row['age'] >= 35:
-        risk_score += 3
-    
+    rules.tiers((at_least('age', 65), 25), (at_least('age', 55), 15), (at_least('age', 45), 8),
+                (at_least('age', 35), 3)),
     # Gender factor
-    if row['gender'] == 'male' and row['age'] >= 45:
-        risk_score += 8
-    elif row['gender'] == 'female' and row['age'] >= 55:
-        risk_score += 6
-    
+    rules.tiers((all_of(equals('gender', 'male'), at_least('age', 45)), 8),
+                (all_of(equals('gender', 'female'), at_least('age', 55)), 6)),
     # BMI factor
-    if row['bmi'] >= 35:
-        risk_score += 15
-    elif row['bmi'] >= 30:
-        risk_score += 10
-    elif row['bmi'] >= 25:
-        risk_score += 5
-    
+    rules.tiers((at_least('bmi', 35), 15), (at_least('bmi', 30), 10), (at_least('bmi', 25), 5)),
     # Blood pressure (major factor)
-    bp_scores = {'normal': 0, 'elevated': 5, 'stage1': 12, 'stage2': 20}
-    risk_score += bp_scores.get(row['blood_pressure'], 0)
-    
+    rules.lookup('blood_pressure', {'normal': 0, 'elevated': 5, 'stage1': 12, 'stage2': 20}),
     # Cholesterol
-    chol_scores = {'normal': 0, 'borderline': 8, 'high': 15}
-    risk_score += chol_scores.get(row['cholesterol_levels'], 0)
-    
+    rules.lookup('cholesterol_levels', {'normal': 0, 'borderline': 8, 'high': 15}),
     # Smoking (major factor)
-    smoking_scores = {'non-smoker': 0, 'former-smoker': 5, 'occasional': 12, 'regular': 20}
-    risk_score += smoking_scores.get(row['smoking_status'], 0)
-    
+    rules.lookup('smoking_status', {'non-smoker': 0, 'former-smoker': 5, 'occasional': 12, 'regular': 20}),
     # Diabetes
-    if 'diabetes' in row['existing_conditions'] or row['blood_sugar_levels'] in ['126+']:
-        risk_score += 18
-    elif row['blood_sugar_levels'] == '101-125':
-        risk_score += 8
-    
+    rules.tiers((any_of(has('existing_conditions', 'diabetes'), equals('blood_sugar_levels', '126+')), 18),
+                (equals('blood_sugar_levels', '101-125'), 8)),
     # Family history
-    if 'heart-disease' in row['family_history']:
-        risk_score += 10
-    if 'stroke' in row['family_history']:
-        risk_score += 8
-    
+    rules.when(has('family_history', 'heart-disease'), 10),
+    rules.when(has('family_history', 'stroke'), 8),
     # Exercise (protective factor)
-    if row['exercise_frequency'] >= 5:
-        risk_score -= 8
-    elif row['exercise_frequency'] >= 3:
-        risk_score -= 5
-    elif row['exercise_frequency'] <= 1:
-        risk_score += 8
-    
+    rules.tiers((at_least('exercise_frequency', 5), -8), (at_least('exercise_frequency', 3), -5),
+                (at_most('exercise_frequency', 1), 8)),
     # Stress
-    if row['stress_level'] >= 8:
-        risk_score += 6
-    
-    return max(5, min(85, risk_score))
+    rules.when(at_least('stress_level', 8), 6)
+], low=5, high=85)
 
-def calculate_enhanced_metabolic_risk(row):
-    """Calculate metabolic syndrome risk"""
-    risk_score = 0
-    
+METABOLIC_RULES = rules.points_table([
     # Central obesity (waist circumference approximated by BMI)
-    if row['bmi'] >= 35:
-        risk_score += 20
-    elif row['bmi'] >= 30:
-        risk_score += 15
-    elif row['bmi'] >= 25:
-        risk_score += 8
-    
+    rules.tiers((at_least('bmi', 35), 20), (at_least('bmi', 30), 15), (at_least('bmi', 25), 8)),
     # Blood sugar
-    if row['blood_sugar_levels'] == '126+':
-        risk_score += 25
-    elif row['blood_sugar_levels'] == '101-125':
-        risk_score += 15
-    
+    rules.tiers((equals('blood_sugar_levels', '126+'), 25), (equals('blood_sugar_levels', '101-125'), 15)),
     # Blood pressure
-    bp_scores = {'normal': 0, 'elevated': 5, 'stage1': 12, 'stage2': 18}
-    risk_score += bp_scores.get(row['blood_pressure'], 0)
-    
+    rules.lookup('blood_pressure', {'normal': 0, 'elevated': 5, 'stage1': 12, 'stage2': 18}),
     # Cholesterol (HDL approximated inversely from total cholesterol)
-    if row['cholesterol_levels'] == 'high':
-        risk_score += 12
-    elif row['cholesterol_levels'] == 'borderline':
-        risk_score += 6
-    
+    rules.tiers((equals('cholesterol_levels', 'high'), 12), (equals('cholesterol_levels', 'borderline'), 6)),
     # Age factor
-    if row['age'] >= 60:
-        risk_score += 10
-    elif row['age'] >= 45:
-        risk_score += 5
-    
+    rules.tiers((at_least('age', 60), 10), (at_least('age', 45), 5)),
     # Family history
-    if 'diabetes' in row['family_history']:
-        risk_score += 12
-    
+    rules.when(has('family_history', 'diabetes'), 12),
     # Lifestyle factors
-    if row['exercise_frequency'] <= 1:
-        risk_score += 10
-    elif row['exercise_frequency'] >= 5:
-        risk_score -= 8
-    
-    if row['diet_quality'] <= 4:
-        risk_score += 8
-    elif row['diet_quality'] >= 8:
-        risk_score -= 5
-    
+    rules.tiers((at_most('exercise_frequency', 1), 10), (at_least('exercise_frequency', 5), -8)),
+    rules.tiers((at_most('diet_quality', 4), 8), (at_least('diet_quality', 8), -5)),
     # Existing conditions
-    if 'diabetes' in row['existing_conditions']:
-        risk_score += 20
-    if 'hypertension' in row['existing_conditions']:
-        risk_score += 10
-    
-    return max(5, min(80, risk_score))
+    rules.when(has('existing_conditions', 'diabetes'), 20),
+    rules.when(has('existing_conditions', 'hypertension'), 10)
+], low=5, high=80)
 
-def calculate_enhanced_sleep_risk(row):
-    """Calculate sleep disorder risk"""
-    risk_score = 0
-    
+SLEEP_RULES = rules.points_table([
     # Sleep duration
-    if row['sleep_hours'] < 5:
-        risk_score += 25
-    elif row['sleep_hours'] < 6:
-        risk_score += 15
-    elif row['sleep_hours'] < 7:
-        risk_score += 8
-    elif row['sleep_hours'] > 9:
-        risk_score += 10
-    
+    rules.tiers((below('sleep_hours', 5), 25), (below('sleep_hours', 6), 15), (below('sleep_hours', 7), 8),
+                (above('sleep_hours', 9), 10)),
     # Sleep quality
-    quality_scores = {'poor': 20, 'fair': 12, 'average': 5, 'good': 0, 'excellent': -5}
-    risk_score += quality_scores.get(row['sleep_quality'], 0)
-    
+    rules.lookup('sleep_quality', {'poor': 20, 'fair': 12, 'average': 5, 'good': 0, 'excellent': -5}),
     # Age factor
-    if row['age'] >= 65:
-        risk_score += 8
-    elif row['age'] >= 50:
-        risk_score += 5
-    
+    rules.tiers((at_least('age', 65), 8), (at_least('age', 50), 5)),
     # BMI (sleep apnea risk)
-    if row['bmi'] >= 35:
-        risk_score += 15
-    elif row['bmi'] >= 30:
-        risk_score += 10
-    
+    rules.tiers((at_least('bmi', 35), 15), (at_least('bmi', 30), 10)),
     # Stress level
-    if row['stress_level'] >= 8:
-        risk_score += 12
-    elif row['stress_level'] >= 6:
-        risk_score += 6
-    
+    rules.tiers((at_least('stress_level', 8), 12), (at_least('stress_level', 6), 6)),
     # Alcohol
-    if row['alcohol_consumption'] in ['moderate', 'heavy']:
-        risk_score += 8
-    
+    rules.when(one_of('alcohol_consumption', ['moderate', 'heavy']), 8),
     # Exercise (protective)
-    if row['exercise_frequency'] >= 4:
-        risk_score -= 8
-    elif row['exercise_frequency'] <= 1:
-        risk_score += 6
-    
+    rules.tiers((at_least('exercise_frequency', 4), -8), (at_most('exercise_frequency', 1), 6)),
     # Mental health conditions
-    if 'mental-health' in row['existing_conditions']:
-        risk_score += 12
-    
-    return max(5, min(75, risk_score))
+    rules.when(has('existing_conditions', 'mental-health'), 12)
+], low=5, high=75)
 
-def calculate_enhanced_mental_risk(row):
-    """Calculate mental health risk"""
-    risk_score = 0
-    
+MENTAL_RULES = rules.points_table([
     # Stress level (primary factor)
-    if row['stress_level'] >= 9:
-        risk_score += 25
-    elif row['stress_level'] >= 7:
-        risk_score += 15
-    elif row['stress_level'] >= 5:
-        risk_score += 8
-    
+    rules.tiers((at_least('stress_level', 9), 25), (at_least('stress_level', 7), 15),
+                (at_least('stress_level', 5), 8)),
     # Sleep quality
-    quality_scores = {'poor': 15, 'fair': 10, 'average': 5, 'good': 0, 'excellent': -5}
-    risk_score += quality_scores.get(row['sleep_quality'], 0)
-    
+    rules.lookup('sleep_quality', {'poor': 15, 'fair': 10, 'average': 5, 'good': 0, 'excellent': -5}),
     # Sleep duration
-    if row['sleep_hours'] < 6:
-        risk_score += 12
-    elif row['sleep_hours'] > 9:
-        risk_score += 8
-    
-    # Age factors
-    if 18 <= row['age'] <= 25:
-        risk_score += 8  # Higher risk in young adults
-    elif 45 <= row['age'] <= 65:
-        risk_score += 5  # Midlife stress
-    
-    # Gender factor
-    if row['gender'] == 'female':
-        risk_score += 5  # Higher prevalence in women
-    
+    rules.tiers((below('sleep_hours', 6), 12), (above('sleep_hours', 9), 8)),
+    # Age factors: higher risk in young adults, midlife stress
+    rules.tiers((between('age', 18, 25), 8), (between('age', 45, 65), 5)),
+    # Gender factor (higher prevalence in women)
+    rules.when(equals('gender', 'female'), 5),
     # Family history
-    if 'mental-health' in row['family_history']:
-        risk_score += 15
-    
+    rules.when(has('family_history', 'mental-health'), 15),
     # Existing conditions
-    if 'mental-health' in row['existing_conditions']:
-        risk_score += 20
-    
+    rules.when(has('existing_conditions', 'mental-health'), 20),
     # Lifestyle factors
-    if row['exercise_frequency'] <= 1:
-        risk_score += 10
-    elif row['exercise_frequency'] >= 5:
-        risk_score -= 8
-    
+    rules.tiers((at_most('exercise_frequency', 1), 10), (at_least('exercise_frequency', 5), -8)),
     # Substance use
-    if row['smoking_status'] in ['occasional', 'regular']:
-        risk_score += 8
-    if row['alcohol_consumption'] == 'heavy':
-        risk_score += 10
-    
+    rules.when(one_of('smoking_status', ['occasional', 'regular']), 8),
+    rules.when(equals('alcohol_consumption', 'heavy'), 10),
     # Physical health impact
-    chronic_conditions = ['heart-disease', 'diabetes', 'hypertension']
-    if any(cond in row['existing_conditions'] for cond in chronic_conditions):
-        risk_score += 8
-    
-    return max(5, min(80, risk_score))
+    rules.when(any_of(*(has('existing_conditions', c) for c in ['heart-disease', 'diabetes', 'hypertension'])), 8)
+], low=5, high=80)
 
-def calculate_enhanced_immune_risk(row):
-    """Calculate immune system risk"""
-    risk_score = 0
-    
-    # Age factor (immune senescence)
-    if row['age'] >= 75:
-        risk_score += 20
-    elif row['age'] >= 65:
-        risk_score += 12
-    elif row['age'] >= 50:
-        risk_score += 6
-    elif row['age'] <= 5:
-        risk_score += 10  # Immature immune system
-    
+IMMUNE_RULES = rules.points_table([
+    # Age factor (immune senescence; immature immune system in young children)
+    rules.tiers((at_least('age', 75), 20), (at_least('age', 65), 12), (at_least('age', 50), 6),
+                (at_most('age', 5), 10)),
     # Chronic conditions that affect immunity
-    immune_affecting_conditions = ['diabetes', 'heart-disease']
-    for condition in immune_affecting_conditions:
-        if condition in row['existing_conditions']:
-            risk_score += 10
-    
+    rules.when(has('existing_conditions', 'diabetes'), 10),
+    rules.when(has('existing_conditions', 'heart-disease'), 10),
     # Lifestyle factors
-    if row['smoking_status'] in ['occasional', 'regular']:
-        risk_score += 15
-    
-    if row['alcohol_consumption'] == 'heavy':
-        risk_score += 12
-    
+    rules.when(one_of('smoking_status', ['occasional', 'regular']), 15),
+    rules.when(equals('alcohol_consumption', 'heavy'), 12),
     # Sleep (crucial for immune function)
-    if row['sleep_hours'] < 6:
-        risk_score += 12
-    elif row['sleep_quality'] == 'poor':
-        risk_score += 8
-    
+    rules.tiers((below('sleep_hours', 6), 12), (equals('sleep_quality', 'poor'), 8)),
     # Stress (immunosuppressive)
-    if row['stress_level'] >= 8:
-        risk_score += 10
-    elif row['stress_level'] >= 6:
-        risk_score += 5
-    
+    rules.tiers((at_least('stress_level', 8), 10), (at_least('stress_level', 6), 5)),
     # Exercise (immune boosting)
-    if row['exercise_frequency'] >= 4:
-        risk_score -= 10
-    elif row['exercise_frequency'] <= 1:
-        risk_score += 8
-    
+    rules.tiers((at_least('exercise_frequency', 4), -10), (at_most('exercise_frequency', 1), 8)),
     # Nutrition (approximated by diet quality)
-    if row['diet_quality'] <= 4:
-        risk_score += 10
-    elif row['diet_quality'] >= 8:
-        risk_score -= 8
-    
+    rules.tiers((at_most('diet_quality', 4), 10), (at_least('diet_quality', 8), -8)),
     # BMI (obesity affects immune function)
-    if row['bmi'] >= 35:
-        risk_score += 12
-    elif row['bmi'] >= 30:
-        risk_score += 8
-    
-    return max(5, min(75, risk_score))
+    rules.tiers((at_least('bmi', 35), 12), (at_least('bmi', 30), 8))
+], low=5, high=75)
 
-def calculate_enhanced_chronic_disease_risk(row):
-    """Calculate overall chronic disease risk"""
-    risk_score = 0
-    
+CHRONIC_DISEASE_RULES = rules.points_table([
     # Age (primary factor)
-    if row['age'] >= 70:
-        risk_score += 25
-    elif row['age'] >= 60:
-        risk_score += 18
-    elif row['age'] >= 50:
-        risk_score += 12
-    elif row['age'] >= 40:
-        risk_score += 6
-    
+    rules.tiers((at_least('age', 70), 25), (at_least('age', 60), 18), (at_least('age', 50), 12),
+                (at_least('age', 40), 6)),
     # Family history (genetic predisposition)
-    high_risk_family = ['heart-disease', 'diabetes', 'cancer']
-    family_risk_count = sum(1 for condition in high_risk_family if condition in row['family_history'])
-    risk_score += family_risk_count * 8
-    
+    *(rules.when(has('family_history', c), 8) for c in ['heart-disease', 'diabetes', 'cancer']),
     # Existing conditions
-    risk_score += len([c for c in row['existing_conditions'] if c != 'none']) * 10
-    
+    rules.count('existing_conditions', 10),
     # Lifestyle factors
-    if row['smoking_status'] in ['occasional', 'regular']:
-        risk_score += 15
-    
-    if row['alcohol_consumption'] == 'heavy':
-        risk_score += 10
-    
+    rules.when(one_of('smoking_status', ['occasional', 'regular']), 15),
+    rules.when(equals('alcohol_consumption', 'heavy'), 10),
     # Physical activity (major protective factor)
-    if row['exercise_frequency'] <= 1:
-        risk_score += 15
-    elif row['exercise_frequency'] >= 5:
-        risk_score -= 12
-    
+    rules.tiers((at_most('exercise_frequency', 1), 15), (at_least('exercise_frequency', 5), -12)),
     # Diet quality
-    if row['diet_quality'] <= 4:
-        risk_score += 12
-    elif row['diet_quality'] >= 8:
-        risk_score -= 8
-    
+    rules.tiers((at_most('diet_quality', 4), 12), (at_least('diet_quality', 8), -8)),
     # BMI
-    if row['bmi'] >= 35:
-        risk_score += 15
-    elif row['bmi'] >= 30:
-        risk_score += 10
-    elif row['bmi'] < 18.5:
-        risk_score += 8
-    
+    rules.tiers((at_least('bmi', 35), 15), (at_least('bmi', 30), 10), (below('bmi', 18.5), 8)),
     # Metabolic markers
-    if row['blood_pressure'] in ['stage1', 'stage2']:
-        risk_score += 10
-    if row['cholesterol_levels'] == 'high':
-        risk_score += 8
-    if row['blood_sugar_levels'] in ['101-125', '126+']:
-        risk_score += 12
-    
+    rules.when(one_of('blood_pressure', ['stage1', 'stage2']), 10),
+    rules.when(equals('cholesterol_levels', 'high'), 8),
+    rules.when(one_of('blood_sugar_levels', ['101-125', '126+']), 12),
     # Sleep and stress
-    if row['sleep_hours'] < 6 or row['sleep_quality'] == 'poor':
-        risk_score += 8
-    if row['stress_level'] >= 8:
-        risk_score += 8
-    
-    return max(5, min(85, risk_score))
-
-# Generate enhanced dataset
-print("Generating enhanced synthetic health data...")
-data = generate_enhanced_synthetic_data(5000)
-
-# Calculate risk scores
-print("Calculating enhanced risk scores...")
-data['cardiovascular_risk'] = data.apply(calculate_enhanced_cardiovascular_risk, axis=1)
-data['metabolic_risk'] = data.apply(calculate_enhanced_metabolic_risk, axis=1)
-data['sleep_risk'] = data.apply(calculate_enhanced_sleep_risk, axis=1)
-data['mental_risk'] = data.apply(calculate_enhanced_mental_risk, axis=1)
-data['immune_risk'] = data.apply(calculate_enhanced_immune_risk, axis=1)
-data['chronic_risk'] = data.apply(calculate_enhanced_chronic_disease_risk, axis=1)
-
-# Convert to binary classification for model training
-risk_threshold = 50  # Above 50% is considered high risk
-data['cardiovascular_high_risk'] = (data['cardiovascular_risk'] > risk_threshold).astype(int)
-data['metabolic_high_risk'] = (data['metabolic_risk'] > risk_threshold).astype(int)
-data['sleep_high_risk'] = (data['sleep_risk'] > risk_threshold).astype(int)
-data['mental_high_risk'] = (data['mental_risk'] > risk_threshold).astype(int)
-data['immune_high_risk'] = (data['immune_risk'] > risk_threshold).astype(int)
-data['chronic_high_risk'] = (data['chronic_risk'] > risk_threshold).astype(int)
+    rules.when(any_of(below('sleep_hours', 6), equals('sleep_quality', 'poor')), 8),
+    rules.when(at_least('stress_level', 8), 8)
+], low=5, high=85)
+
+RISK_RULES = {
+    'cardiovascular': CARDIOVASCULAR_RULES,
+    'metabolic': METABOLIC_RULES,
+    'sleep': SLEEP_RULES,
+    'mental': MENTAL_RULES,
+    'immune': IMMUNE_RULES,
+    'chronic': CHRONIC_DISEASE_RULES
+}
+_ROW_LABELERS = {risk_type: rules.compile_scalar(table) for risk_type, table in RISK_RULES.items()}
+_COLUMN_LABELERS = {risk_type: rules.compile_vector(table) for risk_type, table in RISK_RULES.items()}
+
+def calculate_enhanced_cardiovascular_risk(row):
+    """Calculate cardiovascular risk using Framingham-inspired scoring"""
+    return _ROW_LABELERS['cardiovascular'](row)
+
+def calculate_enhanced_metabolic_risk(row):
+    """Calculate metabolic syndrome risk"""
+    return _ROW_LABELERS['metabolic'](row)
+
+def calculate_enhanced_sleep_risk(row):
+    """Calculate sleep disorder risk"""
+    return _ROW_LABELERS['sleep'](row)
+
+def calculate_enhanced_mental_risk(row):
+    """Calculate mental health risk"""
+    return _ROW_LABELERS['mental'](row)
+
+def calculate_enhanced_immune_risk(row):
+    """Calculate immune system risk"""
+    return _ROW_LABELERS['immune'](row)
+
+def calculate_enhanced_chronic_disease_risk(row):
+    """Calculate overall chronic disease risk"""
+    return _ROW_LABELERS['chronic'](row)
+
+RISK_LABELERS = {
+    'cardiovascular': calculate_enhanced_cardiovascular_risk,
+    'metabolic': calculate_enhanced_metabolic_risk,
+    'sleep': calculate_enhanced_sleep_risk,
+    'mental': calculate_enhanced_mental_risk,
+    'immune': calculate_enhanced_immune_risk,
+    'chronic': calculate_enhanced_chronic_disease_risk
+}
+
+
+def _vectorized_risk_scores(df):
+    """Score all six risk types for every row of ``df`` at once"""
+    columns = rules.Columns(df)
+    return {risk_type: labeler(columns) for risk_type, labeler in _COLUMN_LABELERS.items()}
+
+
+def calculate_risk_scores(df, mode='vectorized'):
+    """Score every row of ``df`` for all six risk types.
+
+    Returns a DataFrame with one ``<risk_type>_risk`` column per labeler.
+    ``mode='vectorized'`` runs the columnar evaluators of RISK_RULES;
+    ``mode='rowwise'`` applies each calculate_enhanced_* function row by
+    row, kept for verifying the two evaluators against each other.
+    """
+    import pandas as pd
+    if mode == 'vectorized':
+        scores = _vectorized_risk_scores(df)
+    elif mode == 'rowwise':
+        scores = {name: df.apply(labeler, axis=1) for name, labeler in RISK_LABELERS.items()}
+    else:
+        raise ValueError(f"Unknown labeling mode: {mode!r}")
+    
+    return pd.DataFrame(
+        {f'{name}_risk': np.asarray(values, dtype=np.int64) for name, values in scores.items()},
+        index=df.index
+    )
+
+# Above this labeled risk score a sample is considered high risk
+RISK_THRESHOLD = 50
+
+# Model input columns, in the order the scalers and models expect them
+FEATURE_COLUMNS = [
+    'age', 'weight', 'height', 'bmi', 'exercise_frequency', 'sleep_hours', 
+    'diet_quality', 'stress_level', 'gender_encoded', 'smoking_encoded', 
+    'alcohol_encoded', 'sleep_quality_encoded', 'bp_encoded', 'chol_encoded', 'bs_encoded'
+] + [f'family_{c.replace("-", "_")}' for c in FAMILY_CONDITIONS] + \
+    [f'has_{c.replace("-", "_")}' for c in EXISTING_CONDITIONS]
+
+# Source column behind each label encoder, as named in the bundle's encoders
+ENCODED_COLUMNS = {
+    'gender': 'gender', 'smoking': 'smoking_status', 'alcohol': 'alcohol_consumption',
+    'sleep_quality': 'sleep_quality', 'bp': 'blood_pressure', 'chol': 'cholesterol_levels',
+    'bs': 'blood_sugar_levels'
+}
+
+def fit_label_encoders(df):
+    """Label encoders fitted on each column's full vocabulary.
+
+    Categorical columns contribute all of their categories, including ones
+    absent from ``df``, so encoders fitted on one chunk of generated data
+    encode every other chunk the same way.
+    """
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+    encoders = {}
+    for name, column in ENCODED_COLUMNS.items():
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.categories
+        encoders[name] = LabelEncoder().fit(values)
+    return encoders
 
 # Prepare features for machine learning
-def prepare_features(df):
-    """Prepare features for machine learning"""
+def prepare_features(df, encoders=None):
+    """Prepare features for machine learning
+
+    Label encoders are fitted on ``df`` unless already fitted ``encoders``
+    are given, e.g. from fit_label_encoders for chunked training.
+    """
+    from sklearn.preprocessing import LabelEncoder
     feature_df = df.copy()
     
     # Encode categorical variables
-    le_gender = LabelEncoder()
-    feature_df['gender_encoded'] = le_gender.fit_transform(feature_df['gender'])
-    
-    le_smoking = LabelEncoder()
-    feature_df['smoking_encoded'] = le_smoking.fit_transform(feature_df['smoking_status'])
-    
-    le_alcohol = LabelEncoder()
-    feature_df['alcohol_encoded'] = le_alcohol.fit_transform(feature_df['alcohol_consumption'])
-    
-    le_sleep_quality = LabelEncoder()
-    feature_df['sleep_quality_encoded'] = le_sleep_quality.fit_transform(feature_df['sleep_quality'])
-    
-    le_bp = LabelEncoder()
-    feature_df['bp_encoded'] = le_bp.fit_transform(feature_df['blood_pressure'])
-    
-    le_chol = LabelEncoder()
-    feature_df['chol_encoded'] = le_chol.fit_transform(feature_df['cholesterol_levels'])
-    
-    le_bs = LabelEncoder()
-    feature_df['bs_encoded'] = le_bs.fit_transform(feature_df['blood_sugar_levels'])
+    if encoders is None:
+        encoders = {name: LabelEncoder() for name in ENCODED_COLUMNS}
+        encode = lambda name, values: encoders[name].fit_transform(values)
+    else:
+        encode = lambda name, values: encoders[name].transform(values)
+    
+    feature_df['gender_encoded'] = encode('gender', feature_df['gender'])
+    feature_df['smoking_encoded'] = encode('smoking', feature_df['smoking_status'])
+    feature_df['alcohol_encoded'] = encode('alcohol', feature_df['alcohol_consumption'])
+    feature_df['sleep_quality_encoded'] = encode('sleep_quality', feature_df['sleep_quality'])
+    feature_df['bp_encoded'] = encode('bp', feature_df['blood_pressure'])
+    feature_df['chol_encoded'] = encode('chol', feature_df['cholesterol_levels'])
+    feature_df['bs_encoded'] = encode('bs', feature_df['blood_sugar_levels'])
     
     # Create family history features
-    family_conditions = ['heart-disease', 'diabetes', 'cancer', 'hypertension', 'stroke', 'mental-health']
-    for condition in family_conditions:
-        feature_df[f'family_{condition.replace("-", "_")}'] = feature_df['family_history'].apply(
-            lambda x: 1 if condition in x else 0
-        )
+    columns = rules.Columns(feature_df)
+    for condition in FAMILY_CONDITIONS:
+        feature_df[f'family_{condition.replace("-", "_")}'] = columns.contains('family_history', condition).astype(int)
     
     # Create existing condition features
-    existing_conditions = ['heart-disease', 'diabetes', 'hypertension', 'mental-health']
-    for condition in existing_conditions:
-        feature_df[f'has_{condition.replace("-", "_")}'] = feature_df['existing_conditions'].apply(
-            lambda x: 1 if condition in x else 0
-        )
+    for condition in EXISTING_CONDITIONS:
+        feature_df[f'has_{condition.replace("-", "_")}'] = columns.contains('existing_conditions', condition).astype(int)
     
-    # Select numerical features
-    feature_columns = [
-        'age', 'weight', 'height', 'bmi', 'exercise_frequency', 'sleep_hours', 
-        'diet_quality', 'stress_level', 'gender_encoded', 'smoking_encoded', 
-        'alcohol_encoded', 'sleep_quality_encoded', 'bp_encoded', 'chol_encoded', 'bs_encoded'
-    ] + [f'family_{c.replace("-", "_")}' for c in family_conditions] + \
-        [f'has_{c.replace("-", "_")}' for c in existing_conditions]
-    
-    return feature_df[feature_columns], {
-        'gender': le_gender, 'smoking': le_smoking, 'alcohol': le_alcohol,
-        'sleep_quality': le_sleep_quality, 'bp': le_bp, 'chol': le_chol, 'bs': le_bs
-    }
+    return feature_df[FEATURE_COLUMNS], encoders
 
-# Prepare features
-X, encoders = prepare_features(data)
-print(f"Feature matrix shape: {X.shape}")
-
-# Define target variables
-targets = {
-    'cardiovascular': data['cardiovascular_high_risk'],
-    'metabolic': data['metabolic_high_risk'],
-    'sleep': data['sleep_high_risk'],
-    'mental': data['mental_high_risk'],
-    'immune': data['immune_high_risk'],
-    'chronic': data['chronic_high_risk']
-}
+def get_feature_encoder(bundle):
+    """Compiled FeatureEncoder for a bundle, built once and kept on the bundle"""
+    encoder = bundle.get('feature_encoder')
+    if encoder is None:
+        from feature_encoder import FeatureEncoder
+        encoder = bundle['feature_encoder'] = FeatureEncoder(bundle['feature_schema'])
+    return encoder
 
-# Train enhanced models
-models = {}
-scalers = {}
-model_performance = {}
+# Above this many rows sklearn's compiled predict_proba beats the NumPy tree walk
+COMPILED_MAX_ROWS = 256
 
-print("\nTraining enhanced machine learning models...")
+def _positive_probability(bundle, risk_type, X_scaled):
+    """High-risk probability per row, via the exported trees when available"""
+    compiled = bundle.get('compiled', {}).get(risk_type)
+    if compiled is not None and len(X_scaled) <= COMPILED_MAX_ROWS:
+        return compiled.predict_positive(X_scaled)
+    # For exported types this is the first access that reads the sklearn
+    # estimators from disk (model_bundle.LazyModels)
+    return bundle['models'][risk_type].predict_proba(X_scaled)[:, 1]
 
-for target_name, y in targets.items():
-    print(f"\nTraining {target_name} model...")
-    
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    
+def _score_risk_type(bundle, risk_type, X_user, profile, user_data):
+    """Model prediction for one risk type, as returned per risk type by predict_enhanced_health_risks"""
     # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    t0 = perf_counter()
+    X_user_scaled = bundle['scalers'][risk_type].transform(X_user)
+    t1 = perf_counter()
     
-    # Try multiple algorithms and select the best
-    algorithms = {
-        'RandomForest': RandomForestClassifier(n_estimators=200, max_depth=10, random_state=42),
-        'GradientBoosting': GradientBoostingClassifier(n_estimators=200, max_depth=6, random_state=42),
-        'LogisticRegression': LogisticRegression(random_state=42, max_iter=1000),
-        'SVM': SVC(probability=True, random_state=42)
-    }
-    
-    best_score = 0
-    best_model = None
-    best_algo_name = None
+    # Get probability prediction
+    risk_probability = _positive_probability(bundle, risk_type, X_user_scaled)[0]
+    t2 = perf_counter()
     
-    for algo_name, model in algorithms.items():
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='roc_auc')
-        mean_score = cv_scores.mean()
-        
-        if mean_score > best_score:
-            best_score = mean_score
-            best_model = model
-            best_algo_name = algo_name
+    # Convert to percentage and apply clinical adjustments
+    risk_percentage = int(risk_probability * 100)
     
-    # Train the best model
-    best_model.fit(X_train_scaled, y_train)
+    # Apply rule-based adjustments for clinical accuracy
+    risk_percentage = apply_clinical_adjustments(risk_type, risk_percentage, user_data)
+    t3 = perf_counter()
     
-    # Evaluate
-    y_pred = best_model.predict(X_test_scaled)
-    y_pred_proba = best_model.predict_proba(X_test_scaled)[:, 1]
+    # Generate detailed recommendations
+    recommendations = recommendations_for_profile(risk_type, profile)
+    t4 = perf_counter()
     
-    accuracy = accuracy_score(y_test, y_pred)
-    auc_score = roc_auc_score(y_test, y_pred_proba)
+    metrics.PREDICTION_STAGE_SECONDS.observe(risk_type, metrics.MODEL_STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3))
     
-    models[target_name] = best_model
-    scalers[target_name] = scaler
-    model_performance[target_name] = {
-        'algorithm': best_algo_name,
-        'accuracy': accuracy,
-        'auc_score': auc_score,
-        'cv_score': best_score
+    return {
+        "risk": risk_percentage,
+        "factors": recommendations,
+        "confidence": bundle['model_performance'][risk_type]['auc_score']
     }
-    
-    print(f"Best algorithm: {best_algo_name}")
-    print(f"Accuracy: {accuracy:.4f}")
-    print(f"AUC Score: {auc_score:.4f}")
-    print(f"CV Score: {best_score:.4f}")
+
+# Default per-request latency budget of predict_enhanced_health_risks;
+# unset or 0 waits for every model
+DEADLINE_MS = float(os.environ.get('HEALTH_DEADLINE_MS', 0)) or None
+DEADLINE_WORKERS = int(os.environ.get('HEALTH_DEADLINE_WORKERS', 4))
+
+_deadline_executor = None
+_deadline_lock = threading.Lock()
+
+def _get_deadline_executor():
+    """Thread pool for predictions with a deadline, started on first use in each process"""
+    global _deadline_executor
+    if _deadline_executor is None:
+        with _deadline_lock:
+            if _deadline_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _deadline_executor = ThreadPoolExecutor(
+                    max_workers=DEADLINE_WORKERS, thread_name_prefix='health-inference')
+    return _deadline_executor
+
+def _degraded_prediction(risk_type, fallback, profile):
+    """Rule-based stand-in for a model that missed the deadline.
+
+    Has the same keys as a model result, so clients can always read
+    ``confidence``; ``degraded`` is what marks it.
+    """
+    return {
+        "risk": fallback[risk_type]['risk'],
+        "factors": recommendations_for_profile(risk_type, profile),
+        "confidence": fallback[risk_type].get('confidence'),
+        "degraded": True
+    }
+
+def _predict_within_deadline(bundle, X_user, profile, user_data, deadline):
+    """Score every risk type in the thread pool, waiting until ``deadline`` (perf_counter seconds)"""
+    from concurrent.futures import wait
+    
+    executor = _get_deadline_executor()
+    futures = {
+        risk_type: executor.submit(_score_risk_type, bundle, risk_type, X_user, profile, user_data)
+        for risk_type in bundle['models']
+    }
+    wait(futures.values(), timeout=max(0.0, deadline - perf_counter()))
+    
+    predictions = {}
+    fallback = None
+    for risk_type, future in futures.items():
+        metrics.DEADLINE_INFERENCES.inc(risk_type)
+        if future.done():
+            predictions[risk_type] = future.result()
+            continue
+        # A model that has not started yet is dropped; a running one finishes in the background
+        future.cancel()
+        metrics.DEADLINE_MISSES.inc(risk_type)
+        if fallback is None:
+            fallback = generate_fallback_predictions(user_data)
+        predictions[risk_type] = _degraded_prediction(risk_type, fallback, profile)
+    return predictions
+
+def is_degraded(predictions):
+    """True if any risk type of a prediction was served without its model"""
+    return any(isinstance(result, dict) and result.get('degraded') for result in predictions.values())
+
+def derived_bmi(user_data):
+    """BMI from ``weight`` and ``height`` for a user who sends no ``bmi``, else None.
+
+    Raises on a malformed weight or height. The models read ``bmi`` as
+    sent, but such users are scored by generate_fallback_predictions, as
+    they were when the prediction path derived this value.
+    """
+    if 'bmi' not in user_data and 'weight' in user_data and 'height' in user_data:
+        height_m = float(user_data['height']) / 100
+        return float(user_data['weight']) / (height_m ** 2)
+    return None
 
 # Enhanced prediction function
-def predict_enhanced_health_risks(user_data):
+def predict_enhanced_health_risks(user_data, bundle=None, deadline_ms=None):
     """
     Enhanced prediction function with more accurate risk assessment
+
+    ``bundle`` is a loaded model bundle (see model_bundle.py); by default
+    the process-wide bundle from serving.py is used.
+
+    ``deadline_ms`` is the latency budget of the whole call, by default
+    DEADLINE_MS (HEALTH_DEADLINE_MS); 0 disables it. With a budget, the
+    risk types are scored in a thread pool (HEALTH_DEADLINE_WORKERS
+    threads). A risk type whose model has not answered within the budget
+    gets the generate_fallback_predictions risk and its recommendations,
+    ``'confidence': None`` and ``'degraded': True``, and is counted in
+    metrics.DEADLINE_MISSES.
     """
+    start = perf_counter()
+    if bundle is None:
+        import serving
+        bundle = serving.get_bundle()
+    if deadline_ms is None:
+        deadline_ms = DEADLINE_MS
+    
+    # Stage timings go to the metrics.py histograms
+    observe = metrics.PREDICTION_STAGE_SECONDS.observe
+    
     try:
-        # Convert user data to DataFrame
-        user_df = pd.DataFrame([user_data])
+        # Encode straight into a one-row float64 matrix
+        t0 = perf_counter()
+        X_user = get_feature_encoder(bundle).encode(user_data).reshape(1, -1)
+        t1 = perf_counter()
+        derived_bmi(user_data)
+        profile = recommendation_profile(user_data)
+        t2 = perf_counter()
+        observe('all', metrics.INPUT_STAGES, (t1 - t0, t2 - t1))
         
-        # Calculate BMI if not provided
-        if 'bmi' not in user_data and 'weight' in user_data and 'height' in user_data:
-            height_m = float(user_data['height']) / 100
-            user_df['bmi'] = float(user_data['weight']) / (height_m ** 2)
+        if deadline_ms:
+            return _predict_within_deadline(bundle, X_user, profile, user_data, start + deadline_ms / 1000)
         
-        # Map user input to model format
-        feature_mapping = {
-            'age': lambda x: int(x),
-            'weight': lambda x: float(x),
-            'height': lambda x: float(x),
-            'bmi': lambda x: float(x),
-            'exercise_frequency': lambda x: map_exercise_frequency(x),
-            'sleep_hours': lambda x: float(x),
-            'diet_quality': lambda x: map_diet_quality(x),
-            'stress_level': lambda x: int(x),
-            'gender_encoded': lambda x: 1 if user_data.get('gender') == 'male' else 0,
-            'smoking_encoded': lambda x: map_smoking_status(user_data.get('smokingStatus', 'never')),
-            'alcohol_encoded': lambda x: map_alcohol_consumption(user_data.get('alcoholConsumption', 'never')),
-            'sleep_quality_encoded': lambda x: map_sleep_quality(user_data.get('sleepQuality', 'good')),
-            'bp_encoded': lambda x: map_blood_pressure(user_data.get('bloodPressure', 'normal')),
-            'chol_encoded': lambda x: map_cholesterol(user_data.get('cholesterolLevels', 'normal')),
-            'bs_encoded': lambda x: map_blood_sugar(user_data.get('bloodSugarLevel', '70-100'))
+        # Make predictions
+        return {
+            risk_type: _score_risk_type(bundle, risk_type, X_user, profile, user_data)
+            for risk_type in bundle['models']
         }
         
-        # Create feature vector
-        feature_vector = []
-        feature_names = [
-            'age', 'weight', 'height', 'bmi', 'exercise_frequency', 'sleep_hours', 
-            'diet_quality', 'stress_level', 'gender_encoded', 'smoking_encoded', 
-            'alcohol_encoded', 'sleep_quality_encoded', 'bp_encoded', 'chol_encoded', 'bs_encoded'
-        ]
-        
-        for feature in feature_names:
-            if feature in feature_mapping:
-                try:
-                    value = feature_mapping[feature](user_data.get(feature, 0))
-                    feature_vector.append(value)
-                except:
-                    feature_vector.append(0)
-            else:
-                feature_vector.append(0)
-        
-        # Add family history features
-        family_conditions = ['heart-disease', 'diabetes', 'cancer', 'hypertension', 'stroke', 'mental-health']
-        family_history = user_data.get('familyHistory', [])
-        for condition in family_conditions:
-            feature_vector.append(1 if condition in family_history else 0)
-        
-        # Add existing condition features
-        existing_conditions = ['heart-disease', 'diabetes', 'hypertension', 'mental-health']
-        user_conditions = user_data.get('existingConditions', [])
-        for condition in existing_conditions:
-            feature_vector.append(1 if condition in user_conditions else 0)
-        
-        # Convert to numpy array
-        X_user = np.array(feature_vector).reshape(1, -1)
-        
-        # Make predictions
-        predictions = {}
+    except Exception as e:
+        print(f"Error in prediction: {str(e)}")
+        return generate_fallback_predictions(user_data)
+
+def _records_from_frame(df):
+    """Row dicts from a DataFrame, leaving out missing (NaN) cells so that
+    ``user_data.get(key, default)`` falls back to its default as it would
+    for a dict without that key"""
+    import pandas as pd
+    records = []
+    for row in df.to_dict('records'):
+        records.append({
+            key: value for key, value in row.items()
+            if isinstance(value, (list, tuple, np.ndarray)) or not pd.isna(value)
+        })
+    return records
+
+def predict_enhanced_health_risks_batch(records, bundle=None, errors=None):
+    """
+    Predict all risk types for many users at once
+
+    ``records`` is a list of user dicts or a DataFrame with one user per
+    row. All users are encoded into one feature matrix, so each risk model
+    runs a single ``transform``/``predict_proba`` for the whole batch and
+    clinical adjustments are applied column-wise. Returns one prediction
+    dict per user, in input order, identical to calling
+    predict_enhanced_health_risks on each user.
+
+    A user the single-user function raises for gets ``{'error': ...}``.
+    If ``errors`` is a dict, the exception is also stored in it under the
+    row's index.
+    """
+    if bundle is None:
+        import serving
+        bundle = serving.get_bundle()
+    
+    # A DataFrame is only possible once something has imported pandas
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(records, pd.DataFrame):
+        records = _records_from_frame(records)
+    if not records:
+        return []
+    
+    models = bundle['models']
+    scalers = bundle['scalers']
+    model_performance = bundle['model_performance']
+    
+    # Rows that cannot be encoded, whose adjustment inputs are malformed or
+    # whose bmi cannot be derived take the fallback path, as the single-user
+    # function does when it raises
+    observe = metrics.BATCH_STAGE_SECONDS.observe
+    failed = set()
+    t0 = perf_counter()
+    X = get_feature_encoder(bundle).encode_many(records, failed=failed)
+    # The models reject NaN and infinite features for the whole matrix
+    nonfinite = ~np.isfinite(X).all(axis=1)
+    X[nonfinite] = 0
+    failed.update(np.flatnonzero(nonfinite).tolist())
+    t1 = perf_counter()
+    inputs = _clinical_adjustment_inputs(records)
+    failed.update(i for i, ok in enumerate(inputs['valid']) if not ok)
+    t2 = perf_counter()
+    
+    profiles = [None] * len(records)
+    for i, user_data in enumerate(records):
+        if i in failed:
+            continue
+        try:
+            derived_bmi(user_data)
+            profiles[i] = recommendation_profile(user_data)
+        except Exception as e:
+            print(f"Error in prediction: {str(e)}")
+            failed.add(i)
+    
+    observe('all', metrics.BATCH_INPUT_STAGES, (t1 - t0, t2 - t1, perf_counter() - t2))
+    
+    results = [None] * len(records)
+    
+    for risk_type in models:
+        t0 = perf_counter()
+        X_scaled = scalers[risk_type].transform(X)
+        t1 = perf_counter()
+        risk_probability = _positive_probability(bundle, risk_type, X_scaled)
+        t2 = perf_counter()
+        risk_percentage = apply_clinical_adjustments_batch(
+            risk_type, (risk_probability * 100).astype(int), inputs)
+        t3 = perf_counter()
         
-        for risk_type, model in models.items():
-            # Scale features
-            X_user_scaled = scalers[risk_type].transform(X_user)
-            
-            # Get probability prediction
-            risk_probability = model.predict_proba(X_user_scaled)[0][1]
-            
-            # Convert to percentage and apply clinical adjustments
-            risk_percentage = int(risk_probability * 100)
-            
-            # Apply rule-based adjustments for clinical accuracy
-            risk_percentage = apply_clinical_adjustments(risk_type, risk_percentage, user_data)
-            
-            # Generate detailed recommendations
-            recommendations = generate_enhanced_recommendations(risk_type, risk_percentage, user_data)
-            
-            predictions[risk_type] = {
-                "risk": risk_percentage,
+        for i, profile in enumerate(profiles):
+            if i in failed:
+                continue
+            try:
+                recommendations = recommendations_for_profile(risk_type, profile)
+            except Exception as e:
+                print(f"Error in prediction: {str(e)}")
+                failed.add(i)
+                continue
+            if results[i] is None:
+                results[i] = {}
+            results[i][risk_type] = {
+                "risk": int(risk_percentage[i]),
                 "factors": recommendations,
                 "confidence": model_performance[risk_type]['auc_score']
             }
         
-        return predictions
-        
-    except Exception as e:
-        print(f"Error in prediction: {str(e)}")
-        return generate_fallback_predictions(user_data)
+        observe(risk_type, metrics.MODEL_STAGES, (t1 - t0, t2 - t1, t3 - t2, perf_counter() - t3))
+    
+    for i in sorted(failed):
+        try:
+            results[i] = generate_fallback_predictions(records[i])
+        except Exception as e:
+            results[i] = {'error': str(e)}
+            if errors is not None:
+                errors[i] = e
+    
+    return results
+
+# Serving-side input mappings. Built once at import; the map_* helpers and
+# the compiled FeatureEncoder share them.
+EXERCISE_FREQUENCY_SCORES = {
+    'daily': 7, '4-6-times-week': 5, '2-3-times-week': 2.5,
+    'once-week': 1, 'rarely': 0.5, 'never': 0
+}
+DIET_QUALITY_SCORES = {
+    'mediterranean': 9, 'vegetarian': 8, 'vegan': 8,
+    'omnivore': 6, 'other': 5, 'dont-know': 5
+}
+SMOKING_STATUS_CODES = {'never': 0, 'former': 1, 'occasional': 2, 'regular': 3}
+ALCOHOL_CONSUMPTION_CODES = {'never': 0, 'rarely': 1, 'occasionally': 2, 'weekly': 3, 'daily': 4}
+SLEEP_QUALITY_CODES = {'excellent': 4, 'good': 3, 'fair': 2, 'poor': 1, 'very-poor': 0}
+BLOOD_PRESSURE_CODES = {'normal': 0, 'elevated': 1, 'stage1': 2, 'stage2': 3, 'low': 0, 'unknown': 1}
+CHOLESTEROL_CODES = {'normal': 0, 'borderline': 1, 'high': 2, 'very-high': 3, 'unknown': 1}
+BLOOD_SUGAR_CODES = {
+    '70-100': 0, 'less-than-140': 0, '101-125': 1, '140-199': 1,
+    '126+': 2, '200+': 2, 'dont-know': 1
+}
 
 def map_exercise_frequency(freq_str):
     """Map exercise frequency string to numerical value"""
-    mapping = {
-        'daily': 7, '4-6-times-week': 5, '2-3-times-week': 2.5,
-        'once-week': 1, 'rarely': 0.5, 'never': 0
-    }
-    return mapping.get(freq_str, 2)
+    return EXERCISE_FREQUENCY_SCORES.get(freq_str, 2)
 
 def map_diet_quality(diet_type):
     """Map diet type to quality score"""
-    mapping = {
-        'mediterranean': 9, 'vegetarian': 8, 'vegan': 8,
-        'omnivore': 6, 'other': 5, 'dont-know': 5
-    }
-    return mapping.get(diet_type, 5)
+    return DIET_QUALITY_SCORES.get(diet_type, 5)
 
 def map_smoking_status(status):
     """Map smoking status to numerical value"""
-    mapping = {'never': 0, 'former': 1, 'occasional': 2, 'regular': 3}
-    return mapping.get(status, 0)
+    return SMOKING_STATUS_CODES.get(status, 0)
 
 def map_alcohol_consumption(consumption):
     """Map alcohol consumption to numerical value"""
-    mapping = {'never': 0, 'rarely': 1, 'occasionally': 2, 'weekly': 3, 'daily': 4}
-    return mapping.get(consumption, 0)
+    return ALCOHOL_CONSUMPTION_CODES.get(consumption, 0)
 
 def map_sleep_quality(quality):
     """Map sleep quality to numerical value"""
-    mapping = {'excellent': 4, 'good': 3, 'fair': 2, 'poor': 1, 'very-poor': 0}
-    return mapping.get(quality, 3)
+    return SLEEP_QUALITY_CODES.get(quality, 3)
 
 def map_blood_pressure(bp):
     """Map blood pressure to numerical value"""
-    mapping = {'normal': 0, 'elevated': 1, 'stage1': 2, 'stage2': 3, 'low': 0, 'unknown': 1}
-    return mapping.get(bp, 0)
+    return BLOOD_PRESSURE_CODES.get(bp, 0)
 
 def map_cholesterol(chol):
     """Map cholesterol to numerical value"""
-    mapping = {'normal': 0, 'borderline': 1, 'high': 2, 'very-high': 3, 'unknown': 1}
-    return mapping.get(chol, 0)
+    return CHOLESTEROL_CODES.get(chol, 0)
 
 def map_blood_sugar(bs):
     """Map blood sugar to numerical value"""
-    mapping = {
-        '70-100': 0, 'less-than-140': 0, '101-125': 1, '140-199': 1,
-        '126+': 2, '200+': 2, 'dont-know': 1
-    }
-    return mapping.get(bs, 0)
+    return BLOOD_SUGAR_CODES.get(bs, 0)
+
+# Clinical knowledge-based adjustments of the model risks, as rule tables
+# over the request fields (camelCase) and the converted age and BMI
+AGE_ADJUSTMENT = rules.bump((at_least('age', 70), 5, 85), (at_least('age', 60), 3, 80))
+SEVERE_OBESITY_ADJUSTMENT = rules.bump((at_least('bmi', 40), 8, 85))
+CLINICAL_RISK_FACTORS = [
+    one_of('smokingStatus', ['occasional', 'regular']),
+    one_of('bloodPressure', ['stage1', 'stage2']),
+    one_of('cholesterolLevels', ['high', 'very-high']),
+    one_of('bloodSugarLevel', ['126+', '200+'])
+]
+# Multiple risk factor syndrome
+MULTIPLE_RISK_FACTOR_ADJUSTMENT = rules.bump(
+    (rules.at_least_n(3, CLINICAL_RISK_FACTORS), 10, 85),
+    (rules.at_least_n(2, CLINICAL_RISK_FACTORS), 5, 80)
+)
+OBESITY_RISK_TYPES = ['cardiovascular', 'metabolic', 'chronic']
+
+def clinical_adjustment_rules(risk_type):
+    """Adjustment table for ``risk_type``"""
+    steps = [AGE_ADJUSTMENT]
+    if risk_type in OBESITY_RISK_TYPES:
+        steps.append(SEVERE_OBESITY_ADJUSTMENT)
+    steps.append(MULTIPLE_RISK_FACTOR_ADJUSTMENT)
+    return rules.adjustment_table(steps, low=5)
+
+@lru_cache(maxsize=None)
+def _clinical_adjusters(risk_type):
+    table = clinical_adjustment_rules(risk_type)
+    return rules.compile_scalar(table), rules.compile_vector(table)
+
+CLINICAL_INPUT_KEYS = [condition.column for condition in CLINICAL_RISK_FACTORS]
 
 def apply_clinical_adjustments(risk_type, base_risk, user_data):
     """Apply clinical knowledge-based adjustments to ML predictions"""
-    adjusted_risk = base_risk
-    
-    age = int(user_data.get('age', 30))
-    bmi = float(user_data.get('bmi', 25))
-    
-    # Age-based adjustments
-    if age >= 70:
-        adjusted_risk = min(85, adjusted_risk + 5)
-    elif age >= 60:
-        adjusted_risk = min(80, adjusted_risk + 3)
-    
-    # Severe obesity adjustment
-    if bmi >= 40:
-        if risk_type in ['cardiovascular', 'metabolic', 'chronic']:
-            adjusted_risk = min(85, adjusted_risk + 8)
-    
-    # Multiple risk factor syndrome
-    risk_factors = 0
-    if user_data.get('smokingStatus') in ['occasional', 'regular']:
-        risk_factors += 1
-    if user_data.get('bloodPressure') in ['stage1', 'stage2']:
-        risk_factors += 1
-    if user_data.get('cholesterolLevels') in ['high', 'very-high']:
-        risk_factors += 1
-    if user_data.get('bloodSugarLevel') in ['126+', '200+']:
-        risk_factors += 1
-    
-    if risk_factors >= 3:
-        adjusted_risk = min(85, adjusted_risk + 10)
-    elif risk_factors >= 2:
-        adjusted_risk = min(80, adjusted_risk + 5)
-    
-    return max(5, adjusted_risk)
+    row = {key: user_data.get(key) for key in CLINICAL_INPUT_KEYS}
+    row['age'] = int(user_data.get('age', 30))
+    row['bmi'] = float(user_data.get('bmi', 25))
+    return _clinical_adjusters(risk_type)[0](base_risk, row)
 
-def generate_enhanced_recommendations(risk_type, risk_score, user_data):
-    """Generate detailed, personalized recommendations"""
-    recommendations = []
-    
-    age = int(user_data.get('age', 30))
-    bmi = float(user_data.get('bmi', 25))
-    exercise_freq = user_data.get('exerciseFrequency', 'rarely')
-    
-    if risk_type == 'cardiovascular':
+def _clinical_adjustment_inputs(records):
+    """Columns read by apply_clinical_adjustments, converted once per batch.
+
+    ``valid`` is False for rows whose age or BMI cannot be converted; the
+    scalar function raises on those rows.
+    """
+    n_rows = len(records)
+    age = np.zeros(n_rows, dtype=np.int64)
+    bmi = np.zeros(n_rows)
+    valid = np.ones(n_rows, dtype=bool)
+    for i, user_data in enumerate(records):
+        try:
+            age[i] = int(user_data.get('age', 30))
+            bmi[i] = float(user_data.get('bmi', 25))
+        except (TypeError, ValueError, OverflowError):
+            valid[i] = False
+    
+    inputs = {key: [user_data.get(key) for user_data in records] for key in CLINICAL_INPUT_KEYS}
+    inputs.update(age=age, bmi=bmi)
+    return {'columns': rules.Columns(inputs), 'valid': valid}
+
+def apply_clinical_adjustments_batch(risk_type, base_risk, inputs):
+    """Column-wise apply_clinical_adjustments over a batch of base risks.
+
+    ``inputs`` comes from _clinical_adjustment_inputs; the result equals
+    the scalar function applied to each row.
+    """
+    return _clinical_adjusters(risk_type)[1](base_risk, inputs['columns'])
+
+# A recommendation template: ``applies(profile)`` decides whether it is
+# shown, ``output`` is the read-only rendered mapping, and
+# ``render(profile)`` replaces ``output`` for text that depends on the user.
+RecommendationTemplate = namedtuple('RecommendationTemplate', ['applies', 'output', 'render'])
+
+# User fields the recommendation rules read, converted once per call
+RecommendationProfile = namedtuple(
+    'RecommendationProfile', ['user_data', 'age', 'bmi', 'exercise_freq', 'sleep_hours', 'stress_level'])
+
+MAX_RECOMMENDATIONS = 5
+MIN_RECOMMENDATIONS = 3
+
+def _recommendation(applies, name, impact, suggestion, timeframe, difficulty, evidence, details,
+                    render=None):
+    return RecommendationTemplate(applies, MappingProxyType({
+        "name": name,
+        "impact": impact,
+        "suggestion": suggestion,
+        "timeframe": timeframe,
+        "difficulty": difficulty,
+        "evidence": evidence,
+        "details": details
+    }), render)
+
+def _always(profile):
+    return True
+
+def _exercises_rarely(profile):
+    return profile.exercise_freq in ['rarely', 'never']
+
+def _short_sleep(profile):
+    return profile.sleep_hours < 7
+
+def _poor_sleep_quality(profile):
+    return profile.user_data.get('sleepQuality') in ['poor', 'fair']
+
+def _has_family_history(profile):
+    family_history = profile.user_data.get('familyHistory')
+    return bool(family_history) and 'none' not in profile.user_data.get('familyHistory', [])
+
+@lru_cache(maxsize=256)
+def _sleep_duration_output(sleep_hours_text):
+    return MappingProxyType(dict(
+        SLEEP_DURATION_RECOMMENDATION.output,
+        suggestion=f"Increase sleep duration to 7-9 hours nightly (currently {sleep_hours_text} hours)"
+    ))
+
+def _render_sleep_duration(profile):
+    # Keyed on the formatted value so that e.g. -0.0 and 0.0 render as the original did
+    return _sleep_duration_output(f"{profile.sleep_hours}")
+
+SLEEP_DURATION_RECOMMENDATION = _recommendation(
+    _short_sleep,
+    "Sleep Duration Optimization",
+    "High negative impact",
+    "Increase sleep duration to 7-9 hours nightly",
+    "immediate",
+    "moderate",
+    "strong",
+    "Insufficient sleep affects hormone regulation, immune function, and cognitive performance. Consistent sleep duration is crucial for health.",
+    render=_render_sleep_duration
+)
+
+GENERAL_RECOMMENDATION = _recommendation(
+    _always,
+    "General Health Maintenance",
+    "Medium positive impact",
+    "Maintain regular health habits and stay informed about health best practices",
+    "long-term",
+    "easy",
+    "moderate",
+    "Consistent healthy habits are the foundation of disease prevention and overall wellbeing."
+)
+
+# Recommendation catalog per risk type, in priority order
+RECOMMENDATION_CATALOG = MappingProxyType({
+    'cardiovascular': (
         # Exercise recommendations
-        if exercise_freq in ['rarely', 'never']:
-            recommendations.append({
-                "name": "Cardiovascular Exercise",
-                "impact": "High negative impact",
-                "suggestion": "Start with 150 minutes of moderate aerobic activity weekly, such as brisk walking",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Regular aerobic exercise strengthens the heart muscle, improves circulation, and can reduce cardiovascular disease risk by up to 35%. Start gradually and increase intensity over time."
-            })
-        
+        _recommendation(
+            _exercises_rarely,
+            "Cardiovascular Exercise",
+            "High negative impact",
+            "Start with 150 minutes of moderate aerobic activity weekly, such as brisk walking",
+            "immediate",
+            "moderate",
+            "strong",
+            "Regular aerobic exercise strengthens the heart muscle, improves circulation, and can reduce cardiovascular disease risk by up to 35%. Start gradually and increase intensity over time."
+        ),
         # Blood pressure management
-        if user_data.get('bloodPressure') in ['stage1', 'stage2']:
-            recommendations.append({
-                "name": "Blood Pressure Management",
-                "impact": "High negative impact",
-                "suggestion": "Reduce sodium intake to less than 2,300mg daily and consult your healthcare provider",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "High blood pressure significantly increases cardiovascular risk. Dietary changes, weight management, and medication when necessary can effectively control blood pressure."
-            })
-        
+        _recommendation(
+            lambda profile: profile.user_data.get('bloodPressure') in ['stage1', 'stage2'],
+            "Blood Pressure Management",
+            "High negative impact",
+            "Reduce sodium intake to less than 2,300mg daily and consult your healthcare provider",
+            "immediate",
+            "moderate",
+            "strong",
+            "High blood pressure significantly increases cardiovascular risk. Dietary changes, weight management, and medication when necessary can effectively control blood pressure."
+        ),
         # Smoking cessation
-        if user_data.get('smokingStatus') in ['occasional', 'regular']:
-            recommendations.append({
-                "name": "Smoking Cessation",
-                "impact": "High negative impact",
-                "suggestion": "Quit smoking immediately - consider nicotine replacement therapy or counseling",
-                "timeframe": "immediate",
-                "difficulty": "challenging",
-                "evidence": "strong",
-                "details": "Smoking increases cardiovascular disease risk by 2-4 times. Quitting smoking can reduce heart disease risk by 50% within one year of quitting."
-            })
-        
+        _recommendation(
+            lambda profile: profile.user_data.get('smokingStatus') in ['occasional', 'regular'],
+            "Smoking Cessation",
+            "High negative impact",
+            "Quit smoking immediately - consider nicotine replacement therapy or counseling",
+            "immediate",
+            "challenging",
+            "strong",
+            "Smoking increases cardiovascular disease risk by 2-4 times. Quitting smoking can reduce heart disease risk by 50% within one year of quitting."
+        ),
         # Weight management
-        if bmi >= 30:
-            recommendations.append({
-                "name": "Weight Management",
-                "impact": "Medium negative impact",
-                "suggestion": "Aim for a 5-10% weight reduction through caloric deficit and increased physical activity",
-                "timeframe": "medium-term",
-                "difficulty": "challenging",
-                "evidence": "strong",
-                "details": "Obesity increases cardiovascular risk through multiple mechanisms. Even modest weight loss can significantly improve cardiovascular health markers."
-            })
-        
+        _recommendation(
+            lambda profile: profile.bmi >= 30,
+            "Weight Management",
+            "Medium negative impact",
+            "Aim for a 5-10% weight reduction through caloric deficit and increased physical activity",
+            "medium-term",
+            "challenging",
+            "strong",
+            "Obesity increases cardiovascular risk through multiple mechanisms. Even modest weight loss can significantly improve cardiovascular health markers."
+        ),
         # Cholesterol management
-        if user_data.get('cholesterolLevels') in ['high', 'very-high']:
-            recommendations.append({
-                "name": "Cholesterol Management",
-                "impact": "Medium negative impact",
-                "suggestion": "Adopt a heart-healthy diet low in saturated fats and high in fiber",
-                "timeframe": "short-term",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "High cholesterol contributes to atherosclerosis. A diet rich in fruits, vegetables, whole grains, and lean proteins can help lower cholesterol levels naturally."
-            })
-    
-    elif risk_type == 'metabolic':
+        _recommendation(
+            lambda profile: profile.user_data.get('cholesterolLevels') in ['high', 'very-high'],
+            "Cholesterol Management",
+            "Medium negative impact",
+            "Adopt a heart-healthy diet low in saturated fats and high in fiber",
+            "short-term",
+            "moderate",
+            "strong",
+            "High cholesterol contributes to atherosclerosis. A diet rich in fruits, vegetables, whole grains, and lean proteins can help lower cholesterol levels naturally."
+        )
+    ),
+    'metabolic': (
         # Physical activity
-        if exercise_freq in ['rarely', 'never']:
-            recommendations.append({
-                "name": "Regular Physical Activity",
-                "impact": "High negative impact",
-                "suggestion": "Combine 150 minutes of aerobic exercise with 2 days of strength training weekly",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Exercise improves insulin sensitivity and glucose metabolism. Both aerobic and resistance training are important for metabolic health."
-            })
-        
+        _recommendation(
+            _exercises_rarely,
+            "Regular Physical Activity",
+            "High negative impact",
+            "Combine 150 minutes of aerobic exercise with 2 days of strength training weekly",
+            "immediate",
+            "moderate",
+            "strong",
+            "Exercise improves insulin sensitivity and glucose metabolism. Both aerobic and resistance training are important for metabolic health."
+        ),
         # Blood sugar management
-        if user_data.get('bloodSugarLevel') in ['101-125', '126+', '140-199', '200+']:
-            recommendations.append({
-                "name": "Blood Sugar Management",
-                "impact": "High negative impact",
-                "suggestion": "Monitor blood glucose regularly and follow a low-glycemic diet",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Elevated blood sugar indicates prediabetes or diabetes. Lifestyle interventions can prevent or delay type 2 diabetes by up to 58%."
-            })
-        
+        _recommendation(
+            lambda profile: profile.user_data.get('bloodSugarLevel') in ['101-125', '126+', '140-199', '200+'],
+            "Blood Sugar Management",
+            "High negative impact",
+            "Monitor blood glucose regularly and follow a low-glycemic diet",
+            "immediate",
+            "moderate",
+            "strong",
+            "Elevated blood sugar indicates prediabetes or diabetes. Lifestyle interventions can prevent or delay type 2 diabetes by up to 58%."
+        ),
         # Weight management for metabolic health
-        if bmi >= 25:
-            recommendations.append({
-                "name": "Metabolic Weight Management",
-                "impact": "High negative impact",
-                "suggestion": "Focus on reducing abdominal fat through diet and exercise",
-                "timeframe": "medium-term",
-                "difficulty": "challenging",
-                "evidence": "strong",
-                "details": "Excess weight, especially abdominal fat, increases insulin resistance and metabolic syndrome risk. Even a 5% weight loss can improve metabolic markers."
-            })
-        
+        _recommendation(
+            lambda profile: profile.bmi >= 25,
+            "Metabolic Weight Management",
+            "High negative impact",
+            "Focus on reducing abdominal fat through diet and exercise",
+            "medium-term",
+            "challenging",
+            "strong",
+            "Excess weight, especially abdominal fat, increases insulin resistance and metabolic syndrome risk. Even a 5% weight loss can improve metabolic markers."
+        ),
         # Dietary recommendations
-        recommendations.append({
-            "name": "Metabolic Diet Optimization",
-            "impact": "Medium negative impact",
-            "suggestion": "Emphasize whole foods, limit processed carbohydrates, and include healthy fats",
-            "timeframe": "short-term",
-            "difficulty": "moderate",
-            "evidence": "strong",
-            "details": "A Mediterranean-style diet with controlled portions can improve insulin sensitivity and reduce metabolic syndrome risk."
-        })
-    
-    elif risk_type == 'sleep':
+        _recommendation(
+            _always,
+            "Metabolic Diet Optimization",
+            "Medium negative impact",
+            "Emphasize whole foods, limit processed carbohydrates, and include healthy fats",
+            "short-term",
+            "moderate",
+            "strong",
+            "A Mediterranean-style diet with controlled portions can improve insulin sensitivity and reduce metabolic syndrome risk."
+        )
+    ),
+    'sleep': (
         # Sleep duration
-        sleep_hours = float(user_data.get('sleepHours', 7))
-        if sleep_hours < 7:
-            recommendations.append({
-                "name": "Sleep Duration Optimization",
-                "impact": "High negative impact",
-                "suggestion": f"Increase sleep duration to 7-9 hours nightly (currently {sleep_hours} hours)",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Insufficient sleep affects hormone regulation, immune function, and cognitive performance. Consistent sleep duration is crucial for health."
-            })
-        
+        SLEEP_DURATION_RECOMMENDATION,
         # Sleep quality
-        if user_data.get('sleepQuality') in ['poor', 'fair']:
-            recommendations.append({
-                "name": "Sleep Quality Improvement",
-                "impact": "High negative impact",
-                "suggestion": "Establish a consistent bedtime routine and optimize sleep environment",
-                "timeframe": "immediate",
-                "difficulty": "easy",
-                "evidence": "strong",
-                "details": "Poor sleep quality can be improved through sleep hygiene practices: consistent schedule, cool dark room, avoiding screens before bed."
-            })
-        
+        _recommendation(
+            _poor_sleep_quality,
+            "Sleep Quality Improvement",
+            "High negative impact",
+            "Establish a consistent bedtime routine and optimize sleep environment",
+            "immediate",
+            "easy",
+            "strong",
+            "Poor sleep quality can be improved through sleep hygiene practices: consistent schedule, cool dark room, avoiding screens before bed."
+        ),
         # Stress and sleep
-        if int(user_data.get('stressLevel', 5)) >= 7:
-            recommendations.append({
-                "name": "Stress-Related Sleep Issues",
-                "impact": "Medium negative impact",
-                "suggestion": "Practice relaxation techniques before bedtime to manage stress",
-                "timeframe": "short-term",
-                "difficulty": "easy",
-                "evidence": "moderate",
-                "details": "High stress levels interfere with sleep quality. Meditation, deep breathing, or progressive muscle relaxation can improve sleep."
-            })
-    
-    elif risk_type == 'mental':
+        _recommendation(
+            lambda profile: profile.stress_level >= 7,
+            "Stress-Related Sleep Issues",
+            "Medium negative impact",
+            "Practice relaxation techniques before bedtime to manage stress",
+            "short-term",
+            "easy",
+            "moderate",
+            "High stress levels interfere with sleep quality. Meditation, deep breathing, or progressive muscle relaxation can improve sleep."
+        )
+    ),
+    'mental': (
         # Stress management
-        stress_level = int(user_data.get('stressLevel', 5))
-        if stress_level >= 8:
-            recommendations.append({
-                "name": "Stress Management",
-                "impact": "High negative impact",
-                "suggestion": "Consider professional counseling and learn stress reduction techniques",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Chronic high stress significantly impacts mental health. Professional support and stress management techniques can provide effective relief."
-            })
-        
+        _recommendation(
+            lambda profile: profile.stress_level >= 8,
+            "Stress Management",
+            "High negative impact",
+            "Consider professional counseling and learn stress reduction techniques",
+            "immediate",
+            "moderate",
+            "strong",
+            "Chronic high stress significantly impacts mental health. Professional support and stress management techniques can provide effective relief."
+        ),
         # Physical activity for mental health
-        if exercise_freq in ['rarely', 'never']:
-            recommendations.append({
-                "name": "Exercise for Mental Health",
-                "impact": "High negative impact",
-                "suggestion": "Engage in regular physical activity, particularly outdoor activities",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Exercise is as effective as medication for mild to moderate depression and anxiety. Aim for at least 30 minutes of activity most days."
-            })
-        
+        _recommendation(
+            _exercises_rarely,
+            "Exercise for Mental Health",
+            "High negative impact",
+            "Engage in regular physical activity, particularly outdoor activities",
+            "immediate",
+            "moderate",
+            "strong",
+            "Exercise is as effective as medication for mild to moderate depression and anxiety. Aim for at least 30 minutes of activity most days."
+        ),
         # Sleep and mental health
-        if sleep_hours < 7 or user_data.get('sleepQuality') in ['poor', 'fair']:
-            recommendations.append({
-                "name": "Sleep for Mental Health",
-                "impact": "Medium negative impact",
-                "suggestion": "Prioritize sleep hygiene as poor sleep significantly affects mood",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Sleep and mental health are closely linked. Poor sleep can worsen anxiety and depression, while good sleep supports emotional regulation."
-            })
-        
+        _recommendation(
+            lambda profile: _short_sleep(profile) or _poor_sleep_quality(profile),
+            "Sleep for Mental Health",
+            "Medium negative impact",
+            "Prioritize sleep hygiene as poor sleep significantly affects mood",
+            "immediate",
+            "moderate",
+            "strong",
+            "Sleep and mental health are closely linked. Poor sleep can worsen anxiety and depression, while good sleep supports emotional regulation."
+        ),
         # Social connections
-        recommendations.append({
-            "name": "Social Connection",
-            "impact": "Medium positive impact",
-            "suggestion": "Maintain regular social interactions and consider joining community groups",
-            "timeframe": "short-term",
-            "difficulty": "easy",
-            "evidence": "strong",
-            "details": "Strong social connections are protective against mental health issues and can provide support during difficult times."
-        })
-    
-    elif risk_type == 'immune':
+        _recommendation(
+            _always,
+            "Social Connection",
+            "Medium positive impact",
+            "Maintain regular social interactions and consider joining community groups",
+            "short-term",
+            "easy",
+            "strong",
+            "Strong social connections are protective against mental health issues and can provide support during difficult times."
+        )
+    ),
+    'immune': (
         # Sleep for immunity
-        if sleep_hours < 7:
-            recommendations.append({
-                "name": "Sleep for Immune Function",
-                "impact": "High negative impact",
-                "suggestion": "Prioritize 7-9 hours of quality sleep for optimal immune function",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Sleep is crucial for immune system function. During sleep, the body produces infection-fighting cells and antibodies."
-            })
-        
+        _recommendation(
+            _short_sleep,
+            "Sleep for Immune Function",
+            "High negative impact",
+            "Prioritize 7-9 hours of quality sleep for optimal immune function",
+            "immediate",
+            "moderate",
+            "strong",
+            "Sleep is crucial for immune system function. During sleep, the body produces infection-fighting cells and antibodies."
+        ),
         # Nutrition for immunity
-        recommendations.append({
-            "name": "Immune-Supporting Nutrition",
-            "impact": "Medium positive impact",
-            "suggestion": "Eat a variety of colorful fruits and vegetables rich in vitamins and antioxidants",
-            "timeframe": "immediate",
-            "difficulty": "easy",
-            "evidence": "strong",
-            "details": "A diverse diet rich in vitamins C, D, zinc, and antioxidants supports immune system function and helps fight infections."
-        })
-        
+        _recommendation(
+            _always,
+            "Immune-Supporting Nutrition",
+            "Medium positive impact",
+            "Eat a variety of colorful fruits and vegetables rich in vitamins and antioxidants",
+            "immediate",
+            "easy",
+            "strong",
+            "A diverse diet rich in vitamins C, D, zinc, and antioxidants supports immune system function and helps fight infections."
+        ),
         # Exercise for immunity
-        if exercise_freq in ['rarely', 'never']:
-            recommendations.append({
-                "name": "Moderate Exercise for Immunity",
-                "impact": "Medium negative impact",
-                "suggestion": "Engage in moderate regular exercise to boost immune function",
-                "timeframe": "immediate",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Moderate exercise enhances immune function, while excessive exercise can temporarily suppress immunity. Aim for consistency over intensity."
-            })
-        
+        _recommendation(
+            _exercises_rarely,
+            "Moderate Exercise for Immunity",
+            "Medium negative impact",
+            "Engage in moderate regular exercise to boost immune function",
+            "immediate",
+            "moderate",
+            "strong",
+            "Moderate exercise enhances immune function, while excessive exercise can temporarily suppress immunity. Aim for consistency over intensity."
+        ),
         # Stress and immunity
-        if stress_level >= 7:
-            recommendations.append({
-                "name": "Stress Management for Immunity",
-                "impact": "Medium negative impact",
-                "suggestion": "Practice stress reduction as chronic stress suppresses immune function",
-                "timeframe": "short-term",
-                "difficulty": "moderate",
-                "evidence": "strong",
-                "details": "Chronic stress elevates cortisol levels, which can suppress immune system function and increase susceptibility to infections."
-            })
-    
-    elif risk_type == 'chronic':
+        _recommendation(
+            lambda profile: profile.stress_level >= 7,
+            "Stress Management for Immunity",
+            "Medium negative impact",
+            "Practice stress reduction as chronic stress suppresses immune function",
+            "short-term",
+            "moderate",
+            "strong",
+            "Chronic stress elevates cortisol levels, which can suppress immune system function and increase susceptibility to infections."
+        )
+    ),
+    'chronic': (
         # Comprehensive lifestyle approach
-        recommendations.append({
-            "name": "Comprehensive Lifestyle Modification",
-            "impact": "High negative impact",
-            "suggestion": "Adopt a holistic approach addressing diet, exercise, sleep, and stress management",
-            "timeframe": "medium-term",
-            "difficulty": "challenging",
-            "evidence": "strong",
-            "details": "Chronic disease prevention requires a comprehensive approach. Small changes in multiple areas can have significant cumulative effects."
-        })
-        
+        _recommendation(
+            _always,
+            "Comprehensive Lifestyle Modification",
+            "High negative impact",
+            "Adopt a holistic approach addressing diet, exercise, sleep, and stress management",
+            "medium-term",
+            "challenging",
+            "strong",
+            "Chronic disease prevention requires a comprehensive approach. Small changes in multiple areas can have significant cumulative effects."
+        ),
         # Regular health monitoring
-        if age >= 40:
-            recommendations.append({
-                "name": "Regular Health Screenings",
-                "impact": "Medium positive impact",
-                "suggestion": "Schedule regular health checkups and screenings appropriate for your age",
-                "timeframe": "short-term",
-                "difficulty": "easy",
-                "evidence": "strong",
-                "details": "Early detection through regular screenings can prevent or catch chronic diseases in their early, more treatable stages."
-            })
-        
+        _recommendation(
+            lambda profile: profile.age >= 40,
+            "Regular Health Screenings",
+            "Medium positive impact",
+            "Schedule regular health checkups and screenings appropriate for your age",
+            "short-term",
+            "easy",
+            "strong",
+            "Early detection through regular screenings can prevent or catch chronic diseases in their early, more treatable stages."
+        ),
         # Family history considerations
-        if user_data.get('familyHistory') and 'none' not in user_data.get('familyHistory', []):
-            recommendations.append({
-                "name": "Family History Awareness",
-                "impact": "Medium negative impact",
-                "suggestion": "Discuss your family history with healthcare providers for personalized prevention strategies",
-                "timeframe": "short-term",
-                "difficulty": "easy",
-                "evidence": "strong",
-                "details": "Family history provides important information about genetic predispositions and can guide personalized prevention strategies."
-            })
+        _recommendation(
+            _has_family_history,
+            "Family History Awareness",
+            "Medium negative impact",
+            "Discuss your family history with healthcare providers for personalized prevention strategies",
+            "short-term",
+            "easy",
+            "strong",
+            "Family history provides important information about genetic predispositions and can guide personalized prevention strategies."
+        )
+    )
+})
+
+def recommendation_profile(user_data):
+    """Convert the fields the recommendation rules read; raises on malformed input"""
+    return RecommendationProfile(
+        user_data,
+        int(user_data.get('age', 30)),
+        float(user_data.get('bmi', 25)),
+        user_data.get('exerciseFrequency', 'rarely'),
+        float(user_data.get('sleepHours', 7)),
+        int(user_data.get('stressLevel', 5))
+    )
+
+def recommendations_for_profile(risk_type, profile):
+    """Recommendations for one risk type from a RecommendationProfile
+
+    Walks the precompiled RECOMMENDATION_CATALOG for ``risk_type`` and stops
+    at the first MAX_RECOMMENDATIONS that apply. The catalog is read-only;
+    each call returns its own dicts, which the caller may modify.
+    """
+    recommendations = []
+    for template in RECOMMENDATION_CATALOG.get(risk_type, ()):
+        if template.applies(profile):
+            recommendations.append(dict(template.render(profile) if template.render else template.output))
+            if len(recommendations) == MAX_RECOMMENDATIONS:
+                break
     
     # Ensure we have at least 3 recommendations
-    while len(recommendations) < 3:
-        recommendations.append({
-            "name": "General Health Maintenance",
-            "impact": "Medium positive impact",
-            "suggestion": "Maintain regular health habits and stay informed about health best practices",
-            "timeframe": "long-term",
-            "difficulty": "easy",
-            "evidence": "moderate",
-            "details": "Consistent healthy habits are the foundation of disease prevention and overall wellbeing."
-        })
+    while len(recommendations) < MIN_RECOMMENDATIONS:
+        recommendations.append(dict(GENERAL_RECOMMENDATION.output))
     
-    return recommendations[:5]  # Return top 5 recommendations
+    return recommendations
+
+def generate_enhanced_recommendations(risk_type, risk_score, user_data):
+    """Generate detailed, personalized recommendations"""
+    return recommendations_for_profile(risk_type, recommendation_profile(user_data))
 
 def generate_fallback_predictions(user_data):
-    """Generate basic predictions if ML model fails"""
+    """Generate basic predictions if ML model fails; each risk type is marked ``'fallback': True``"""
     age = int(user_data.get('age', 30))
     bmi = float(user_data.get('bmi', 25))
     
     base_risk = 20 + (age - 30) * 0.5 + max(0, bmi - 25) * 2
     
     return {
-        'cardiovascular': {"risk": int(base_risk), "factors": []},
-        'metabolic': {"risk": int(base_risk * 0.8), "factors": []},
-        'sleep': {"risk": int(base_risk * 0.6), "factors": []},
-        'mental': {"risk": int(base_risk * 0.7), "factors": []},
-        'immune': {"risk": int(base_risk * 0.5), "factors": []},
-        'chronic': {"risk": int(base_risk * 1.2), "factors": []}
+        'cardiovascular': {"risk": int(base_risk), "factors": [], "fallback": True},
+        'metabolic': {"risk": int(base_risk * 0.8), "factors": [], "fallback": True},
+        'sleep': {"risk": int(base_risk * 0.6), "factors": [], "fallback": True},
+        'mental': {"risk": int(base_risk * 0.7), "factors": [], "fallback": True},
+        'immune': {"risk": int(base_risk * 0.5), "factors": [], "fallback": True},
+        'chronic': {"risk": int(base_risk * 1.2), "factors": [], "fallback": True}
     }
 
-# Print model performance summary
-print("\n" + "="*50)
-print("ENHANCED MODEL PERFORMANCE SUMMARY")
-print("="*50)
-for risk_type, performance in model_performance.items():
-    print(f"\n{risk_type.upper()} RISK MODEL:")
-    print(f"  Algorithm: {performance['algorithm']}")
-    print(f"  Accuracy: {performance['accuracy']:.4f}")
-    print(f"  AUC Score: {performance['auc_score']:.4f}")
-    print(f"  Cross-validation Score: {performance['cv_score']:.4f}")
-
-print(f"\nDataset size: {len(data)} samples")
-print(f"Feature count: {X.shape[1]}")
-print("\nModels trained and ready for enhanced predictions!")
-
 # Example usage with enhanced prediction
 if __name__ == "__main__":
     # Example user data
@@ -1212,8 +1307,14 @@ if __name__ == "__main__":
         'existingConditions': ['none']
     }
     
-    # Get enhanced predictions
-    predictions = predict_enhanced_health_risks(example_user)
+    # Get enhanced predictions from the trained model bundle
+    import serving
+    try:
+        bundle = serving.get_bundle()
+    except FileNotFoundError as e:
+        raise SystemExit(f"{e}\nRun `python train.py` to train and save the models first.")
+    
+    predictions = predict_enhanced_health_risks(example_user, bundle)
     
     print("\n" + "="*50)
     print("ENHANCED HEALTH RISK PREDICTIONS")
@@ -0,0 +1,182 @@
+"""
+LRU + TTL cache for prediction results.
+
+The models only see the 25-column encoded feature vector, so users that
+encode to the same vector get the same model outputs. Entries are keyed by
+that vector at the float64 precision the scalers see, so inputs that
+differ only beyond float32 precision get separate entries. Keys also hold
+the bundle version and the raw fields that clinical adjustments and
+recommendations read after the models run (age, bmi, exerciseFrequency,
+sleepHours, ...). Those fields can differ between users
+whose vectors match, because the encoder reads its numeric inputs from
+different keys. Fields that reach neither the encoder nor those rules do
+not split the cache.
+
+Configured from the environment:
+
+    HEALTH_CACHE_MAX_ENTRIES  entry cap, 0 disables the cache (default 10000)
+    HEALTH_CACHE_MAX_BYTES    approximate memory cap (default 64 MiB)
+    HEALTH_CACHE_TTL          seconds an entry stays valid (default 300)
+
+Results with a risk type degraded by the prediction deadline are not
+cached. Cached results are shared between callers and must be treated as
+read-only.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from predict import derived_bmi, get_feature_encoder, is_degraded, predict_enhanced_health_risks
+
+
+def _approx_size(obj):
+    """Rough deep size of a prediction result in bytes"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _approx_size(key) + _approx_size(value)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            size += _approx_size(item)
+    return size
+
+
+def _post_model_fields(user_data):
+    """Canonical form of the raw fields read after the models run.
+
+    Values are converted the way predict.py converts them, so inputs such
+    as ``30`` and ``"30"`` share an entry. ``sleepHours`` is kept as its
+    rendered text since it appears in recommendation strings.
+    """
+    get = user_data.get
+    family_history = get('familyHistory')
+    return (
+        int(get('age', 30)),
+        float(get('bmi', 25)),
+        get('exerciseFrequency', 'rarely'),
+        repr(float(get('sleepHours', 7))),
+        int(get('stressLevel', 5)),
+        get('smokingStatus'),
+        get('bloodPressure'),
+        get('cholesterolLevels'),
+        get('bloodSugarLevel'),
+        get('sleepQuality'),
+        bool(family_history) and 'none' not in get('familyHistory', [])
+    )
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of prediction results with per-entry expiry"""
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=300.0,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, size, result)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def key(self, user_data, bundle):
+        """Cache key for one user, or None if the input cannot be keyed"""
+        version = bundle.get('version')
+        if version is None:
+            return None
+        try:
+            # Raises for the malformed weight or height that sends a user to the fallback
+            derived_bmi(user_data)
+            key = (
+                version,
+                get_feature_encoder(bundle).encode(user_data).astype(np.float64, copy=False).tobytes(),
+                _post_model_fields(user_data)
+            )
+            hash(key)
+        except Exception:
+            # Malformed or unhashable input; let the predictor handle it
+            return None
+        return key
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, result):
+        size = _approx_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl, size, result)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Drop every entry, e.g. after a new bundle is loaded"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def predict(self, user_data, bundle):
+        """``predict_enhanced_health_risks`` through the cache"""
+        key = self.key(user_data, bundle) if self.enabled else None
+        if key is None:
+            return predict_enhanced_health_risks(user_data, bundle)
+
+        result = self.get(key)
+        if result is None:
+            result = predict_enhanced_health_risks(user_data, bundle)
+            # A degraded result only reflects this request's deadline
+            if not is_degraded(result):
+                self.put(key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+def from_env():
+    """Cache configured from the HEALTH_CACHE_* environment variables"""
+    return PredictionCache(
+        max_entries=int(os.environ.get('HEALTH_CACHE_MAX_ENTRIES', 10000)),
+        max_bytes=int(os.environ.get('HEALTH_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        ttl=float(os.environ.get('HEALTH_CACHE_TTL', 300))
+    )
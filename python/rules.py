@@ -0,0 +1,513 @@
+"""
+Declarative rule tables and their scalar and NumPy evaluators.
+
+A rule table states a scoring scheme as data: thresholds, category
+weights and caps. ``compile_scalar`` turns it into a function of one row
+(any mapping, e.g. a dict or a DataFrame row). ``compile_vector`` turns it
+into a function of columns (a mapping of equal-length arrays, lists or
+Series, e.g. a DataFrame). Both evaluators give identical results, so a
+rule is changed once, in its table.
+
+Conditions test one row:
+
+    at_least('age', 65)             row['age'] >= 65 (also above, at_most, below)
+    between('age', 18, 25)          18 <= row['age'] <= 25
+    equals('gender', 'male')        row['gender'] == 'male'
+    one_of('bp', ['stage1', ...])   row['bp'] in [...]
+    has('family_history', 'stroke') 'stroke' in row['family_history']
+    is_set('has_cardio')            bool(row['has_cardio'])
+    all_of(...), any_of(...), negate(...), at_least_n(2, [...])
+
+Three kinds of tables:
+
+    points_table(rules, low, high)
+        Integer points. Each rule adds the points of the first matching
+        tier (``tiers``, ``when``), a category's score (``lookup``) or a
+        weight per list item (``count``). The sum is clamped to
+        [low, high].
+    adjustment_table(steps, low)
+        Adjusts a given risk. Each step (``bump``) adds the delta of its
+        first matching tier and caps the result, i.e.
+        ``min(cap, risk + delta)``. The result is at least ``low``.
+    weighted_sum(terms, scale, low, high)
+        Float terms summed left to right, multiplied by ``scale``,
+        truncated to int and clamped to [low, high]. Each term is the
+        weight times one input, evaluated in the order its formula reads:
+        ``value``, ``ratio``, ``complement``, ``hinge``, ``distance``,
+        ``indicator``.
+
+The vector evaluators follow the scalar float arithmetic operation by
+operation. Where the scalar evaluator of a weighted sum raises because the
+total is not finite, the vector evaluator returns nan.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Condition = namedtuple('Condition', ['op', 'column', 'value'])
+Tiers = namedtuple('Tiers', ['tiers'])
+Lookup = namedtuple('Lookup', ['column', 'scores', 'default'])
+Count = namedtuple('Count', ['column', 'points', 'ignore'])
+Bump = namedtuple('Bump', ['tiers'])
+Term = namedtuple('Term', ['op', 'weight', 'column', 'args'])
+PointsTable = namedtuple('PointsTable', ['rules', 'low', 'high'])
+AdjustmentTable = namedtuple('AdjustmentTable', ['steps', 'low'])
+WeightedSum = namedtuple('WeightedSum', ['terms', 'scale', 'low', 'high'])
+
+
+# Conditions
+def at_least(column, value):
+    return Condition('ge', column, value)
+
+
+def above(column, value):
+    return Condition('gt', column, value)
+
+
+def at_most(column, value):
+    return Condition('le', column, value)
+
+
+def below(column, value):
+    return Condition('lt', column, value)
+
+
+def between(column, low, high):
+    """Inclusive on both ends"""
+    return Condition('between', column, (low, high))
+
+
+def equals(column, value):
+    return Condition('eq', column, value)
+
+
+def one_of(column, values):
+    return Condition('in', column, tuple(values))
+
+
+def has(column, item):
+    """``item`` is in the row's list (or string) in ``column``"""
+    return Condition('has', column, item)
+
+
+def is_set(column):
+    return Condition('true', column, None)
+
+
+def all_of(*conditions):
+    return Condition('all', None, conditions)
+
+
+def any_of(*conditions):
+    return Condition('any', None, conditions)
+
+
+def negate(condition):
+    return Condition('not', None, condition)
+
+
+def at_least_n(n, conditions):
+    """At least ``n`` of ``conditions`` hold"""
+    return Condition('count_ge', None, (n, tuple(conditions)))
+
+
+# Points rules
+def tiers(*pairs):
+    """Points of the first ``(condition, points)`` pair that matches, else 0"""
+    return Tiers(tuple(pairs))
+
+
+def when(condition, points):
+    return Tiers(((condition, points),))
+
+
+def lookup(column, scores, default=0):
+    return Lookup(column, dict(scores), default)
+
+
+def count(column, points, ignore=('none',)):
+    """``points`` per item of the row's list, not counting ``ignore``"""
+    return Count(column, points, tuple(ignore))
+
+
+def points_table(rules, low, high):
+    return PointsTable(tuple(rules), low, high)
+
+
+# Adjustment steps
+def bump(*tiers):
+    """``min(cap, risk + delta)`` for the first ``(condition, delta, cap)`` that matches"""
+    return Bump(tuple(tiers))
+
+
+def adjustment_table(steps, low):
+    return AdjustmentTable(tuple(steps), low)
+
+
+# Weighted-sum terms
+def value(weight, column):
+    """weight * x"""
+    return Term('value', weight, column, ())
+
+
+def ratio(weight, column, divisor):
+    """weight * x / divisor"""
+    return Term('ratio', weight, column, (divisor,))
+
+
+def complement(weight, top, column, divisor):
+    """weight * (top - x) / divisor"""
+    return Term('complement', weight, column, (top, divisor))
+
+
+def hinge(weight, column, offset, divisor):
+    """weight * max(0, (x - offset) / divisor)"""
+    return Term('hinge', weight, column, (offset, divisor))
+
+
+def distance(weight, column, center, divisor):
+    """weight * abs(x - center) / divisor"""
+    return Term('distance', weight, column, (center, divisor))
+
+
+def indicator(weight, condition):
+    """weight * (1 if condition else 0)"""
+    return Term('indicator', weight, None, (condition,))
+
+
+def weighted_sum(terms, scale, low, high):
+    return WeightedSum(tuple(terms), scale, low, high)
+
+
+# Scalar evaluators. A table is translated into the source of a Python
+# function with the if/elif chains it stands for, so single rows are
+# scored at the speed of hand-written code. Thresholds, weights and other
+# constants are bound as globals of the generated function rather than
+# printed into its source.
+class _Source:
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+
+    def constant(self, value):
+        name = f'_c{len(self.constants)}'
+        self.constants[name] = value
+        return name
+
+    def emit(self, line, indent=1):
+        self.lines.append('    ' * indent + line)
+
+    def build(self, name, signature):
+        source = '\n'.join([f'def {name}({signature}):', *self.lines])
+        namespace = dict(self.constants)
+        exec(compile(source, f'<rules {name}>', 'exec'), namespace)
+        return namespace[name]
+
+
+def _condition_source(condition, source):
+    """Python expression for ``condition`` over ``row``, for a boolean context"""
+    op, column, value = condition
+    if op in ('ge', 'gt', 'le', 'lt', 'eq'):
+        symbol = {'ge': '>=', 'gt': '>', 'le': '<=', 'lt': '<', 'eq': '=='}[op]
+        return f'row[{column!r}] {symbol} {source.constant(value)}'
+    if op == 'between':
+        low, high = value
+        return f'{source.constant(low)} <= row[{column!r}] <= {source.constant(high)}'
+    if op == 'in':
+        return f'row[{column!r}] in {source.constant(value)}'
+    if op == 'has':
+        return f'{source.constant(value)} in row[{column!r}]'
+    if op == 'true':
+        return f'row[{column!r}]'
+    if op in ('all', 'any'):
+        joiner = ' and ' if op == 'all' else ' or '
+        return joiner.join(f'({_condition_source(c, source)})' for c in value)
+    if op == 'not':
+        return f'not ({_condition_source(value, source)})'
+    if op == 'count_ge':
+        n, conditions = value
+        counts = ' + '.join(f'(1 if {_condition_source(c, source)} else 0)' for c in conditions)
+        return f'{counts} >= {source.constant(n)}'
+    raise ValueError(f"Unknown condition: {op!r}")
+
+
+def _emit_points(rule, source):
+    if isinstance(rule, Tiers):
+        for i, (condition, points) in enumerate(rule.tiers):
+            keyword = 'if' if i == 0 else 'elif'
+            source.emit(f'{keyword} {_condition_source(condition, source)}:')
+            source.emit(f'score += {source.constant(points)}', indent=2)
+    elif isinstance(rule, Lookup):
+        column, scores, default = rule
+        source.emit(f'score += {source.constant(scores)}.get(row[{column!r}], {source.constant(default)})')
+    elif isinstance(rule, Count):
+        column, points, ignore = rule
+        source.emit(f'score += len([item for item in row[{column!r}] if item not in {source.constant(ignore)}])'
+                    f' * {source.constant(points)}')
+    else:
+        raise TypeError(f"Not a points rule: {rule!r}")
+
+
+def _term_source(term, source):
+    op, weight, column, args = term
+    weight = source.constant(weight)
+    args = [source.constant(arg) for arg in args] if op != 'indicator' else args
+    if op == 'value':
+        return f'{weight} * row[{column!r}]'
+    if op == 'ratio':
+        return f'{weight} * row[{column!r}] / {args[0]}'
+    if op == 'complement':
+        return f'{weight} * ({args[0]} - row[{column!r}]) / {args[1]}'
+    if op == 'hinge':
+        return f'{weight} * max(0, (row[{column!r}] - {args[0]}) / {args[1]})'
+    if op == 'distance':
+        return f'{weight} * abs(row[{column!r}] - {args[0]}) / {args[1]}'
+    if op == 'indicator':
+        return f'{weight} * (1 if {_condition_source(args[0], source)} else 0)'
+    raise ValueError(f"Unknown term: {op!r}")
+
+
+def compile_scalar(table):
+    """Evaluator of ``table`` for one row.
+
+    Points and weighted-sum tables give ``evaluate(row)``; adjustment
+    tables give ``adjust(risk, row)``.
+    """
+    source = _Source()
+    if isinstance(table, PointsTable):
+        source.emit('score = 0')
+        for rule in table.rules:
+            _emit_points(rule, source)
+        source.emit(f'return max({source.constant(table.low)}, min({source.constant(table.high)}, score))')
+        return source.build('evaluate', 'row')
+
+    if isinstance(table, AdjustmentTable):
+        for step in table.steps:
+            for i, (condition, delta, cap) in enumerate(step.tiers):
+                keyword = 'if' if i == 0 else 'elif'
+                source.emit(f'{keyword} {_condition_source(condition, source)}:')
+                source.emit(f'risk = min({source.constant(cap)}, risk + {source.constant(delta)})', indent=2)
+        source.emit(f'return max({source.constant(table.low)}, risk)')
+        return source.build('adjust', 'risk, row')
+
+    if isinstance(table, WeightedSum):
+        total = ' +\n        '.join(_term_source(term, source) for term in table.terms)
+        source.emit(f'total = ({total}) * {source.constant(table.scale)}')
+        source.emit(f'return min(max(int(total), {source.constant(table.low)}), {source.constant(table.high)})')
+        return source.build('evaluate', 'row')
+
+    raise TypeError(f"Not a rule table: {table!r}")
+
+
+# Vector evaluators
+class Columns:
+    """Columns of a batch, with the derived arrays rules share memoized.
+
+    Wrap the batch once and pass it to every evaluator that scores it, so
+    e.g. the membership masks of a list column are computed once.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.values(next(iter(self.data))))
+
+    def values(self, column):
+        key = ('values', column)
+        if key not in self._cache:
+            self._cache[key] = np.asarray(self.data[column])
+        return self._cache[key]
+
+    def codes(self, column, categories):
+        """Index of each value in ``categories``; len(categories) for any other value"""
+        key = ('codes', column, categories)
+        if key not in self._cache:
+            values = self.data[column]
+            if isinstance(values, list):
+                index = {category: i for i, category in enumerate(categories)}
+                codes = np.array([_index_of(index, v, len(categories)) for v in values], dtype=np.int64)
+            else:
+                import pandas as pd
+                codes = pd.Index(list(categories), dtype=object).get_indexer(values).astype(np.int64)
+                codes[codes < 0] = len(categories)
+            self._cache[key] = codes
+        return self._cache[key]
+
+    def _distinct_lists(self, column):
+        """Factorized list column: codes per row and the distinct lists.
+
+        List columns hold a handful of distinct lists, so per-item tests
+        run once per distinct value and are broadcast back through the codes.
+        """
+        key = ('lists', column)
+        if key not in self._cache:
+            values = self.data[column]
+            if isinstance(values, list):
+                index = {}
+                uniques = []
+                codes = np.empty(len(values), dtype=np.int64)
+                for i, v in enumerate(values):
+                    hashable = tuple(v) if isinstance(v, list) else v
+                    if hashable not in index:
+                        index[hashable] = len(uniques)
+                        uniques.append(v)
+                    codes[i] = index[hashable]
+            else:
+                import pandas as pd
+                values = pd.Series(values).map(lambda v: tuple(v) if isinstance(v, list) else v)
+                codes, uniques = pd.factorize(values)
+            self._cache[key] = (codes, uniques)
+        return self._cache[key]
+
+    def contains(self, column, item):
+        codes, uniques = self._distinct_lists(column)
+        return np.array([item in u for u in uniques] + [False])[codes]
+
+    def count(self, column, ignore):
+        codes, uniques = self._distinct_lists(column)
+        return np.array([len([c for c in u if c not in ignore]) for u in uniques] + [0])[codes]
+
+
+def _index_of(index, value, missing):
+    try:
+        return index.get(value, missing)
+    except TypeError:  # unhashable, so not a category either
+        return missing
+
+
+def _vector_condition(condition):
+    op, column, value = condition
+    if op == 'ge':
+        return lambda columns: columns.values(column) >= value
+    if op == 'gt':
+        return lambda columns: columns.values(column) > value
+    if op == 'le':
+        return lambda columns: columns.values(column) <= value
+    if op == 'lt':
+        return lambda columns: columns.values(column) < value
+    if op == 'between':
+        low, high = value
+        return lambda columns: (low <= columns.values(column)) & (columns.values(column) <= high)
+    if op in ('eq', 'in'):
+        categories = (value,) if op == 'eq' else value
+        return lambda columns: columns.codes(column, categories) < len(categories)
+    if op == 'has':
+        return lambda columns: columns.contains(column, value)
+    if op == 'true':
+        return lambda columns: columns.values(column).astype(bool)
+    if op in ('all', 'any'):
+        tests = [_vector_condition(c) for c in value]
+        combine = np.logical_and.reduce if op == 'all' else np.logical_or.reduce
+        return lambda columns: combine([test(columns) for test in tests])
+    if op == 'not':
+        test = _vector_condition(value)
+        return lambda columns: ~test(columns)
+    if op == 'count_ge':
+        n, conditions = value
+        tests = [_vector_condition(c) for c in conditions]
+        return lambda columns: sum(test(columns).astype(np.int64) for test in tests) >= n
+    raise ValueError(f"Unknown condition: {op!r}")
+
+
+def _vector_points(rule):
+    if isinstance(rule, Tiers):
+        tests = [_vector_condition(condition) for condition, _ in rule.tiers]
+        points = [points for _, points in rule.tiers]
+        if len(tests) == 1:
+            return lambda columns: np.where(tests[0](columns), points[0], 0)
+        return lambda columns: np.select([test(columns) for test in tests], points, 0)
+    if isinstance(rule, Lookup):
+        column, scores, default = rule
+        categories = tuple(scores)
+        table = np.array([*scores.values(), default])
+        return lambda columns: table[columns.codes(column, categories)]
+    if isinstance(rule, Count):
+        column, points, ignore = rule
+        return lambda columns: columns.count(column, ignore) * points
+    raise TypeError(f"Not a points rule: {rule!r}")
+
+
+def _vector_term(term):
+    op, weight, column, args = term
+    if op == 'value':
+        return lambda columns: weight * columns.values(column)
+    if op == 'ratio':
+        divisor, = args
+        return lambda columns: weight * columns.values(column) / divisor
+    if op == 'complement':
+        top, divisor = args
+        return lambda columns: weight * (top - columns.values(column)) / divisor
+    if op == 'hinge':
+        offset, divisor = args
+
+        def hinge(columns):
+            x = (columns.values(column) - offset) / divisor
+            return weight * np.where(x > 0, x, 0)  # max(0, x), which also maps nan to 0
+        return hinge
+    if op == 'distance':
+        center, divisor = args
+        return lambda columns: weight * np.abs(columns.values(column) - center) / divisor
+    if op == 'indicator':
+        test = _vector_condition(args[0])
+        return lambda columns: weight * test(columns).astype(np.int64)
+    raise ValueError(f"Unknown term: {op!r}")
+
+
+def compile_vector(table):
+    """Evaluator of ``table`` over columns, matching ``compile_scalar`` row by row.
+
+    Evaluators take a Columns (or a mapping, which they wrap); adjustment
+    tables also take the array of risks to adjust. Points and adjustment
+    tables return int64 arrays, weighted sums float64 with nan where the
+    scalar evaluator raises.
+    """
+    def wrap(columns):
+        return columns if isinstance(columns, Columns) else Columns(columns)
+
+    if isinstance(table, PointsTable):
+        rules = [_vector_points(rule) for rule in table.rules]
+        low, high = table.low, table.high
+
+        def evaluate(columns):
+            columns = wrap(columns)
+            score = np.zeros(len(columns), dtype=np.int64)
+            for rule in rules:
+                score += rule(columns)
+            return np.clip(score, low, high)
+        return evaluate
+
+    if isinstance(table, AdjustmentTable):
+        steps = [[(_vector_condition(c), delta, cap) for c, delta, cap in step.tiers] for step in table.steps]
+        low = table.low
+
+        def adjust(risk, columns):
+            columns = wrap(columns)
+            risk = np.asarray(risk, dtype=np.int64)
+            for step in steps:
+                adjusted = risk
+                for test, delta, cap in reversed(step):
+                    adjusted = np.where(test(columns), np.minimum(cap, risk + delta), adjusted)
+                risk = adjusted
+            return np.maximum(low, risk)
+        return adjust
+
+    if isinstance(table, WeightedSum):
+        terms = [_vector_term(term) for term in table.terms]
+        scale, low, high = table.scale, table.low, table.high
+
+        def evaluate(columns):
+            columns = wrap(columns)
+            # Out of range inputs overflow to inf or nan, where int() raises
+            with np.errstate(over='ignore', invalid='ignore'):
+                total = terms[0](columns)
+                for term in terms[1:]:
+                    total = total + term(columns)
+                total = total * scale
+            finite = np.isfinite(total)
+            risk = np.clip(np.trunc(np.where(finite, total, 0.0)), low, high)
+            return np.where(finite, risk, np.nan)
+        return evaluate
+
+    raise TypeError(f"Not a rule table: {table!r}")
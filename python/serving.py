@@ -0,0 +1,53 @@
+"""
+Load-only serving entry point.
+
+Request processes import this module instead of training: it loads the
+current model bundle written by ``train.py`` once and reuses it for every
+prediction. Nothing here fits a model or generates data.
+
+Predictions go through a process-wide PredictionCache (prediction_cache.py),
+which is cleared whenever a bundle is loaded.
+"""
+import threading
+from contextlib import contextmanager
+
+import model_bundle
+import prediction_cache
+
+_bundle = None
+cache = prediction_cache.from_env()
+_lock = threading.RLock()
+
+
+def load(model_dir=model_bundle.MODEL_DIR, version=None):
+    """Load a bundle from disk and make it the process-wide bundle"""
+    global _bundle
+    bundle = model_bundle.load_bundle(model_dir, version)
+    with _lock:
+        _bundle = bundle
+        cache.clear()
+    return bundle
+
+
+def get_bundle():
+    """Process-wide bundle, loaded from the default model directory on first use"""
+    if _bundle is None:
+        with _lock:
+            if _bundle is None:
+                return load()
+    return _bundle
+
+
+@contextmanager
+def lease():
+    """Process-wide bundle as a context manager, like ModelRegistry.lease"""
+    yield get_bundle()
+
+
+def is_loaded():
+    return _bundle is not None
+
+
+def predict(user_data):
+    """Predict all risk types for one user with the process-wide bundle"""
+    return cache.predict(user_data, get_bundle())
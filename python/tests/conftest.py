@@ -0,0 +1,103 @@
+"""
+Shared fixtures: a small trained model bundle and sample API payloads.
+
+Run from python/ with ``python -m pytest tests``.
+"""
+import contextlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+import model_bundle
+import train
+import tree_export
+from benchmark import sample_users
+from predict import (
+    EXISTING_CONDITIONS, FAMILY_CONDITIONS, FEATURE_COLUMNS, RISK_THRESHOLD, prepare_features
+)
+
+# One estimator per risk type, so the bundle covers compiled forests,
+# compiled boosting and plain sklearn models
+FIXTURE_MODELS = {
+    'cardiovascular': lambda: GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0),
+    'metabolic': lambda: LogisticRegression(max_iter=1000, random_state=0),
+    'sleep': lambda: RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0),
+    'mental': lambda: RandomForestClassifier(n_estimators=20, max_depth=10, random_state=0),
+    'immune': lambda: GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0),
+    'chronic': lambda: LogisticRegression(C=0.1, max_iter=1000, random_state=0)
+}
+
+@pytest.fixture(scope='session')
+def trained_bundle():
+    """Unsaved bundle in the shape train.train returns, fitted on 1500 users"""
+    data = train.build_training_data(1500, seed=0, use_cache=False)
+    X, encoders = prepare_features(data)
+    models, compiled, scalers, performance = {}, {}, {}, {}
+    for risk_type, make_model in FIXTURE_MODELS.items():
+        y = data[f'{risk_type}_high_risk']
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0, stratify=y)
+        scaler = StandardScaler().fit(np.asarray(X_train, dtype=float))
+        model = make_model().fit(scaler.transform(np.asarray(X_train, dtype=float)), y_train)
+        X_test = scaler.transform(np.asarray(X_test, dtype=float))
+        exported = tree_export.export_tree_ensemble(model)
+        if exported is not None:
+            compiled[risk_type] = exported
+        models[risk_type] = model
+        scalers[risk_type] = scaler
+        performance[risk_type] = {
+            'algorithm': type(model).__name__,
+            'accuracy': float(accuracy_score(y_test, model.predict(X_test))),
+            'auc_score': float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+            'cv_score': 0.0
+        }
+    return {
+        'models': models,
+        'compiled': compiled,
+        'scalers': scalers,
+        'encoders': encoders,
+        'model_performance': performance,
+        'feature_schema': model_bundle.build_feature_schema(
+            FEATURE_COLUMNS, encoders, FAMILY_CONDITIONS, EXISTING_CONDITIONS, RISK_THRESHOLD
+        ),
+        'training': {'n_samples': 1500, 'seed': 0}
+    }
+
+
+@pytest.fixture(scope='session')
+def bundle(trained_bundle, tmp_path_factory):
+    """``trained_bundle`` saved and loaded back, as serving.py sees it"""
+    model_dir = str(tmp_path_factory.mktemp('models'))
+    model_bundle.save_bundle(trained_bundle, model_dir)
+    return model_bundle.load_bundle(model_dir)
+
+
+@pytest.fixture(scope='session')
+def users():
+    return sample_users(300, seed=1)
+
+
+class Lease:
+    """``serving.lease`` stand-in over a fixed bundle, counting the leases taken"""
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.taken = 0
+
+    @contextlib.contextmanager
+    def __call__(self):
+        self.taken += 1
+        yield self.bundle
+
+
+@pytest.fixture
+def lease(bundle):
+    return Lease(bundle)
@@ -0,0 +1,30 @@
+"""Flask readiness before and after a bundle appears"""
+import app
+import serving
+
+
+def test_ready_retries_loading_with_throttling(monkeypatch, bundle):
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("no models/VERSION yet")
+        monkeypatch.setattr(serving, '_bundle', bundle)
+        return bundle
+
+    monkeypatch.setattr(serving, '_bundle', None)
+    monkeypatch.setattr(serving, 'load', load)
+    monkeypatch.setattr(app, '_next_load_attempt', 0.0)
+    client = app.app.test_client()
+
+    assert client.get('/health/ready').status_code == 503
+    # Within LOAD_RETRY_INTERVAL of the failed attempt: no new attempt
+    assert client.get('/health/ready').status_code == 503
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(app, '_next_load_attempt', 0.0)
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ready', 'model_version': bundle['version']}
+    assert len(attempts) == 2
@@ -0,0 +1,82 @@
+"""predict_enhanced_health_risks_batch against one predict_enhanced_health_risks call per user"""
+import pandas as pd
+import pytest
+
+import predict
+from predict import predict_enhanced_health_risks, predict_enhanced_health_risks_batch
+
+# Strings for numbers, missing fields and inputs that make the single-user
+# path fall back to generate_fallback_predictions
+ODD_USERS = [
+    {},
+    {'age': '61', 'weight': '90', 'height': '170', 'bmi': '31.1', 'stressLevel': '8', 'sleepHours': '5.5'},
+    {'age': 45.0, 'gender': 'other', 'smokingStatus': 'sometimes', 'familyHistory': ['none']},
+    {'age': 52, 'familyHistory': None},
+    {'age': 38, 'bmi': 41.0, 'existingConditions': ['diabetes', 'hypertension'], 'bloodSugarLevel': '126+'}
+]
+
+
+def test_batch_matches_single_predictions(bundle, users):
+    records = users + ODD_USERS
+    assert len(records) > predict.COMPILED_MAX_ROWS
+    batch = predict_enhanced_health_risks_batch(records, bundle)
+    assert batch == [predict_enhanced_health_risks(user_data, bundle, deadline_ms=0) for user_data in records]
+
+
+def test_small_batches_match_single_predictions(bundle, users):
+    records = users[:40] + ODD_USERS
+    assert predict_enhanced_health_risks_batch(records, bundle) == [
+        predict_enhanced_health_risks(user_data, bundle, deadline_ms=0) for user_data in records
+    ]
+
+
+def test_dataframe_input_skips_missing_cells(bundle, users):
+    records = [dict(user_data) for user_data in users[:20]]
+    for user_data in records[::3]:
+        del user_data['bmi']
+    frame = pd.DataFrame(records)
+    assert predict_enhanced_health_risks_batch(frame, bundle) == predict_enhanced_health_risks_batch(records, bundle)
+
+
+def test_row_whose_fallback_fails_gets_an_error(bundle, users):
+    # The single-user path raises from generate_fallback_predictions; the
+    # batch reports that row and scores the others
+    user_data = dict(users[0], age='abc')
+    with pytest.raises(ValueError) as error:
+        predict_enhanced_health_risks(user_data, bundle, deadline_ms=0)
+    errors = {}
+    batch = predict_enhanced_health_risks_batch(users[:5] + [user_data], bundle, errors=errors)
+    assert batch[5] == {'error': str(error.value)}
+    assert list(errors) == [5] and type(errors[5]) is ValueError and str(errors[5]) == str(error.value)
+    assert batch[:5] == predict_enhanced_health_risks_batch(users[:5], bundle)
+
+
+def test_empty_batch(bundle):
+    assert predict_enhanced_health_risks_batch([], bundle) == []
+
+
+@pytest.mark.parametrize('measurements', [
+    {'weight': 'abc', 'height': 170},
+    {'weight': 80, 'height': '1,70'},
+    {'weight': 80, 'height': 0},
+    {'weight': None, 'height': 170}
+])
+def test_malformed_weight_or_height_without_bmi_falls_back(bundle, users, measurements):
+    user_data = dict(users[0], **measurements)
+    del user_data['bmi']
+    fallback = predict.generate_fallback_predictions(user_data)
+    assert predict_enhanced_health_risks(user_data, bundle, deadline_ms=0) == fallback
+    assert predict_enhanced_health_risks(user_data, bundle, deadline_ms=100) == fallback
+    assert predict_enhanced_health_risks_batch([users[1], user_data], bundle)[1] == fallback
+
+    # With bmi given, weight and height are only model inputs
+    scored = predict_enhanced_health_risks(dict(user_data, bmi=24.0), bundle, deadline_ms=0)
+    assert all(prediction['confidence'] is not None for prediction in scored.values())
+
+
+def test_nonfinite_features_fall_back(bundle, users):
+    records = [users[0], dict(users[1], bmi=float('nan')), dict(users[2], sleep_hours='inf'), users[3]]
+    batch = predict_enhanced_health_risks_batch(records, bundle)
+    assert batch == [predict_enhanced_health_risks(r, bundle, deadline_ms=0) for r in records]
+    assert batch[1] == predict.generate_fallback_predictions(records[1])
+    assert batch[2] == predict.generate_fallback_predictions(records[2])
@@ -0,0 +1,94 @@
+"""InferenceDispatcher batching and error propagation"""
+import contextlib
+import threading
+
+import pytest
+
+import batching
+from batching import InferenceDispatcher
+from prediction_cache import PredictionCache
+from predict import predict_enhanced_health_risks_batch
+
+
+def submit_together(dispatcher, rows):
+    """Submit ``rows`` from one thread each, released at once"""
+    futures = [None] * len(rows)
+    barrier = threading.Barrier(len(rows))
+
+    def submit(i):
+        barrier.wait()
+        futures[i] = dispatcher.submit(rows[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return futures
+
+
+def test_concurrent_requests_share_batches(bundle, lease, users):
+    dispatcher = InferenceDispatcher(lease, max_wait_ms=50, max_batch_size=8)
+    rows = users[:16]
+    futures = submit_together(dispatcher, rows)
+    results = [future.result(timeout=30) for future in futures]
+
+    assert results == predict_enhanced_health_risks_batch(rows, bundle)
+    stats = dispatcher.stats()
+    assert stats['rows'] == 16 and stats['batches'] < 16
+    assert lease.taken == stats['batches']
+
+
+def test_failed_row_raises_only_in_its_own_future(lease, users):
+    dispatcher = InferenceDispatcher(lease, max_wait_ms=50, max_batch_size=8)
+    rows = [users[0], dict(users[1], age='abc'), users[2]]
+    futures = submit_together(dispatcher, rows)
+
+    with pytest.raises(ValueError, match='invalid literal'):
+        futures[1].result(timeout=30)
+    assert 0 <= futures[0].result(timeout=30)['cardiovascular']['risk'] <= 100
+    assert 0 <= futures[2].result(timeout=30)['cardiovascular']['risk'] <= 100
+
+
+def test_scoring_failure_reaches_every_waiter(bundle, users):
+    failures = [RuntimeError('registry unavailable')]
+
+    @contextlib.contextmanager
+    def failing_lease():
+        if failures:
+            raise failures.pop()
+        yield bundle
+
+    dispatcher = InferenceDispatcher(failing_lease, max_wait_ms=50, max_batch_size=8)
+    futures = submit_together(dispatcher, users[:3])
+    for future in futures:
+        with pytest.raises(RuntimeError, match='registry unavailable'):
+            future.result(timeout=30)
+
+    # The dispatch thread survives the failure
+    assert dispatcher.predict(users[0], timeout=30) == predict_enhanced_health_risks_batch(users[:1], bundle)[0]
+
+
+def test_cache_hits_skip_the_queue(lease, users):
+    cache = PredictionCache()
+    dispatcher = InferenceDispatcher(lease, max_wait_ms=1, cache=cache, current=lambda: lease.bundle)
+    first = dispatcher.predict(users[0], timeout=30)
+    assert dispatcher.predict(users[0], timeout=30) is first
+    assert dispatcher.stats()['rows'] == 1
+    assert cache.stats()['hits'] == 1
+    # Keying reads the current bundle; only scoring takes a lease
+    assert lease.taken == 1
+
+    with pytest.raises(ValueError):
+        InferenceDispatcher(lease, cache=cache)
+
+
+def test_from_env(monkeypatch, lease):
+    monkeypatch.delenv('HEALTH_BATCHING', raising=False)
+    assert batching.from_env(lease) is None
+
+    monkeypatch.setenv('HEALTH_BATCHING', '1')
+    monkeypatch.setenv('HEALTH_BATCH_MAX_WAIT_MS', '5')
+    monkeypatch.setenv('HEALTH_BATCH_MAX_SIZE', '16')
+    dispatcher = batching.from_env(lease)
+    assert dispatcher.max_wait == 0.005 and dispatcher.max_batch_size == 16
@@ -0,0 +1,62 @@
+"""Streaming NDJSON scoring"""
+import io
+import json
+
+import bulk
+from predict import predict_enhanced_health_risks_batch
+
+
+def ndjson(*lines):
+    return io.BytesIO(b''.join(line + b'\n' for line in lines))
+
+
+def decode(chunks):
+    return [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+
+
+def test_results_match_the_batch_predictor(bundle, lease, users):
+    stream = ndjson(*(json.dumps(user).encode() for user in users[:25]))
+    chunks = list(bulk.score_ndjson(stream, lease, chunk_size=10))
+
+    assert len(chunks) == 3 and lease.taken == 3
+    assert all(chunk.endswith(b'\n') for chunk in chunks)
+    assert decode(chunks) == json.loads(json.dumps(predict_enhanced_health_risks_batch(users[:25], bundle)))
+
+
+def test_bad_lines_get_error_lines_in_place(lease, users):
+    stream = ndjson(
+        json.dumps(users[0]).encode(),
+        b'{"age": ',
+        b'',
+        b'   ',
+        b'[1, 2]',
+        b'x' * 5000,
+        json.dumps(dict(users[1], age='abc')).encode(),
+        json.dumps(users[2]).encode()
+    )
+    results = decode(bulk.score_ndjson(stream, lease, chunk_size=3, max_line_bytes=4096))
+
+    assert len(results) == 6
+    assert results[1]['error'].startswith('Invalid JSON')
+    assert results[2] == {'error': 'Expected a JSON object'}
+    assert results[3] == {'error': 'Line too long'}
+    # A row the batch predictor cannot score, fallback included
+    assert list(results[4]) == ['error']
+    assert 'cardiovascular' in results[0] and 'cardiovascular' in results[5]
+
+
+def test_chunk_of_errors_needs_no_bundle(lease):
+    results = decode(bulk.score_ndjson(ndjson(b'1', b'"a"'), lease))
+    assert results == [{'error': 'Expected a JSON object'}] * 2
+    assert lease.taken == 0
+
+
+def test_long_line_is_skipped_without_losing_the_next(users):
+    user = json.dumps(users[0]).encode()
+    lines = list(bulk.iter_lines(ndjson(b'y' * 1000, user), max_line_bytes=len(user) + 1))
+    assert lines == [None, user + b'\n']
+
+
+def test_empty_body(lease):
+    assert list(bulk.score_ndjson(io.BytesIO(b''), lease)) == []
+    assert lease.taken == 0
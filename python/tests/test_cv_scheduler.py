@@ -0,0 +1,113 @@
+"""Successive-halving model selection in cv_scheduler.py"""
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+import cv_scheduler
+import train
+
+RUNGS = ((2, 10), (3, 20), (5, 40))
+
+
+@pytest.fixture(scope='module')
+def datasets():
+    return {
+        name: make_classification(n_samples=300, n_features=8, n_informative=4, random_state=seed)
+        for seed, name in enumerate(('a', 'b'))
+    }
+
+
+def _candidates():
+    return {
+        'forest': RandomForestClassifier(max_depth=4, random_state=0),
+        'deep_forest': RandomForestClassifier(max_depth=8, random_state=0),
+        'boosting': GradientBoostingClassifier(max_depth=2, random_state=0),
+        'stopping': GradientBoostingClassifier(n_iter_no_change=2, tol=10.0, random_state=0),
+        'linear': LogisticRegression(C=1.0),
+        'weak_linear': LogisticRegression(C=1e-4)
+    }
+
+
+@pytest.fixture
+def recorded_jobs(monkeypatch):
+    """Every job successive_halving runs in-process, in order.
+
+    The fold model a job grows is recorded as its fitted size at the time,
+    since the job then grows it in place.
+    """
+    jobs = []
+    run = cv_scheduler._run_rung_fold
+
+    def record(job):
+        model = job[8]
+        jobs.append(job[:8] + (None if model is None else len(model.estimators_), job[9]))
+        return run(job)
+
+    monkeypatch.setattr(cv_scheduler, '_run_rung_fold', record)
+    return jobs
+
+
+def test_rungs_keep_the_best_third(datasets):
+    cv_scores, complexity, report = cv_scheduler.successive_halving(
+        datasets, _candidates(), rungs=RUNGS, n_jobs=1)
+
+    assert [rung['n_candidates'] for rung in report['rungs']] == [12, 4, 2]
+    for target in datasets:
+        assert len(cv_scores[target]) == 1
+        (name, scores), = cv_scores[target].items()
+        assert len(scores) == 5
+        assert complexity[target][name] > 0
+        assert name != 'weak_linear'
+
+
+def test_only_growable_ensembles_are_shipped_back(datasets, recorded_jobs):
+    cv_scheduler.successive_halving(datasets, _candidates(), rungs=RUNGS, n_jobs=1)
+    grown = 0
+    for target, name, estimator, fold, _, _, _, n_estimators, fitted_size, keep_model in recorded_jobs:
+        warm = cv_scheduler._warm_startable(estimator)
+        assert keep_model == (warm and n_estimators != RUNGS[-1][1])
+        if not warm:
+            assert n_estimators is None and fitted_size is None
+        elif fitted_size is not None:
+            # Grown from the previous rung's fold model
+            assert fitted_size < n_estimators
+            grown += 1
+    assert grown > 0
+
+
+def test_early_stopped_boosting_is_not_grown(datasets, recorded_jobs):
+    candidates = {'stopping': _candidates()['stopping']}
+    cv_scores, _, report = cv_scheduler.successive_halving(datasets, candidates, rungs=RUNGS, n_jobs=1)
+    # Fitted once per fold; later rungs reuse the scores of the stopped models
+    assert len(recorded_jobs) == 2 * 5
+    assert sorted({job[3] for job in recorded_jobs}) == [0, 1, 2, 3, 4]
+    assert all(len(scores) == 5 for scores in cv_scores['a'].values())
+
+
+def test_warm_started_forest_matches_cold_cv(datasets):
+    forest = RandomForestClassifier(max_depth=4, random_state=0)
+    halving, _, _ = cv_scheduler.successive_halving(datasets, {'forest': forest}, rungs=RUNGS, n_jobs=1)
+    cold, _ = cv_scheduler.cross_validate_candidates(
+        datasets, {'forest': forest.set_params(n_estimators=RUNGS[-1][1])}, cv=5, n_jobs=1)
+    for target in datasets:
+        np.testing.assert_array_equal(halving[target]['forest'], cold[target]['forest'])
+
+
+def test_selection_does_not_depend_on_workers(datasets):
+    serial = cv_scheduler.successive_halving(datasets, _candidates(), rungs=RUNGS, n_jobs=1)
+    parallel = cv_scheduler.successive_halving(datasets, _candidates(), rungs=RUNGS, n_jobs=2)
+    for target in datasets:
+        assert serial[0][target].keys() == parallel[0][target].keys()
+        for name in serial[0][target]:
+            np.testing.assert_array_equal(serial[0][target][name], parallel[0][target][name])
+        assert serial[1][target] == parallel[1][target]
+
+
+def test_select_candidate_prefers_smaller_model_within_tolerance():
+    scores = {'big': np.array([0.950, 0.952]), 'small': np.array([0.949, 0.950]), 'tiny': np.array([0.90, 0.91])}
+    complexity = {'big': 5000, 'small': 300, 'tiny': 10}
+    assert train.select_candidate(scores) == 'big'
+    assert train.select_candidate(scores, complexity, tolerance=0.002) == 'small'
+    assert train.select_candidate(scores, complexity, tolerance=0.0) == 'big'
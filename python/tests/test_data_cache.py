@@ -0,0 +1,48 @@
+"""Labeled-data cache keys, reuse and labeling of unlabeled files"""
+import os
+
+import pandas as pd
+
+import data_cache
+import predict
+
+
+def test_reuses_only_the_same_key(tmp_path):
+    cache_dir = str(tmp_path)
+    data, hit = data_cache.load_labeled_data(600, seed=3, cache_dir=cache_dir)
+    assert not hit
+    pd.testing.assert_frame_equal(data, data_cache.build_labeled_data(600, seed=3))
+
+    again, hit = data_cache.load_labeled_data(600, seed=3, cache_dir=cache_dir)
+    assert hit
+    pd.testing.assert_frame_equal(again, data)
+
+    # A different seed or size is a new file, not the cached one
+    assert not data_cache.load_labeled_data(600, seed=4, cache_dir=cache_dir)[1]
+    assert not data_cache.load_labeled_data(700, seed=3, cache_dir=cache_dir)[1]
+    assert len(os.listdir(cache_dir)) == 3
+
+
+def test_rule_changes_change_the_key(monkeypatch):
+    path = data_cache.cache_path(600, 3)
+    rules = dict(predict.RISK_RULES, sleep=predict.RISK_RULES['cardiovascular'])
+    monkeypatch.setattr(predict, 'RISK_RULES', rules)
+    assert data_cache.cache_path(600, 3) != path
+
+
+def test_unlabeled_files_are_labeled_per_chunk(tmp_path):
+    path = str(tmp_path / 'unlabeled.arrow')
+    data_cache._write(predict.generate_enhanced_synthetic_data(500, seed=5), path)
+
+    chunks = list(data_cache.iter_chunks(path, chunk_size=200))
+    assert [len(chunk) for chunk in chunks] == [200, 200, 100]
+    expected = data_cache.build_labeled_data(500, seed=5)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_labeled_files_are_read_as_stored(tmp_path):
+    path = str(tmp_path / 'labeled.arrow')
+    expected = data_cache.build_labeled_data(300, seed=6)
+    data_cache._write(expected, path)
+    chunks = data_cache.iter_chunks(path, chunk_size=128)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
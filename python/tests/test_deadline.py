@@ -0,0 +1,66 @@
+"""Deadline degradation of single-user predictions"""
+import threading
+
+import pytest
+
+import metrics
+from prediction_cache import PredictionCache
+from predict import generate_fallback_predictions, is_degraded, predict_enhanced_health_risks
+
+
+class BlockedModel:
+    """Model whose predict_proba waits until ``release`` is set"""
+
+    def __init__(self, model, release):
+        self.model = model
+        self.release = release
+
+    def predict_proba(self, X):
+        self.release.wait(5)
+        return self.model.predict_proba(X)
+
+
+@pytest.fixture
+def slow_bundle(trained_bundle):
+    """``trained_bundle`` whose mental model misses any short deadline"""
+    release = threading.Event()
+    models = dict(trained_bundle['models'])
+    models['mental'] = BlockedModel(models['mental'], release)
+    compiled = {risk_type: c for risk_type, c in trained_bundle['compiled'].items() if risk_type != 'mental'}
+    yield dict(trained_bundle, models=models, compiled=compiled, version='slow')
+    release.set()
+
+
+def test_generous_deadline_matches_undeadlined_prediction(trained_bundle, users):
+    for user_data in users[:20]:
+        result = predict_enhanced_health_risks(user_data, trained_bundle, deadline_ms=10_000)
+        assert result == predict_enhanced_health_risks(user_data, trained_bundle, deadline_ms=0)
+        assert not is_degraded(result)
+
+
+def test_missed_deadline_serves_fallback_with_same_keys(slow_bundle, users):
+    user_data = users[0]
+    metrics.clear()
+    result = predict_enhanced_health_risks(user_data, slow_bundle, deadline_ms=50)
+
+    assert is_degraded(result)
+    degraded = result['mental']
+    assert degraded['degraded'] is True
+    assert degraded['confidence'] is None
+    assert degraded['risk'] == generate_fallback_predictions(user_data)['mental']['risk']
+    assert set(degraded) == set(result['sleep']) | {'degraded'}
+    for risk_type, prediction in result.items():
+        if risk_type != 'mental':
+            assert 'degraded' not in prediction
+            assert prediction['confidence'] == slow_bundle['model_performance'][risk_type]['auc_score']
+
+    assert metrics.DEADLINE_MISSES.snapshot() == {'mental': 1}
+    assert metrics.DEADLINE_INFERENCES.snapshot() == {risk_type: 1 for risk_type in slow_bundle['models']}
+
+
+def test_degraded_results_are_not_cached(slow_bundle, users, monkeypatch):
+    import predict
+    monkeypatch.setattr(predict, 'DEADLINE_MS', 50)
+    cache = PredictionCache()
+    assert is_degraded(cache.predict(users[0], slow_bundle))
+    assert cache.stats()['entries'] == 0
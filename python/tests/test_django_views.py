@@ -0,0 +1,72 @@
+"""Django views against a ModelRegistry over a temporary model directory"""
+import json
+
+import django
+import pytest
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(ROOT_URLCONF='django_app.urls', ALLOWED_HOSTS=['testserver'])
+    django.setup()
+
+from django.test import Client  # noqa: E402
+
+import metrics  # noqa: E402
+import model_bundle  # noqa: E402
+import model_registry  # noqa: E402
+import serving  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from predict import predict_enhanced_health_risks_batch  # noqa: E402
+
+
+@pytest.fixture
+def registry(monkeypatch, trained_bundle, tmp_path):
+    model_bundle.save_bundle(trained_bundle, str(tmp_path))
+    registry = model_registry.ModelRegistry(str(tmp_path), check_interval=0)
+    monkeypatch.setattr(model_registry, '_registry', registry)
+    return registry
+
+
+def post_ndjson(records):
+    body = ''.join(json.dumps(record) + '\n' for record in records)
+    return Client().post('/api/predict/batch/', body, content_type='application/x-ndjson')
+
+
+def test_batch_holds_one_lease_for_the_whole_response(registry, users):
+    response = post_ndjson(users[:5])
+    assert response.status_code == 200
+    version = registry.stats()['version']
+    assert registry.stats()['active_leases'] == {version: 1}
+
+    # The test client closes the response once the stream is consumed
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert registry.stats()['active_leases'] == {version: 0}
+    with registry.lease() as bundle:
+        assert [json.loads(line) for line in lines] == predict_enhanced_health_risks_batch(users[:5], bundle)
+
+
+def test_batch_without_models_is_unavailable(monkeypatch, tmp_path, users):
+    monkeypatch.setattr(model_registry, '_registry', model_registry.ModelRegistry(str(tmp_path)))
+    response = post_ndjson(users[:1])
+    assert response.status_code == 503
+    assert response.json() == {'error': 'Models are not loaded'}
+
+
+def test_metrics_after_one_prediction(monkeypatch, registry, users):
+    monkeypatch.setattr(serving, 'cache', PredictionCache(max_entries=0))
+    metrics.clear()
+    client = Client()
+    response = client.post('/api/predict/', json.dumps(users[0]), content_type='application/json')
+    assert response.status_code == 200
+
+    response = client.get('/metrics/')
+    assert response.status_code == 200
+    assert response['Content-Type'] == metrics.CONTENT_TYPE
+    samples = dict(line.rsplit(' ', 1) for line in response.content.decode().splitlines()
+                   if not line.startswith('#'))
+    name = 'health_prediction_stage_seconds_count'
+    assert samples[f'{name}{{stage="encode",risk_type="all"}}'] == '1'
+    for risk_type in registry.current()['models']:
+        for stage in metrics.MODEL_STAGES:
+            assert samples[f'{name}{{stage="{stage}",risk_type="{risk_type}"}}'] == '1'
+    assert not any(key.startswith('health_batch_prediction_stage_seconds') for key in samples)
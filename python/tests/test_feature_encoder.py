@@ -0,0 +1,112 @@
+"""FeatureEncoder against the per-request mapping it replaced"""
+import numpy as np
+
+from feature_encoder import FeatureEncoder
+from predict import (
+    EXISTING_CONDITIONS, FAMILY_CONDITIONS, apply_clinical_adjustments, map_alcohol_consumption,
+    map_blood_pressure, map_blood_sugar, map_cholesterol, map_diet_quality, map_exercise_frequency,
+    map_sleep_quality, map_smoking_status, predict_enhanced_health_risks, predict_enhanced_health_risks_batch
+)
+
+# Inputs that take the fallback branches of the mapping
+ODD_USERS = [
+    {},
+    {'age': '42', 'weight': 'heavy', 'height': None, 'bmi': float('nan'), 'gender': 'other'},
+    {'age': 30.7, 'stress_level': '7', 'smokingStatus': 'sometimes', 'bloodPressure': ['high']},
+    {'familyHistory': ('diabetes', 'unknown'), 'existingConditions': 'asthma'},
+    {'familyHistory': None, 'existingConditions': []},
+    {'sleep_hours': '7.5', 'exercise_frequency': 'daily', 'diet_quality': 'excellent', 'sleepQuality': 'poor'}
+]
+
+
+def encode_user_features(user_data):
+    """The per-call feature_mapping of predict_enhanced_health_risks, before FeatureEncoder replaced it"""
+    feature_mapping = {
+        'age': lambda x: int(x),
+        'weight': lambda x: float(x),
+        'height': lambda x: float(x),
+        'bmi': lambda x: float(x),
+        'exercise_frequency': lambda x: map_exercise_frequency(x),
+        'sleep_hours': lambda x: float(x),
+        'diet_quality': lambda x: map_diet_quality(x),
+        'stress_level': lambda x: int(x),
+        'gender_encoded': lambda x: 1 if user_data.get('gender') == 'male' else 0,
+        'smoking_encoded': lambda x: map_smoking_status(user_data.get('smokingStatus', 'never')),
+        'alcohol_encoded': lambda x: map_alcohol_consumption(user_data.get('alcoholConsumption', 'never')),
+        'sleep_quality_encoded': lambda x: map_sleep_quality(user_data.get('sleepQuality', 'good')),
+        'bp_encoded': lambda x: map_blood_pressure(user_data.get('bloodPressure', 'normal')),
+        'chol_encoded': lambda x: map_cholesterol(user_data.get('cholesterolLevels', 'normal')),
+        'bs_encoded': lambda x: map_blood_sugar(user_data.get('bloodSugarLevel', '70-100'))
+    }
+    feature_vector = []
+    for feature in feature_mapping:
+        try:
+            feature_vector.append(feature_mapping[feature](user_data.get(feature, 0)))
+        except Exception:
+            feature_vector.append(0)
+    family_history = user_data.get('familyHistory', [])
+    for condition in FAMILY_CONDITIONS:
+        feature_vector.append(1 if condition in family_history else 0)
+    user_conditions = user_data.get('existingConditions', [])
+    for condition in EXISTING_CONDITIONS:
+        feature_vector.append(1 if condition in user_conditions else 0)
+    return feature_vector
+
+
+def _legacy_rows(users):
+    return np.array([encode_user_features(user_data) for user_data in users], dtype=float)
+
+
+def test_rows_match_legacy_encoding(trained_bundle, users):
+    encoder = FeatureEncoder(trained_bundle['feature_schema'])
+    # ODD_USERS[4] raises in both; see test_unencodable_rows_are_reported
+    encodable = users + ODD_USERS[:4] + ODD_USERS[5:]
+    rows = encoder.encode_many(encodable)
+    assert rows.dtype == np.float64
+    np.testing.assert_array_equal(rows, _legacy_rows(encodable))
+    for user_data, row in zip(users, rows):
+        np.testing.assert_array_equal(encoder.encode(user_data), row)
+
+
+def test_unencodable_rows_are_reported(trained_bundle):
+    encoder = FeatureEncoder(trained_bundle['feature_schema'])
+    failed = set()
+    rows = encoder.encode_many([{}, ODD_USERS[4]], failed=failed)
+    assert failed == {1}
+    np.testing.assert_array_equal(rows[1], 0)
+
+
+def test_predict_proba_matches_legacy_path(trained_bundle, users):
+    encoder = FeatureEncoder(trained_bundle['feature_schema'])
+    legacy = _legacy_rows(users)
+    rows = encoder.encode_many(users)
+    for risk_type, model in trained_bundle['models'].items():
+        scaler = trained_bundle['scalers'][risk_type]
+        expected = model.predict_proba(scaler.transform(legacy))
+        np.testing.assert_array_equal(model.predict_proba(scaler.transform(rows)), expected)
+        # One-row calls, as single-user predictions make them
+        for user_data, row in zip(users[:50], legacy):
+            np.testing.assert_array_equal(
+                model.predict_proba(scaler.transform(encoder.encode(user_data).reshape(1, -1))),
+                model.predict_proba(scaler.transform(row.reshape(1, -1)))
+            )
+
+
+def _legacy_risks(bundle, user_data):
+    X_user = np.array(encode_user_features(user_data)).reshape(1, -1)
+    risks = {}
+    for risk_type, model in bundle['models'].items():
+        probability = model.predict_proba(bundle['scalers'][risk_type].transform(X_user))[0][1]
+        risks[risk_type] = apply_clinical_adjustments(risk_type, int(probability * 100), user_data)
+    return risks
+
+
+def test_predictions_match_legacy_path(trained_bundle, users):
+    # sklearn estimators only; the exported trees are checked in test_tree_export.py
+    bundle = dict(trained_bundle, compiled={})
+    batch = predict_enhanced_health_risks_batch(users, bundle)
+    for user_data, batch_result in zip(users, batch):
+        expected = _legacy_risks(bundle, user_data)
+        result = predict_enhanced_health_risks(user_data, bundle)
+        assert {risk_type: r['risk'] for risk_type, r in result.items()} == expected
+        assert {risk_type: r['risk'] for risk_type, r in batch_result.items()} == expected
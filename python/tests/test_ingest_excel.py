@@ -0,0 +1,86 @@
+"""Workbook ingestion: row conversion, streaming reads and the Parquet output"""
+import io
+
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+import ingest_excel
+from predict import RISK_LABELERS, predict_enhanced_health_risks_batch
+
+HEADER = [
+    'id', 'timestamp', 'age', 'gender', 'weight', 'height', 'exerciseFrequency', 'exerciseTypes',
+    'sleepHours', 'sleepQuality', 'stressLevel', 'smokingStatus', 'bloodPressure', 'familyHistory',
+    'existingConditions', 'bmi'
+]
+
+ROWS = [
+    ['a1', '2024-05-01T10:00:00Z', '45', 'male', '80', '175', 'rarely', 'running,yoga',
+     '6.5', 'poor', '8', 'regular', 'stage1', 'diabetes,heart-disease', 'hypertension', None],
+    # Strings that are not numbers become 0, as Number(value) || 0 does
+    ['a2', '2024-05-01T11:00:00Z', 'unknown', 'female', '', '160', '3-4-times-week', 'swimming',
+     '8', 'good', 'n/a', 'never', 'normal', 'none', 'none', None],
+    [None] * len(HEADER),
+    # A list column that is not text cannot be encoded; the fallback scores the row
+    ['a3', '2024-05-02T09:00:00Z', '52', 'male', '90', '180', 'daily', None,
+     '7', 'fair', '4', 'former', 'elevated', 3, None, None],
+    # Malformed bmi: the fallback raises too
+    ['a4', '2024-05-02T10:00:00Z', '30', 'female', '60', '165', 'rarely', None,
+     '7', 'good', '5', 'never', 'normal', None, None, 'abc']
+]
+
+
+def workbook_bytes(rows=ROWS):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_record_from_row_converts_like_preprocess_data():
+    assert ingest_excel.record_from_row(HEADER, ROWS[0]) == {
+        'id': 'a1', 'timestamp': '2024-05-01T10:00:00Z', 'age': 45.0, 'gender': 'male',
+        'weight': 80.0, 'height': 175.0, 'exerciseFrequency': 'rarely',
+        'exerciseTypes': ['running', 'yoga'], 'sleepHours': 6.5, 'sleepQuality': 'poor',
+        'stressLevel': 8.0, 'smokingStatus': 'regular', 'bloodPressure': 'stage1',
+        'familyHistory': ['diabetes', 'heart-disease'], 'existingConditions': ['hypertension'],
+        'bmi': 80.0 / 1.75 ** 2
+    }
+    record = ingest_excel.record_from_row(HEADER, ROWS[1])
+    assert record['age'] == 0 and record['stressLevel'] == 0
+    # Empty cells are left out, so no bmi is derived without a weight
+    assert 'weight' not in record and 'bmi' not in record
+
+
+def test_read_chunks_skips_blank_rows():
+    chunks = list(ingest_excel.read_chunks(workbook_bytes(), chunk_size=2))
+    assert [row_numbers for row_numbers, _ in chunks] == [[2, 3], [5, 6]]
+    assert [record['id'] for _, records in chunks for record in records] == ['a1', 'a2', 'a3', 'a4']
+
+
+def test_score_workbook_writes_every_row(bundle, tmp_path):
+    output_path = str(tmp_path / 'scores.parquet')
+    assert ingest_excel.score_workbook(workbook_bytes(), output_path, bundle, chunk_size=2) == 4
+
+    parquet = pq.ParquetFile(output_path)
+    assert parquet.schema_arrow == ingest_excel.OUTPUT_SCHEMA
+    assert parquet.num_row_groups == 2
+    table = parquet.read().to_pylist()
+    assert [row['row'] for row in table] == [2, 3, 5, 6]
+    assert [row['id'] for row in table] == ['a1', 'a2', 'a3', 'a4']
+    assert [row['fallback'] for row in table] == [False, False, True, False]
+    assert [row['error'] is None for row in table] == [True, True, True, False]
+
+    records = [ingest_excel.record_from_row(HEADER, values) for values in ROWS[:2]]
+    for row, result in zip(table, predict_enhanced_health_risks_batch(records, bundle)):
+        for risk_type in RISK_LABELERS:
+            assert row[f'{risk_type}_risk'] == result[risk_type]['risk']
+            assert row[f'{risk_type}_confidence'] == result[risk_type]['confidence']
+            assert row[f'{risk_type}_factors'] == [factor['name'] for factor in result[risk_type]['factors']]
+    for risk_type in RISK_LABELERS:
+        assert table[2][f'{risk_type}_risk'] is not None and table[2][f'{risk_type}_confidence'] is None
+        assert table[3][f'{risk_type}_risk'] is None
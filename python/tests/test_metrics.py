@@ -0,0 +1,47 @@
+"""Prometheus exposition of the stage histograms and risk-type counters"""
+from metrics import RiskTypeCounter, StageHistograms
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = StageHistograms('stage_seconds', 'Stage time.', buckets=(0.001, 0.01))
+    # A duration equal to a bound falls in that bucket, as ``le`` requires
+    histogram.observe('sleep', ('scale', 'predict_proba'), (0.001, 0.005))
+    histogram.observe('sleep', ('scale', 'predict_proba'), (0.0005, 2.0))
+    # Same stage and risk type from another stage tuple: merged into one series
+    histogram.observe('sleep', ('scale',), (0.02,))
+
+    assert histogram.snapshot() == {
+        ('scale', 'sleep'): ([2, 0, 1], 0.001 + 0.0005 + 0.02),
+        ('predict_proba', 'sleep'): ([0, 1, 1], 2.005)
+    }
+    assert histogram.render() == (
+        '# HELP stage_seconds Stage time.\n'
+        '# TYPE stage_seconds histogram\n'
+        'stage_seconds_bucket{stage="predict_proba",risk_type="sleep",le="0.001"} 0\n'
+        'stage_seconds_bucket{stage="predict_proba",risk_type="sleep",le="0.01"} 1\n'
+        'stage_seconds_bucket{stage="predict_proba",risk_type="sleep",le="+Inf"} 2\n'
+        'stage_seconds_sum{stage="predict_proba",risk_type="sleep"} 2.005\n'
+        'stage_seconds_count{stage="predict_proba",risk_type="sleep"} 2\n'
+        'stage_seconds_bucket{stage="scale",risk_type="sleep",le="0.001"} 2\n'
+        'stage_seconds_bucket{stage="scale",risk_type="sleep",le="0.01"} 2\n'
+        'stage_seconds_bucket{stage="scale",risk_type="sleep",le="+Inf"} 3\n'
+        f'stage_seconds_sum{{stage="scale",risk_type="sleep"}} {0.001 + 0.0005 + 0.02!r}\n'
+        'stage_seconds_count{stage="scale",risk_type="sleep"} 3\n'
+    )
+
+    histogram.clear()
+    assert histogram.render() == '# HELP stage_seconds Stage time.\n# TYPE stage_seconds histogram\n'
+
+
+def test_counter_has_one_series_per_risk_type():
+    counter = RiskTypeCounter('misses_total', 'Misses.')
+    counter.inc('sleep')
+    counter.inc('mental', 2)
+    counter.inc('sleep')
+    assert counter.snapshot() == {'sleep': 2, 'mental': 2}
+    assert counter.render() == (
+        '# HELP misses_total Misses.\n'
+        '# TYPE misses_total counter\n'
+        'misses_total{risk_type="mental"} 2\n'
+        'misses_total{risk_type="sleep"} 2\n'
+    )
@@ -0,0 +1,75 @@
+"""ModelRegistry leases and hot reload"""
+import os
+import time
+
+import pytest
+
+import model_bundle
+from model_registry import ModelRegistry
+from predict import predict_enhanced_health_risks
+
+
+def wait_for(registry, condition, timeout=10.0):
+    """Take short leases, which poll VERSION, until ``condition()`` holds"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, registry.stats()
+        with registry.lease():
+            pass
+        time.sleep(0.01)
+
+
+def publish_version(model_dir, version):
+    """Point VERSION at ``version`` as save_bundle does"""
+    tmp_path = os.path.join(model_dir, '.VERSION.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(model_dir, model_bundle.VERSION_FILE))
+
+
+@pytest.fixture
+def model_dir(trained_bundle, tmp_path):
+    model_bundle.save_bundle(trained_bundle, str(tmp_path))
+    return str(tmp_path)
+
+
+def test_old_leases_keep_their_bundle_across_a_reload(trained_bundle, model_dir, users):
+    registry = ModelRegistry(model_dir, check_interval=0)
+    with registry.lease() as old:
+        first = old['version']
+        second = model_bundle.save_bundle(trained_bundle, model_dir)
+        wait_for(registry, lambda: registry.reloads == 1)
+
+        with registry.lease() as new:
+            assert new['version'] == second
+            assert old['version'] == first
+            assert registry.stats()['active_leases'] == {second: 1, first: 1}
+        # The retired bundle still serves the request holding it
+        assert predict_enhanced_health_risks(users[0], old) == predict_enhanced_health_risks(users[0], new)
+
+    stats = registry.stats()
+    assert stats['active_leases'] == {second: 0}
+    assert stats['reloads'] == 1 and stats['reload_errors'] == 0
+
+
+def test_failed_reload_keeps_the_current_bundle(trained_bundle, model_dir):
+    registry = ModelRegistry(model_dir, check_interval=0)
+    first = registry.load()['version']
+
+    publish_version(model_dir, 'missing')
+    wait_for(registry, lambda: registry.reload_errors > 0)
+    with registry.lease() as bundle:
+        assert bundle['version'] == first
+    assert registry.stats()['version'] == first and registry.reloads == 0
+
+    # The next good version is still picked up
+    second = model_bundle.save_bundle(trained_bundle, model_dir)
+    wait_for(registry, lambda: registry.reloads == 1)
+    assert registry.stats()['version'] == second
+
+
+def test_current_does_not_take_a_lease(model_dir):
+    registry = ModelRegistry(model_dir, check_interval=0)
+    bundle = registry.current()
+    assert registry.is_loaded() and bundle['version'] == registry.stats()['version']
+    assert registry.stats()['active_leases'] == {bundle['version']: 0}
@@ -0,0 +1,96 @@
+"""PredictionCache keying, expiry and eviction"""
+import numpy as np
+
+from prediction_cache import PredictionCache
+from predict import predict_enhanced_health_risks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_equivalent_inputs_share_a_key(bundle, users):
+    cache = PredictionCache()
+    user_data = users[0]
+    other_frequency = 'daily' if user_data['exerciseFrequency'] != 'daily' else 'never'
+    as_strings = dict(user_data, age=str(user_data['age']), stressLevel=str(user_data['stressLevel']))
+    assert cache.key(as_strings, bundle) == cache.key(user_data, bundle)
+    # Fields the models do not see but the adjustments and recommendations do
+    for changes in ({'sleepHours': 4.5}, {'bmi': user_data['bmi'] + 5}, {'exerciseFrequency': other_frequency}):
+        assert cache.key(dict(user_data, **changes), bundle) != cache.key(user_data, bundle)
+    assert cache.key(user_data, dict(bundle, version='other')) != cache.key(user_data, bundle)
+
+
+def test_key_keeps_float64_precision(bundle, users):
+    cache = PredictionCache()
+    user_data = dict(users[0], weight=70.0)
+    # Equal once rounded to float32, different as the scalers see them
+    nearby = dict(user_data, weight=70.000001)
+    assert np.float32(user_data['weight']) == np.float32(nearby['weight'])
+    assert cache.key(user_data, bundle) != cache.key(nearby, bundle)
+    assert cache.key(user_data, bundle) == cache.key(dict(user_data), bundle)
+
+
+def test_unkeyable_inputs_bypass_the_cache(bundle, users):
+    cache = PredictionCache()
+    assert cache.key(users[0], dict(bundle, version=None)) is None
+    assert cache.key(dict(users[0], age='abc'), bundle) is None
+    assert cache.key(dict(users[0], smokingStatus=['never']), bundle) is None
+    # A fallback for a malformed weight must not be served to a user with a bmi
+    no_bmi = {k: v for k, v in users[0].items() if k != 'bmi'}
+    assert cache.key(dict(no_bmi, weight='abc'), bundle) is None
+    assert cache.key(dict(users[0], weight='abc'), bundle) is not None
+    unkeyable = dict(users[0], smokingStatus=['never'])
+    assert cache.predict(unkeyable, bundle) == predict_enhanced_health_risks(unkeyable, bundle)
+    assert cache.stats()['entries'] == 0
+
+
+def test_predict_serves_hits_until_the_ttl(bundle, users):
+    clock = FakeClock()
+    cache = PredictionCache(ttl=10, clock=clock)
+    result = cache.predict(users[0], bundle)
+    assert result == predict_enhanced_health_risks(users[0], bundle)
+    assert cache.predict(users[0], bundle) is result
+
+    clock.now = 9.9
+    assert cache.predict(users[0], bundle) is result
+    clock.now = 10.0
+    refreshed = cache.predict(users[0], bundle)
+    assert refreshed is not result and refreshed == result
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['expirations']) == (1, 2, 2, 1)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', {'risk': 1})
+    cache.put('b', {'risk': 2})
+    assert cache.get('a') == {'risk': 1}
+    cache.put('c', {'risk': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'risk': 1} and cache.get('c') == {'risk': 3}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_cap(users):
+    small = PredictionCache(max_bytes=100)
+    small.put('big', {'factors': ['x' * 200]})
+    assert small.stats()['entries'] == 0 and small.stats()['bytes'] == 0
+
+    cache = PredictionCache(max_bytes=2000)
+    for i in range(50):
+        cache.put(i, {'risk': i, 'factors': ['y' * 50]})
+    stats = cache.stats()
+    assert 0 < stats['bytes'] <= 2000 and stats['evictions'] > 0
+    assert cache.get(49) is not None and cache.get(0) is None
+
+
+def test_disabled_cache_stores_nothing(bundle, users):
+    cache = PredictionCache(max_entries=0)
+    assert not cache.enabled
+    cache.predict(users[0], bundle)
+    assert cache.stats()['entries'] == 0 and cache.stats()['misses'] == 0
@@ -0,0 +1,67 @@
+"""Recommendations for every risk type"""
+import pytest
+
+import predict
+from predict import generate_enhanced_recommendations, predict_enhanced_health_risks
+
+RISK_TYPES = list(predict.RISK_RULES)
+
+# The mental and immune rules read sleepHours and stressLevel, which these
+# users leave out or send as strings
+USERS = [
+    {},
+    {'age': 50, 'exerciseFrequency': 'never'},
+    {'age': '35', 'sleepHours': '5.5', 'stressLevel': '9', 'sleepQuality': 'poor'},
+    {'age': 62, 'bmi': 33.0, 'sleepHours': 9.0, 'stressLevel': 2, 'familyHistory': ['diabetes']}
+]
+
+
+@pytest.mark.parametrize('risk_type', RISK_TYPES)
+@pytest.mark.parametrize('user_data', USERS)
+def test_every_risk_type_has_recommendations(risk_type, user_data):
+    recommendations = generate_enhanced_recommendations(risk_type, 50, user_data)
+    assert predict.MIN_RECOMMENDATIONS <= len(recommendations) <= predict.MAX_RECOMMENDATIONS
+    for recommendation in recommendations:
+        assert set(recommendation) == {
+            'name', 'impact', 'suggestion', 'timeframe', 'difficulty', 'evidence', 'details'
+        }
+
+
+def test_sleep_and_stress_rules_read_the_user():
+    stressed = {'sleepHours': '5', 'stressLevel': '9'}
+    rested = {'sleepHours': '8', 'stressLevel': '2'}
+
+    def names(risk_type, user_data):
+        return {r['name'] for r in generate_enhanced_recommendations(risk_type, 50, user_data)}
+
+    assert {'Stress Management', 'Sleep for Mental Health'} <= names('mental', stressed)
+    assert not {'Stress Management', 'Sleep for Mental Health'} & names('mental', rested)
+    assert {'Sleep for Immune Function', 'Stress Management for Immunity'} <= names('immune', stressed)
+    assert not {'Sleep for Immune Function', 'Stress Management for Immunity'} & names('immune', rested)
+
+
+@pytest.mark.parametrize('user_data', USERS)
+def test_models_score_every_risk_type(bundle, user_data):
+    # A recommendation error sends the whole prediction to the fallback,
+    # which has no confidence
+    predictions = predict_enhanced_health_risks(user_data, bundle, deadline_ms=0)
+    assert set(predictions) == set(RISK_TYPES)
+    for prediction in predictions.values():
+        assert prediction['confidence'] is not None
+        assert len(prediction['factors']) >= predict.MIN_RECOMMENDATIONS
+
+
+def test_catalog_is_read_only_and_results_are_copies():
+    template = predict.RECOMMENDATION_CATALOG['sleep'][0]
+    with pytest.raises(TypeError):
+        template.output['name'] = 'changed'
+    with pytest.raises(TypeError):
+        predict.RECOMMENDATION_CATALOG['sleep'] = ()
+
+    user_data = {'sleepHours': '5', 'stressLevel': '9', 'exerciseFrequency': 'never'}
+    first = generate_enhanced_recommendations('sleep', 50, user_data)
+    expected = [dict(r) for r in first]
+    for recommendation in first:
+        assert type(recommendation) is dict
+        recommendation['suggestion'] = 'changed'
+    assert generate_enhanced_recommendations('sleep', 50, user_data) == expected
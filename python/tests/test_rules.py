@@ -0,0 +1,142 @@
+"""compile_vector against compile_scalar, row by row"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mock_model
+import predict
+import rules
+from rules import all_of, any_of, at_least, at_most, between, equals, has, is_set, negate, one_of
+
+
+def rows_of(columns):
+    n_rows = len(next(iter(columns.values())))
+    return [{name: values[i] for name, values in columns.items()} for i in range(n_rows)]
+
+
+@pytest.fixture(scope='module')
+def population():
+    df = predict.generate_enhanced_synthetic_data(3000, seed=7)
+    # Rows on the tier boundaries and outside every category
+    edges = df.head(6).copy()
+    edges['age'] = [18, 45, 55, 65, 70, 75]
+    edges['bmi'] = [18.5, 25.0, 30.0, 35.0, 40.0, 0.0]
+    edges['sleep_hours'] = [5.0, 6.0, 7.0, 9.0, 9.5, 0.0]
+    edges['family_history'] = [(), ('none',), ('stroke', 'diabetes'), ('cancer',), ('mental-health',), ()]
+    edges['existing_conditions'] = [(), ('none',), ('diabetes', 'hypertension'), ('mental-health',), (), ()]
+    edges['gender'] = edges['gender'].cat.add_categories('other')
+    edges.loc[edges.index[0], 'gender'] = 'other'
+    return pd.concat([df, edges], ignore_index=True)
+
+
+def test_vectorized_labels_match_rowwise(population):
+    vectorized = predict.calculate_risk_scores(population)
+    rowwise = predict.calculate_risk_scores(population, mode='rowwise')
+    pd.testing.assert_frame_equal(vectorized, rowwise)
+
+
+def test_list_and_series_columns_agree(population):
+    table = predict.RISK_RULES['chronic']
+    as_lists = {name: population[name].tolist() for name in population.columns}
+    expected = rules.compile_vector(table)(population)
+    np.testing.assert_array_equal(rules.compile_vector(table)(as_lists), expected)
+
+
+def test_every_condition_and_rule_kind():
+    rng = np.random.default_rng(0)
+    n_rows = 500
+    columns = {
+        'x': rng.integers(0, 10, n_rows),
+        'y': rng.uniform(-5, 5, n_rows),
+        'kind': rng.choice(['a', 'b', 'c', 'other'], n_rows).tolist(),
+        'flag': rng.integers(0, 2, n_rows).astype(bool),
+        'items': [list(rng.choice(['p', 'q', 'r', 'none'], rng.integers(0, 3))) for _ in range(n_rows)]
+    }
+    conditions = [
+        at_least('x', 5), rules.above('y', 0), at_most('x', 2), rules.below('y', -1), between('x', 3, 6),
+        equals('kind', 'a'), one_of('kind', ['b', 'c']), has('items', 'q'), is_set('flag'),
+        negate(has('items', 'p'))
+    ]
+    points = rules.points_table([
+        *(rules.when(condition, i + 1) for i, condition in enumerate(conditions)),
+        rules.tiers((all_of(*conditions[:2]), 7), (any_of(*conditions[2:4]), -3)),
+        rules.when(rules.at_least_n(3, conditions), 11),
+        rules.lookup('kind', {'a': 1, 'b': 5}, default=-2),
+        rules.count('items', 4)
+    ], low=-10, high=40)
+    adjustment = rules.adjustment_table([
+        rules.bump((conditions[0], 6, 60), (conditions[5], 3, 50)),
+        rules.bump((conditions[7], 10, 55))
+    ], low=5)
+    weighted = rules.weighted_sum([
+        rules.value(0.3, 'x'), rules.ratio(0.2, 'y', 3), rules.complement(0.1, 10, 'x', 10),
+        rules.hinge(0.4, 'y', 1, 2), rules.distance(0.25, 'y', 0.5, 4), rules.indicator(0.15, conditions[6])
+    ], scale=100, low=0, high=100)
+
+    rows = rows_of(columns)
+    for table in (points, weighted):
+        scalar = rules.compile_scalar(table)
+        np.testing.assert_array_equal(rules.compile_vector(table)(columns), [scalar(row) for row in rows])
+    risk = rng.integers(0, 90, n_rows)
+    scalar = rules.compile_scalar(adjustment)
+    np.testing.assert_array_equal(
+        rules.compile_vector(adjustment)(risk, columns), [scalar(r, row) for r, row in zip(risk, rows)]
+    )
+
+
+@pytest.mark.filterwarnings('ignore:overflow:RuntimeWarning')
+def test_weighted_sum_is_nan_where_scalar_raises():
+    table = rules.weighted_sum([rules.value(1.0, 'x'), rules.value(1.0, 'y')], scale=1, low=0, high=100)
+    columns = {'x': np.array([1.0, math.inf, math.nan, 1e308]), 'y': np.array([2.0, 0.0, 0.0, 1e308])}
+    scalar = rules.compile_scalar(table)
+    result = rules.compile_vector(table)(columns)
+    assert result[0] == scalar(rows_of(columns)[0])
+    for i, row in enumerate(rows_of(columns)[1:], start=1):
+        assert np.isnan(result[i])
+        with pytest.raises((OverflowError, ValueError)):
+            scalar(row)
+
+
+def test_codes_of_values_outside_the_categories():
+    categories = ('a', 'b')
+    values = ['b', 'z', None, 3, 'a']
+    expected = [1, 2, 2, 2, 0]
+    assert rules.Columns({'c': values}).codes('c', categories).tolist() == expected
+    assert rules.Columns({'c': pd.Series(values, dtype=object)}).codes('c', categories).tolist() == expected
+    assert rules.Columns({'c': [['a'], 'a']}).codes('c', categories).tolist() == [2, 0]
+
+
+@pytest.mark.parametrize('risk_type', list(predict.RISK_RULES))
+def test_clinical_adjustments_batch_matches_scalar(risk_type, users):
+    records = users + [
+        {'age': 70, 'bmi': 40, 'smokingStatus': 'regular', 'bloodPressure': 'stage2', 'bloodSugarLevel': '126+'},
+        {'age': '60', 'bmi': '39.9', 'cholesterolLevels': 'very-high', 'bloodPressure': 'stage1'},
+        {}
+    ]
+    base_risk = np.random.default_rng(1).integers(0, 90, len(records))
+    inputs = predict._clinical_adjustment_inputs(records)
+    assert inputs['valid'].all()
+    batch = predict.apply_clinical_adjustments_batch(risk_type, base_risk, inputs)
+    assert batch.tolist() == [
+        predict.apply_clinical_adjustments(risk_type, int(risk), user_data)
+        for risk, user_data in zip(base_risk, records)
+    ]
+
+
+def test_mock_batch_matches_scalar(users):
+    records = users[:100] + [
+        {},
+        {'age': 40, 'bmi': 0, 'weight': 80, 'height': 180, 'exerciseFrequency': 'active'},
+        {'bmi': math.inf},
+        {'stressLevel': 2 ** 60, 'sleepQuality': 'unknown', 'anxietyFrequency': 'constantly'}
+    ]
+    batch = mock_model.mock_predict_health_risks_batch(records)
+    for user_data, result in zip(records, batch):
+        try:
+            expected = mock_model.mock_predict_health_risks(user_data)
+        except Exception:
+            assert list(result) == ['error']
+        else:
+            assert result == expected
@@ -0,0 +1,68 @@
+"""generate_enhanced_synthetic_data: seed contract, dtypes and value ranges"""
+import numpy as np
+import pandas as pd
+
+import predict
+from predict import EXISTING_CONDITIONS, FAMILY_CONDITIONS, generate_enhanced_synthetic_data
+
+CATEGORIES = {
+    'gender': ['male', 'female'],
+    'sleep_quality': ['poor', 'fair', 'average', 'good', 'excellent'],
+    'smoking_status': ['non-smoker', 'former-smoker', 'occasional', 'regular'],
+    'alcohol_consumption': ['none', 'occasional', 'moderate', 'heavy'],
+    'blood_pressure': predict.BLOOD_PRESSURE_CATEGORIES,
+    'cholesterol_levels': predict.CHOLESTEROL_CATEGORIES,
+    'blood_sugar_levels': predict.BLOOD_SUGAR_CATEGORIES
+}
+
+
+def test_same_seed_gives_an_identical_frame():
+    state = np.random.get_state()
+    first = generate_enhanced_synthetic_data(2000, seed=3)
+    np.random.seed(12345)
+    pd.testing.assert_frame_equal(first, generate_enhanced_synthetic_data(2000, seed=3))
+    # The global RNG is neither read nor advanced
+    np.random.set_state(state)
+    generate_enhanced_synthetic_data(100, seed=3)
+    assert np.random.get_state()[1].tolist() == state[1].tolist()
+
+
+def test_different_seeds_differ():
+    first = generate_enhanced_synthetic_data(500, seed=1)
+    second = generate_enhanced_synthetic_data(500, seed=2)
+    for column in ('age', 'bmi', 'sleep_hours', 'smoking_status'):
+        assert not first[column].equals(second[column])
+
+
+def test_columns_dtypes_and_ranges():
+    data = generate_enhanced_synthetic_data(5000, seed=0)
+    assert len(data) == 5000
+
+    for column, categories in CATEGORIES.items():
+        assert isinstance(data[column].dtype, pd.CategoricalDtype)
+        assert list(data[column].cat.categories) == categories
+        assert data[column].notna().all()
+
+    assert data['age'].between(18, 84).all()
+    assert data['height'].between(140, 210).all()
+    assert data['weight'].between(35, 200).all()
+    np.testing.assert_allclose(data['bmi'], data['weight'] / (data['height'] / 100) ** 2)
+    assert data['exercise_frequency'].between(0, 7).all()
+    assert data['sleep_hours'].between(4, 12).all()
+    assert data['stress_level'].between(1, 10).all()
+    assert data['diet_quality'].between(1, 10).all()
+
+    for column, conditions in (('family_history', FAMILY_CONDITIONS), ('existing_conditions', EXISTING_CONDITIONS)):
+        for value in data[column]:
+            assert value == ('none',) or (0 < len(value) == len(set(value)) and set(value) <= set(conditions))
+    assert data['family_history'].map(len).max() <= 3
+    # Stage 1 and 2 blood pressure always comes with hypertension
+    hypertensive = data['blood_pressure'].isin(['stage1', 'stage2'])
+    assert data.loc[hypertensive, 'existing_conditions'].map(lambda v: 'hypertension' in v).all()
+
+
+def test_labels_are_a_function_of_the_seed():
+    first = predict.calculate_risk_scores(generate_enhanced_synthetic_data(1000, seed=5))
+    second = predict.calculate_risk_scores(generate_enhanced_synthetic_data(1000, seed=5))
+    pd.testing.assert_frame_equal(first, second)
+    assert first.apply(lambda column: column.nunique()).min() > 5
@@ -0,0 +1,100 @@
+"""Training cache keys and reuse in train.train_models"""
+import functools
+import os
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+import predict
+import rules
+import train
+import train_cache
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    X, y = make_classification(n_samples=300, n_features=6, n_informative=3, random_state=0)
+    return X, {'cardiovascular': y, 'sleep': (X[:, 0] > 0).astype(int)}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """train_models reading and writing a store under tmp_path"""
+    for name in ('load', 'store'):
+        monkeypatch.setattr(train_cache, name, functools.partial(getattr(train_cache, name), cache_dir=str(tmp_path)))
+    return tmp_path
+
+
+def test_target_key_follows_data_and_schema(dataset):
+    X, targets = dataset
+    y = targets['cardiovascular']
+    key = train_cache.target_key('cardiovascular', X, y, {'columns': ['a']})
+    assert key == train_cache.target_key('cardiovascular', X.copy(), y.copy(), {'columns': ['a']})
+
+    flipped = y.copy()
+    flipped[0] = 1 - flipped[0]
+    changed = {
+        'dataset': train_cache.target_key('cardiovascular', X, flipped, {'columns': ['a']}),
+        'schema': train_cache.target_key('cardiovascular', X, y, {'columns': ['b']})
+    }
+    for field, other in changed.items():
+        assert [name for name in key if key[name] != other[name]] == [field]
+    # Same values, different dtype
+    assert train_cache.target_key('cardiovascular', X.astype(np.float32), y, {'columns': ['a']}) != key
+
+
+def test_editing_one_rule_table_changes_only_its_labeler(monkeypatch):
+    before = {risk_type: train_cache.labeler_fingerprint(risk_type) for risk_type in predict.RISK_RULES}
+    assert len({fingerprint['code'] for fingerprint in before.values()}) == len(before)
+
+    table = predict.RISK_RULES['sleep']
+    monkeypatch.setitem(predict.RISK_RULES, 'sleep', rules.points_table(table.rules, table.low, table.high + 1))
+    after = {risk_type: train_cache.labeler_fingerprint(risk_type) for risk_type in predict.RISK_RULES}
+    assert [risk_type for risk_type in before if before[risk_type] != after[risk_type]] == ['sleep']
+
+
+def test_store_and_load(tmp_path):
+    target = {'risk_type': 'sleep', 'dataset': 'abc'}
+    job = train_cache.estimator_spec(LogisticRegression(C=0.5))
+    assert train_cache.load('model', target, job, str(tmp_path)) is None
+
+    train_cache.store('model', target, job, {'value': [1, 2]}, str(tmp_path))
+    assert train_cache.load('model', target, job, str(tmp_path)) == {'value': [1, 2]}
+    other_job = train_cache.estimator_spec(LogisticRegression(C=1.0))
+    assert train_cache.load('model', target, other_job, str(tmp_path)) is None
+    assert train_cache.load('cv', target, job, str(tmp_path)) is None
+    # Written through a temporary file that is renamed into place
+    assert os.listdir(tmp_path / 'model') == [os.path.basename(train_cache.job_path('model', target, job, ''))]
+
+
+def test_train_models_reuses_unchanged_targets(dataset, cache_dir, monkeypatch, capsys):
+    monkeypatch.setattr(train, 'candidate_algorithms', lambda: {
+        'RandomForest': RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0),
+        'LogisticRegression': LogisticRegression(max_iter=1000)
+    })
+    X, targets = dataset
+    schema = {'columns': [f'x{i}' for i in range(X.shape[1])]}
+
+    def run(targets):
+        capsys.readouterr()
+        result = train.train_models(X, targets, n_jobs=1, search='grid', feature_schema=schema, use_cache=True)
+        return result, capsys.readouterr().out
+
+    (models, _, performance, _, report), _ = run(targets)
+    assert report['cached_targets'] == []
+
+    (cached_models, _, cached_performance, _, report), out = run(targets)
+    assert report['cached_targets'] == ['cardiovascular', 'sleep']
+    assert out.count('Loaded cached fitted model') == 2
+    assert cached_performance == performance
+    for name, model in models.items():
+        np.testing.assert_array_equal(cached_models[name].predict_proba(X), model.predict_proba(X))
+
+    # New labels for one target retrain only that target
+    relabeled = dict(targets, sleep=(X[:, 1] > 0).astype(int))
+    (_, _, _, _, report), out = run(relabeled)
+    assert report['cached_targets'] == ['cardiovascular']
+    assert out.count('Loaded cached fitted model') == 1
@@ -0,0 +1,34 @@
+"""train_streaming bundles: schema, save and load, serving"""
+import model_bundle
+import serving
+import train
+from predict import predict_enhanced_health_risks_batch
+
+
+def test_streamed_bundle_saves_loads_and_serves(monkeypatch, trained_bundle, tmp_path, users):
+    streamed = train.train_streaming(3000, seed=1, chunk_size=1000, validation_size=600)
+
+    # Same schema as a train() bundle (conftest.trained_bundle), which other
+    # tests may have given a cached feature_encoder
+    assert set(streamed) - {'selection_report'} == set(trained_bundle) - {'feature_encoder'}
+    assert list(streamed['models']) == list(trained_bundle['models'])
+    assert streamed['feature_schema'] == trained_bundle['feature_schema']
+    for risk_type, performance in streamed['model_performance'].items():
+        assert set(trained_bundle['model_performance'][risk_type]) <= set(performance)
+    for name, encoder in streamed['encoders'].items():
+        assert list(encoder.classes_) == list(trained_bundle['encoders'][name].classes_)
+    report = streamed['selection_report']
+    assert report['n_chunks'] == 3 and report['validation_rows'] == 600
+    assert streamed['training']['n_samples'] == 3000
+
+    model_dir = str(tmp_path)
+    version = model_bundle.save_bundle(streamed, model_dir)
+    loaded = model_bundle.load_bundle(model_dir)
+    assert loaded['version'] == version
+    expected = predict_enhanced_health_risks_batch(users[:50], streamed)
+    assert predict_enhanced_health_risks_batch(users[:50], loaded) == expected
+    assert all(prediction['confidence'] is not None for result in expected for prediction in result.values())
+
+    monkeypatch.setattr(serving, '_bundle', None)
+    assert serving.load(model_dir)['version'] == version
+    assert serving.predict(users[0]) == expected[0]
@@ -0,0 +1,84 @@
+"""Exported tree ensembles against sklearn's predict_proba"""
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+import tree_export
+from feature_encoder import FeatureEncoder
+
+TREE_TYPES = ('cardiovascular', 'sleep', 'mental', 'immune')
+
+
+def _scaled_rows(bundle, risk_type, users):
+    X = FeatureEncoder(bundle['feature_schema']).encode_many(users)
+    return bundle['scalers'][risk_type].transform(X)
+
+
+def _threshold_rows(model, X):
+    """Rows of ``X`` with one feature set exactly to a split threshold"""
+    compiled = tree_export.export_tree_ensemble(model)
+    splits = np.flatnonzero(np.isfinite(compiled.threshold))[:200]
+    rows = np.repeat(X[:1], len(splits), axis=0)
+    rows[np.arange(len(splits)), compiled.feature[splits]] = compiled.threshold[splits]
+    return rows
+
+
+@pytest.mark.parametrize('risk_type', TREE_TYPES)
+def test_export_matches_predict_proba(trained_bundle, users, risk_type):
+    model = trained_bundle['models'][risk_type]
+    compiled = tree_export.export_tree_ensemble(model)
+    X = _scaled_rows(trained_bundle, risk_type, users)
+    X = np.vstack([X, _threshold_rows(model, X), X * 100, -X * 100])
+
+    expected = model.predict_proba(X)
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(
+        (compiled.predict_positive(X) * 100).astype(int), (expected[:, 1] * 100).astype(int)
+    )
+    for row, probability in zip(X[:20], expected[:20, 1]):
+        assert compiled.predict_positive(row) == pytest.approx(probability, abs=1e-9)
+
+
+@pytest.mark.parametrize('risk_type', TREE_TYPES)
+def test_saved_arrays_score_like_the_export(trained_bundle, bundle, users, risk_type):
+    X = _scaled_rows(trained_bundle, risk_type, users)
+    np.testing.assert_array_equal(
+        bundle['compiled'][risk_type].predict_positive(X),
+        trained_bundle['compiled'][risk_type].predict_positive(X)
+    )
+
+
+def test_unsupported_models_are_not_exported():
+    X, y = make_classification(n_samples=200, n_classes=3, n_informative=4, random_state=0)
+    assert tree_export.export_tree_ensemble(RandomForestClassifier(n_estimators=3).fit(X, y)) is None
+    assert tree_export.export_tree_ensemble(LogisticRegression().fit(X, y % 2)) is None
+
+
+def test_verify_export_rejects_a_different_model(trained_bundle, users):
+    X = _scaled_rows(trained_bundle, 'mental', users)
+    model = trained_bundle['models']['mental']
+    assert tree_export.verify_export(model, trained_bundle['compiled']['mental'], X) <= 1e-9
+    with pytest.raises(tree_export.ExportMismatchError):
+        tree_export.verify_export(model, trained_bundle['compiled']['sleep'], X)
+
+
+def test_boosting_init_matches_the_prior():
+    X, y = make_classification(n_samples=300, weights=[0.8], random_state=0)
+    for init in (None, 'zero'):
+        model = GradientBoostingClassifier(n_estimators=5, init=init, random_state=0).fit(X, y)
+        compiled = tree_export.export_tree_ensemble(model)
+        assert tree_export.verify_export(model, compiled, X) <= 1e-9
+    # Inits that depend on the row, and other losses, stay on sklearn
+    for model in (GradientBoostingClassifier(n_estimators=5, init=LogisticRegression()),
+                  GradientBoostingClassifier(n_estimators=5, loss='exponential')):
+        assert tree_export.export_tree_ensemble(model.fit(X, y)) is None
+
+
+@pytest.mark.parametrize('value', [np.nan, np.inf])
+def test_nonfinite_rows_are_rejected(trained_bundle, users, value):
+    X = _scaled_rows(trained_bundle, 'sleep', users[:3])
+    X[1, 0] = value
+    with pytest.raises(ValueError):
+        trained_bundle['compiled']['sleep'].predict_positive(X)
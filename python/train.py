@@ -0,0 +1,554 @@
+"""
+Training step: generate data, fit the risk models and save a model bundle.
+
+    python train.py [--samples 5000] [--seed 42] [--model-dir models]
+    python train.py --streaming --samples 100000000 [--chunk-size 500000] [--data-file FILE]
+
+Training never runs on import; request processes load the saved bundle
+through serving.py instead.
+
+``--streaming`` trains out of core: the population is generated (or read
+from an Arrow file) chunk by chunk and the scaler and models are fitted
+with ``partial_fit``, so peak memory depends on the chunk size rather than
+the population size. It produces a bundle with the same schema.
+
+CV scores and fitted models are reused from train_cache.py for targets
+whose training data, feature schema and code have not changed since an
+earlier run; ``--no-train-cache`` retrains everything.
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import ParameterGrid, train_test_split
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+from sklearn.svm import SVC
+
+import cv_scheduler
+import data_cache
+import model_bundle
+import train_cache
+import tree_export
+from predict import (
+    EXISTING_CONDITIONS, FAMILY_CONDITIONS, FEATURE_COLUMNS, RISK_LABELERS, RISK_THRESHOLD,
+    calculate_risk_scores, fit_label_encoders, generate_enhanced_synthetic_data, prepare_features
+)
+
+# Convergence and feature-name warnings from model selection; set here
+# rather than in predict.py so that serving processes keep their filters
+warnings.filterwarnings('ignore')
+
+
+def build_training_data(n_samples=5000, seed=42, use_cache=True):
+    """Generate a synthetic population and label it for every risk type.
+
+    With ``use_cache`` the labeled data is reused from data_cache.py when
+    an identical population was generated before.
+    """
+    if use_cache:
+        data, hit = data_cache.load_labeled_data(n_samples, seed)
+        print(f"{'Loaded cached' if hit else 'Generated and cached'} labeled health data "
+              f"({n_samples} samples, seed {seed})")
+    else:
+        print("Generating enhanced synthetic health data...")
+        data = generate_enhanced_synthetic_data(n_samples, seed=seed)
+        
+        # Calculate risk scores
+        print("Calculating enhanced risk scores...")
+        data = data.join(calculate_risk_scores(data))
+
+    return add_high_risk_labels(data)
+
+
+def add_high_risk_labels(data):
+    """Convert risk scores to binary classification targets for model training"""
+    for risk_type in RISK_LABELERS:
+        data[f'{risk_type}_high_risk'] = (data[f'{risk_type}_risk'] > RISK_THRESHOLD).astype(int)
+    return data
+
+
+def candidate_algorithms():
+    """Fresh, unfitted candidates considered for every risk type"""
+    return {
+        'RandomForest': RandomForestClassifier(n_estimators=200, max_depth=10, random_state=42),
+        'GradientBoosting': GradientBoostingClassifier(n_estimators=200, max_depth=6, random_state=42),
+        'LogisticRegression': LogisticRegression(random_state=42, max_iter=1000),
+        'SVM': SVC(probability=True, random_state=42)
+    }
+
+
+# Hyperparameters explored by the successive-halving search, per algorithm.
+# n_estimators is not searched: halving grows ensembles rung by rung
+SEARCH_SPACE = {
+    'RandomForest': (
+        RandomForestClassifier(random_state=42),
+        {'max_depth': [6, 10], 'min_samples_leaf': [1, 5]}
+    ),
+    'GradientBoosting': (
+        GradientBoostingClassifier(n_iter_no_change=10, validation_fraction=0.1, random_state=42),
+        {'max_depth': [3, 6], 'learning_rate': [0.05, 0.1]}
+    ),
+    'LogisticRegression': (
+        LogisticRegression(random_state=42, max_iter=1000),
+        {'C': [0.1, 1.0]}
+    ),
+    'SVM': (
+        SVC(probability=True, random_state=42),
+        {'C': [1.0]}
+    )
+}
+
+# (folds, ensemble size) per halving rung; the last rung matches candidate_algorithms
+SEARCH_RUNGS = ((2, 50), (3, 100), (5, 200))
+
+# Among final candidates within this CV AUC of the best, the smallest model wins
+SELECTION_TOLERANCE = 0.002
+
+
+def search_candidates():
+    """Fresh, unfitted candidates of the halving search, keyed by candidate name.
+
+    Values are ``(algo_name, params, estimator)``.
+    """
+    candidates = {}
+    for algo_name, (estimator, grid) in SEARCH_SPACE.items():
+        for params in ParameterGrid(grid):
+            name = f"{algo_name}({', '.join(f'{key}={value}' for key, value in params.items())})"
+            candidates[name] = (algo_name, params, clone(estimator).set_params(**params))
+    return candidates
+
+
+def select_candidate(scores, complexity=None, tolerance=SELECTION_TOLERANCE):
+    """Name of the candidate with the best mean CV score.
+
+    With ``complexity``, the smallest candidate within ``tolerance`` of the
+    best mean score is selected instead.
+    """
+    mean_scores = {name: fold_scores.mean() for name, fold_scores in scores.items()}
+    best_name = max(mean_scores, key=mean_scores.get)
+    if complexity is None:
+        return best_name
+    close = [name for name in mean_scores if mean_scores[name] >= mean_scores[best_name] - tolerance]
+    return min(close, key=lambda name: complexity[name])
+
+
+def train_models(X, targets, n_jobs=None, search='halving', feature_schema=None, use_cache=False):
+    """Select, fit and evaluate the best algorithm for each target.
+
+    With ``search='halving'`` the ``search_candidates`` grid is narrowed by
+    successive halving (``cv_scheduler.successive_halving``) over
+    ``SEARCH_RUNGS``. With ``search='grid'`` every ``candidate_algorithms``
+    entry is scored on all 5 folds. Either way the fold jobs run through
+    the parallel scheduler in cv_scheduler.py with ``n_jobs`` workers.
+
+    Tree ensembles that win selection are also exported for pure-NumPy
+    inference (tree_export.py) and verified against ``predict_proba`` on
+    the held-out split.
+
+    With ``use_cache``, CV scores and fitted models are looked up in the
+    content-addressed store of train_cache.py, keyed by each target's
+    training data, ``feature_schema`` and code version, and only targets
+    without a stored result are cross-validated or fitted.
+
+    Returns ``(models, scalers, model_performance, compiled, selection_report)``
+    keyed by target name.
+    """
+    models = {}
+    compiled = {}
+    scalers = {}
+    model_performance = {}
+    splits = {}
+
+    print("\nTraining enhanced machine learning models...")
+
+    for target_name, y in targets.items():
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+        # Scale features. Fitted on plain arrays, as serving passes them, so
+        # the scaler has no feature names to check on every request
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(np.asarray(X_train, dtype=float))
+        X_test_scaled = scaler.transform(np.asarray(X_test, dtype=float))
+
+        scalers[target_name] = scaler
+        splits[target_name] = (X_train_scaled, X_test_scaled, y_train, y_test)
+
+    if search == 'halving':
+        candidates = search_candidates()
+    else:
+        candidates = {algo_name: (algo_name, {}, model) for algo_name, model in candidate_algorithms().items()}
+    estimators = {name: candidate[2] for name, candidate in candidates.items()}
+
+    # CV scores already in the training cache
+    cache_keys = {}
+    cached_scores = {}
+    if use_cache:
+        search_job = {
+            'search': search,
+            'candidates': {name: train_cache.estimator_spec(estimator) for name, estimator in estimators.items()},
+            'rungs': SEARCH_RUNGS if search == 'halving' else None,
+            'cv': 5,
+            'scoring': 'roc_auc'
+        }
+        for target_name, (X_train_scaled, _, y_train, _) in splits.items():
+            cache_keys[target_name] = train_cache.target_key(
+                target_name, X_train_scaled, np.asarray(y_train), feature_schema
+            )
+            entry = train_cache.load('cv', cache_keys[target_name], search_job)
+            if entry is not None:
+                cached_scores[target_name] = entry
+        if cached_scores:
+            print(f"Reusing cached CV scores for {', '.join(cached_scores)}")
+
+    # Try multiple algorithms on every remaining target and select the best
+    datasets = {
+        target_name: (split[0], split[2]) for target_name, split in splits.items() if target_name not in cached_scores
+    }
+    if search == 'halving':
+        cv_scores, complexity, selection_report = cv_scheduler.successive_halving(
+            datasets, estimators, rungs=SEARCH_RUNGS, cv=5, scoring='roc_auc', n_jobs=n_jobs
+        )
+    else:
+        cv_scores, selection_report = cv_scheduler.cross_validate_candidates(
+            datasets, estimators, cv=5, scoring='roc_auc', n_jobs=n_jobs
+        )
+        complexity = None
+    selection_report['cached_targets'] = list(cached_scores)
+
+    for target_name, entry in cached_scores.items():
+        cv_scores[target_name] = entry['cv_scores']
+        if complexity is not None:
+            complexity[target_name] = entry['complexity']
+    if use_cache:
+        for target_name in datasets:
+            train_cache.store('cv', cache_keys[target_name], search_job, {
+                'cv_scores': cv_scores[target_name],
+                'complexity': None if complexity is None else complexity[target_name]
+            })
+
+    for target_name, (X_train_scaled, X_test_scaled, y_train, y_test) in splits.items():
+        print(f"\nTraining {target_name} model...")
+
+        best_name = select_candidate(cv_scores[target_name], None if complexity is None else complexity[target_name])
+        best_algo_name, best_params, best_model = candidates[best_name]
+        best_score = cv_scores[target_name][best_name].mean()
+
+        # Train the best model at the full budget of the search
+        best_model = clone(best_model)
+        if search == 'halving' and 'n_estimators' in best_model.get_params():
+            best_model.set_params(n_estimators=SEARCH_RUNGS[-1][1])
+        fit_job = train_cache.estimator_spec(best_model)
+        cached_model = train_cache.load('model', cache_keys[target_name], fit_job) if use_cache else None
+        if cached_model is not None:
+            print("Loaded cached fitted model")
+            best_model = cached_model
+        else:
+            best_model.fit(X_train_scaled, y_train)
+            if use_cache:
+                train_cache.store('model', cache_keys[target_name], fit_job, best_model)
+
+        # Evaluate
+        y_pred = best_model.predict(X_test_scaled)
+        y_pred_proba = best_model.predict_proba(X_test_scaled)[:, 1]
+
+        accuracy = accuracy_score(y_test, y_pred)
+        auc_score = roc_auc_score(y_test, y_pred_proba)
+
+        models[target_name] = best_model
+        exported = tree_export.export_tree_ensemble(best_model)
+        if exported is not None:
+            tree_export.verify_export(best_model, exported, X_test_scaled)
+            compiled[target_name] = exported
+        model_performance[target_name] = {
+            'algorithm': best_algo_name,
+            'params': best_params,
+            'accuracy': float(accuracy),
+            'auc_score': float(auc_score),
+            'cv_score': float(best_score),
+            'model_complexity': cv_scheduler.model_complexity(best_model)
+        }
+
+        print(f"Best algorithm: {best_name}")
+        print(f"Accuracy: {accuracy:.4f}")
+        print(f"AUC Score: {auc_score:.4f}")
+        print(f"CV Score: {best_score:.4f}")
+
+    return models, scalers, model_performance, compiled, selection_report
+
+
+def train(n_samples=5000, seed=42, n_jobs=None, use_data_cache=True, search='halving', use_train_cache=True):
+    """Run the full training pipeline and return an unsaved model bundle.
+
+    ``use_data_cache`` reuses labeled data from data_cache.py and
+    ``use_train_cache`` CV scores and fitted models from train_cache.py.
+    """
+    data = build_training_data(n_samples, seed, use_data_cache)
+
+    # Prepare features
+    X, encoders = prepare_features(data)
+    print(f"Feature matrix shape: {X.shape}")
+
+    # Define target variables
+    targets = {risk_type: data[f'{risk_type}_high_risk'] for risk_type in RISK_LABELERS}
+
+    feature_schema = model_bundle.build_feature_schema(
+        FEATURE_COLUMNS, encoders, FAMILY_CONDITIONS, EXISTING_CONDITIONS, RISK_THRESHOLD
+    )
+    models, scalers, model_performance, compiled, selection_report = train_models(
+        X, targets, n_jobs, search, feature_schema, use_cache=use_train_cache
+    )
+
+    return {
+        'models': models,
+        'compiled': compiled,
+        'scalers': scalers,
+        'encoders': encoders,
+        'model_performance': model_performance,
+        'feature_schema': feature_schema,
+        'training': {
+            'n_samples': n_samples,
+            'seed': seed,
+            'model_selection': {k: v for k, v in selection_report.items() if k != 'job_times'}
+        },
+        'selection_report': selection_report
+    }
+
+
+def incremental_algorithms():
+    """Fresh candidates that support ``partial_fit``, for streaming training"""
+    return {
+        'SGDLogisticRegression': SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42),
+        'NaiveBayes': GaussianNB()
+    }
+
+
+def iter_generated_chunks(n_samples, seed, chunk_size):
+    """Labeled synthetic population generated ``chunk_size`` rows at a time.
+
+    Chunk ``i`` is drawn from the ``i``-th child of ``SeedSequence(seed)``:
+    the stream is reproducible, but it is not the same population as
+    ``generate_enhanced_synthetic_data(n_samples, seed)``.
+    """
+    n_chunks = -(-n_samples // chunk_size)
+    for i, child_seed in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        data = generate_enhanced_synthetic_data(min(chunk_size, n_samples - i * chunk_size), seed=child_seed)
+        yield data.join(calculate_risk_scores(data))
+
+
+def _holdout_mask(n_rows, budget, stride=5):
+    """Every ``stride``-th row goes to validation until ``budget`` rows are taken"""
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[np.arange(0, n_rows, stride)[:max(budget, 0)]] = True
+    return mask
+
+
+def train_streaming(n_samples=5000, seed=42, chunk_size=500_000, data_file=None, epochs=1,
+                    validation_size=200_000):
+    """Out-of-core counterpart of ``train`` returning a bundle with the same schema.
+
+    Chunks come from ``iter_generated_chunks`` or, with ``data_file``, from
+    an Arrow file in the data_cache.py layout. One pass fits a shared
+    StandardScaler with ``partial_fit``. Then ``epochs`` passes fit every
+    ``incremental_algorithms`` candidate for every target. A fixed
+    validation set of up to ``validation_size`` rows is held out of
+    training. Candidates are selected on its AUC, which is also reported
+    as ``cv_score``. The data is read once per pass, never held whole.
+    """
+    def chunks():
+        if data_file:
+            return data_cache.iter_chunks(data_file, chunk_size)
+        return iter_generated_chunks(n_samples, seed, chunk_size)
+
+    # Categorical dtypes carry their full vocabulary, so one row fixes the encoders
+    sample = next(data_cache.iter_chunks(data_file, 1)) if data_file else \
+        generate_enhanced_synthetic_data(1, seed=seed)
+    encoders = fit_label_encoders(sample)
+
+    def prepared_chunks():
+        remaining = validation_size
+        for data in chunks():
+            add_high_risk_labels(data)
+            X, _ = prepare_features(data, encoders)
+            holdout = _holdout_mask(len(X), remaining)
+            remaining -= int(holdout.sum())
+            targets = {risk_type: data[f'{risk_type}_high_risk'].to_numpy() for risk_type in RISK_LABELERS}
+            yield X.to_numpy(dtype=float), targets, holdout
+
+    start = time.perf_counter()
+
+    print("Fitting scaler over streamed chunks...")
+    scaler = StandardScaler()
+    X_val, y_val = [], {risk_type: [] for risk_type in RISK_LABELERS}
+    n_rows = n_chunks = 0
+    for X, targets, holdout in prepared_chunks():
+        scaler.partial_fit(X[~holdout])
+        X_val.append(X[holdout])
+        for risk_type, y in targets.items():
+            y_val[risk_type].append(y[holdout])
+        n_rows += len(X)
+        n_chunks += 1
+    X_val = scaler.transform(np.concatenate(X_val))
+    y_val = {risk_type: np.concatenate(y) for risk_type, y in y_val.items()}
+
+    candidates = {risk_type: incremental_algorithms() for risk_type in RISK_LABELERS}
+    job_times = {f'{risk_type}/{algo_name}': 0.0 for risk_type in candidates for algo_name in candidates[risk_type]}
+    for epoch in range(epochs):
+        print(f"Training incremental models, epoch {epoch + 1}/{epochs}...")
+        for X, targets, holdout in prepared_chunks():
+            X_train = scaler.transform(X[~holdout])
+            for risk_type, algorithms in candidates.items():
+                y_train = targets[risk_type][~holdout]
+                for algo_name, model in algorithms.items():
+                    job_start = time.perf_counter()
+                    model.partial_fit(X_train, y_train, classes=[0, 1])
+                    job_times[f'{risk_type}/{algo_name}'] += time.perf_counter() - job_start
+
+    models, model_performance, validation_scores = {}, {}, {}
+    for risk_type, algorithms in candidates.items():
+        print(f"\nSelecting {risk_type} model...")
+        best_score = 0
+        best_algo_name = None
+        validation_scores[risk_type] = {}
+        for algo_name, model in algorithms.items():
+            score = roc_auc_score(y_val[risk_type], model.predict_proba(X_val)[:, 1])
+            validation_scores[risk_type][algo_name] = float(score)
+            if score > best_score:
+                best_score = score
+                best_algo_name = algo_name
+
+        best_model = algorithms[best_algo_name]
+        y_pred_proba = best_model.predict_proba(X_val)[:, 1]
+        accuracy = accuracy_score(y_val[risk_type], best_model.predict(X_val))
+        auc_score = roc_auc_score(y_val[risk_type], y_pred_proba)
+
+        models[risk_type] = best_model
+        model_performance[risk_type] = {
+            'algorithm': best_algo_name,
+            'accuracy': float(accuracy),
+            'auc_score': float(auc_score),
+            'cv_score': float(best_score)
+        }
+        print(f"Best algorithm: {best_algo_name}")
+        print(f"Accuracy: {accuracy:.4f}")
+        print(f"AUC Score: {auc_score:.4f}")
+
+    wall_time = time.perf_counter() - start
+    serial_time = sum(job_times.values())
+    selection_report = {
+        'mode': 'streaming',
+        'n_jobs': 1,
+        'n_tasks': len(job_times),
+        'n_chunks': n_chunks,
+        'epochs': epochs,
+        'validation_rows': len(X_val),
+        'validation_scores': validation_scores,
+        'wall_time': wall_time,
+        'serial_time': serial_time,
+        'speedup': serial_time / wall_time if wall_time > 0 else 1.0,
+        'job_times': job_times
+    }
+
+    return {
+        'models': models,
+        'compiled': {},
+        'scalers': {risk_type: scaler for risk_type in RISK_LABELERS},
+        'encoders': encoders,
+        'model_performance': model_performance,
+        'feature_schema': model_bundle.build_feature_schema(
+            FEATURE_COLUMNS, encoders, FAMILY_CONDITIONS, EXISTING_CONDITIONS, RISK_THRESHOLD
+        ),
+        'training': {
+            'n_samples': n_rows,
+            'seed': seed,
+            'streaming': {'chunk_size': chunk_size, 'data_file': data_file},
+            'model_selection': {k: v for k, v in selection_report.items() if k != 'job_times'}
+        },
+        'selection_report': selection_report
+    }
+
+
+def print_summary(bundle):
+    """Print the model performance summary for a trained bundle"""
+    print("\n" + "="*50)
+    print("ENHANCED MODEL PERFORMANCE SUMMARY")
+    print("="*50)
+    for risk_type, performance in bundle['model_performance'].items():
+        print(f"\n{risk_type.upper()} RISK MODEL:")
+        print(f"  Algorithm: {performance['algorithm']}")
+        if performance.get('params'):
+            print(f"  Parameters: {performance['params']}")
+        print(f"  Accuracy: {performance['accuracy']:.4f}")
+        print(f"  AUC Score: {performance['auc_score']:.4f}")
+        print(f"  Cross-validation Score: {performance['cv_score']:.4f}")
+
+    print(f"\nDataset size: {bundle['training']['n_samples']} samples")
+    print(f"Feature count: {len(bundle['feature_schema']['feature_columns'])}")
+
+    report = bundle['selection_report']
+    if report.get('mode') == 'halving':
+        print(f"\nModel selection: successive halving over {report['n_candidates']} candidates, "
+              f"{report['n_tasks']} CV jobs on {report['n_jobs']} workers")
+        for rung in report['rungs']:
+            print(f"  {rung['n_candidates']} (target, candidate) pairs x {rung['n_folds']} folds "
+                  f"({rung['n_estimators']} estimators): {rung['n_tasks']} jobs")
+        print(f"  Wall time: {report['wall_time']:.2f}s (serial job time {report['serial_time']:.2f}s)")
+        print(f"  Speedup vs serial: {report['speedup']:.2f}x")
+    elif report.get('mode') == 'streaming':
+        print(f"\nModel selection: {report['n_tasks']} incremental fits over {report['n_chunks']} chunks "
+              f"x {report['epochs']} epochs, validated on {report['validation_rows']} held-out rows")
+        print(f"  Wall time: {report['wall_time']:.2f}s (partial_fit time {report['serial_time']:.2f}s)")
+    else:
+        print(f"\nModel selection: {report['n_tasks']} CV jobs on {report['n_jobs']} workers")
+        print(f"  Wall time: {report['wall_time']:.2f}s (serial job time {report['serial_time']:.2f}s)")
+        print(f"  Speedup vs serial: {report['speedup']:.2f}x")
+    if report.get('cached_targets'):
+        print(f"  Reused cached CV scores for: {', '.join(report['cached_targets'])}")
+    slowest = sorted(report['job_times'].items(), key=lambda item: item[1], reverse=True)[:5]
+    if slowest:
+        print("  Slowest jobs:")
+    for job, elapsed in slowest:
+        print(f"    {job}: {elapsed:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the health risk models and save a model bundle")
+    parser.add_argument('--samples', type=int, default=5000, help="synthetic population size")
+    parser.add_argument('--seed', type=int, default=42, help="data generation seed")
+    parser.add_argument('--model-dir', default=model_bundle.MODEL_DIR, help="bundle output directory")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="CV worker processes (default: $HEALTH_TRAIN_JOBS or CPU count)")
+    parser.add_argument('--no-data-cache', action='store_true',
+                        help="regenerate the training data instead of reusing data_cache/")
+    parser.add_argument('--no-train-cache', action='store_true',
+                        help="rerun CV and refit every model instead of reusing train_cache/")
+    parser.add_argument('--search', choices=('halving', 'grid'), default='halving',
+                        help="model selection: successive halving over a hyperparameter grid, "
+                             "or full 5-fold CV of the fixed candidates")
+    parser.add_argument('--streaming', action='store_true',
+                        help="train out of core with partial_fit, one chunk at a time")
+    parser.add_argument('--chunk-size', type=int, default=500_000, help="rows per chunk in --streaming mode")
+    parser.add_argument('--data-file', default=None,
+                        help="Arrow file (data_cache layout) to stream instead of generating data")
+    parser.add_argument('--epochs', type=int, default=1, help="passes over the data in --streaming mode")
+    args = parser.parse_args(argv)
+
+    if args.streaming:
+        bundle = train_streaming(args.samples, args.seed, args.chunk_size, args.data_file, args.epochs)
+    else:
+        bundle = train(args.samples, args.seed, args.jobs, use_data_cache=not args.no_data_cache,
+                       search=args.search, use_train_cache=not args.no_train_cache)
+    print_summary(bundle)
+
+    version = model_bundle.save_bundle(bundle, args.model_dir)
+    print(f"\nSaved model bundle {version} to {args.model_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Content-addressed store of CV scores and fitted models.
+
+``train.train_models`` looks every training job up here before running
+it. A job is identified by a fingerprint of everything its result
+depends on:
+
+    dataset   hash of the target's scaled training matrix and labels
+    schema    the feature schema (columns and encoder vocabularies)
+    code      source of prepare_features, of the target's labeler and
+              rule table, and of the cv_scheduler code that fits and
+              scores; numpy and scikit-learn versions
+    job       the candidates and search budget (CV scores), or the
+              algorithm and full hyperparameters (fitted model)
+
+Results are written once under ``<kind>/<digest>.joblib`` and reused by
+every later run with the same fingerprint. Labelers are fingerprinted
+per target, so a rerun after editing one labeler retrains only the
+target whose labels it produces; the other targets reuse both their CV
+scores and their fitted models.
+
+    HEALTH_TRAIN_CACHE_DIR  store location (default python/train_cache/)
+"""
+import hashlib
+import json
+import os
+import uuid
+
+import joblib
+import numpy as np
+import sklearn
+
+import cv_scheduler
+import data_cache
+import predict
+import rules
+
+CACHE_DIR = os.environ.get(
+    'HEALTH_TRAIN_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train_cache')
+)
+
+# Code that turns labeled data into the feature matrix
+FEATURE_FUNCTIONS = (rules.Columns, predict.fit_label_encoders, predict.prepare_features)
+# Code that fits and scores the candidates
+TRAINING_FUNCTIONS = (
+    cv_scheduler._run_fold,
+    cv_scheduler._run_rung_fold,
+    cv_scheduler._stopped_early,
+    cv_scheduler.model_complexity,
+    cv_scheduler.cross_validate_candidates,
+    cv_scheduler.successive_halving
+)
+
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def array_digest(*arrays):
+    """Hash of the dtype, shape and contents of ``arrays``"""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.dtype.str}{array.shape}\n'.encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def labeler_fingerprint(risk_type):
+    """Code and rule table that produce the labels of ``risk_type``.
+
+    Shared labeling code counts for every risk type; the other risk
+    types' labelers and tables do not.
+    """
+    other_labelers = [labeler for name, labeler in predict.RISK_LABELERS.items() if name != risk_type]
+    functions = [function for function in data_cache.LABELER_FUNCTIONS if function not in other_labelers]
+    return {
+        'code': data_cache.code_fingerprint(functions),
+        'rules': hashlib.sha256(repr(predict.RISK_RULES[risk_type]).encode()).hexdigest()
+    }
+
+
+def target_key(risk_type, X, y, feature_schema):
+    """Everything a training job on ``(X, y)`` depends on besides the job itself"""
+    return {
+        'risk_type': risk_type,
+        'dataset': array_digest(X, y),
+        'schema': _digest(feature_schema),
+        'labeler': labeler_fingerprint(risk_type),
+        'features': data_cache.code_fingerprint(FEATURE_FUNCTIONS),
+        'training': data_cache.code_fingerprint(TRAINING_FUNCTIONS),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+
+def estimator_spec(estimator):
+    """Class and full hyperparameters of an unfitted estimator"""
+    return {
+        'class': f'{type(estimator).__module__}.{type(estimator).__qualname__}',
+        'params': {name: repr(value) for name, value in estimator.get_params().items()}
+    }
+
+
+def job_path(kind, target, job, cache_dir=CACHE_DIR):
+    digest = _digest({'target': target, 'job': job})
+    return os.path.join(cache_dir, kind, f'{digest}.joblib')
+
+
+def load(kind, target, job, cache_dir=CACHE_DIR):
+    """Stored result of a job, or None"""
+    path = job_path(kind, target, job, cache_dir)
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+
+def store(kind, target, job, value, cache_dir=CACHE_DIR):
+    path = job_path(kind, target, job, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    joblib.dump(value, tmp_path)
+    os.replace(tmp_path, path)
@@ -0,0 +1,180 @@
+"""
+Pure-NumPy inference for fitted tree ensembles.
+
+A fitted RandomForestClassifier or GradientBoostingClassifier is flattened
+into contiguous node arrays: split feature, threshold, left and right
+child, and a per-node output value, with one root offset per tree. Scoring
+is then a vectorized walk of all trees and all rows at once. It skips
+sklearn's input validation and per-estimator dispatch, which dominate
+single-row latency.
+
+Only binary classifiers are supported, and gradient boosting only with
+the log loss and the default prior (or ``'zero'``) init estimator;
+``export_tree_ensemble`` returns None for anything else so callers can keep
+using the sklearn model. Rows with NaN or infinite features are rejected
+with a ValueError rather than routed down either branch.
+"""
+import numpy as np
+
+FOREST = 'forest'
+BOOSTING = 'boosting'
+
+
+class ExportMismatchError(ValueError):
+    """An exported ensemble does not reproduce the model's predict_proba"""
+
+
+class CompiledTreeEnsemble:
+    """Flattened tree ensemble with a ``predict_proba`` compatible with sklearn's"""
+
+    def __init__(self, kind, feature, threshold, left, right, value, roots, depth,
+                 init=0.0, learning_rate=1.0):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.init = float(init)
+        self.learning_rate = float(learning_rate)
+
+    def arrays(self):
+        """Node arrays by name, e.g. for saving them separately"""
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+            'right': self.right, 'value': self.value, 'roots': self.roots
+        }
+
+    def params(self):
+        """Scalar parameters by name"""
+        return {
+            'kind': self.kind, 'depth': self.depth, 'init': self.init,
+            'learning_rate': self.learning_rate
+        }
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaf_values(self, X):
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        # Leaves point back at themselves, so a fixed number of steps
+        # settles every tree regardless of its depth
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def predict_positive(self, X):
+        """Probability of the positive class for each row of ``X``"""
+        leaf_values = self._leaf_values(X)
+        if self.kind == FOREST:
+            return leaf_values.mean(axis=1)
+        raw = self.init + self.learning_rate * leaf_values.sum(axis=1)
+        return 1.0 / (1.0 + np.exp(-raw))
+
+    def predict_proba(self, X):
+        positive = self.predict_positive(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+def _flatten(trees, leaf_value):
+    """Concatenate sklearn ``Tree`` objects into one set of node arrays"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for tree in trees:
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+        rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+        values.append(leaf_value(tree))
+        roots.append(offset)
+
+        offset += n_nodes
+        depth = max(depth, tree.max_depth)
+
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'depth': depth
+    }
+
+
+def _forest_leaf_value(tree):
+    # Per-node class distribution, normalized as in DecisionTreeClassifier.predict_proba
+    value = tree.value[:, 0, :]
+    totals = value.sum(axis=1)
+    totals[totals == 0] = 1
+    return value[:, 1] / totals
+
+
+def _boosting_leaf_value(tree):
+    return tree.value[:, 0, 0]
+
+
+def _boosting_init(model):
+    """Raw score the boosting stages start from, or None if it depends on the row"""
+    from scipy.special import logit
+    from sklearn.dummy import DummyClassifier
+
+    if isinstance(model.init_, str):
+        return 0.0 if model.init_ == 'zero' else None
+    if not isinstance(model.init_, DummyClassifier) or model.init_.strategy != 'prior':
+        return None
+    # Log-odds of the class prior, clipped as sklearn clips it
+    positive = model.init_.class_prior_[1]
+    eps = np.finfo(np.float64).eps
+    return float(logit(np.clip(positive, eps, 1 - eps)))
+
+
+def export_tree_ensemble(model):
+    """Flatten a fitted binary tree ensemble, or return None if unsupported"""
+    # Imported here so that unpickling a CompiledTreeEnsemble at serve time
+    # does not pull in sklearn.ensemble
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+    if len(getattr(model, 'classes_', [])) != 2:
+        return None
+
+    if isinstance(model, RandomForestClassifier):
+        arrays = _flatten([est.tree_ for est in model.estimators_], _forest_leaf_value)
+        return CompiledTreeEnsemble(FOREST, **arrays)
+
+    if isinstance(model, GradientBoostingClassifier):
+        init = _boosting_init(model)
+        if model.loss != 'log_loss' or init is None:
+            return None
+        arrays = _flatten([est.tree_ for est in model.estimators_[:, 0]], _boosting_leaf_value)
+        return CompiledTreeEnsemble(BOOSTING, init=init, learning_rate=model.learning_rate, **arrays)
+
+    return None
+
+
+def verify_export(model, compiled, X, atol=1e-9):
+    """Largest absolute difference from ``model.predict_proba`` on ``X``.
+
+    Raises ExportMismatchError when it exceeds ``atol``.
+    """
+    expected = model.predict_proba(np.asarray(X, dtype=np.float32))
+    error = float(np.max(np.abs(compiled.predict_proba(X) - expected)))
+    if error > atol:
+        raise ExportMismatchError(f"Exported ensemble differs from predict_proba by {error:.3g}")
+    return error